@@ -1,30 +1,53 @@
+"""Pygame front end for the checkers game: menus, the board and mouse input.
+
+Run this file to play. The rules and the bot live in engine.py, which can be
+used without pygame; importing this module doesn't open a window either,
+main() does that through init_display().
+"""
 import pygame
 import sys
 import time
-import random
-import copy
+from bitboard import Position, BLACK_PIECE, RED_PIECE, BLACK_KING, RED_KING
+from bot_worker import BotWorker
+from engine import board_position, find_move, get_valid_moves, is_valid_move, make_move, opponent, winner
+from pdn import GameRecorder
+from surface_cache import TextCache, render_board_layer, render_piece
+from variants import ENGLISH, VARIANTS
 
 # Constants
-BOARD_SIZE = 8
-SQUARE_SIZE = 80
+SQUARE_SIZE = 80  # Squares are made smaller when the board wouldn't fit on the screen
+BOARD_MARGIN = 64  # Room above and below the board for the player names
 BACKGROUND_COLOR = (121, 144, 104)  # Color #799068
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 RED = (255, 0, 0)
 GRAY = (128, 128, 128)
 FONT_SIZE = 36
-
-# Initialize Pygame
-pygame.init()
-screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)  # Fullscreen mode
-screen_width, screen_height = screen.get_size()
-font = pygame.font.Font(None, FONT_SIZE)
-
-# Calculate board position for centering
-board_width = BOARD_SIZE * SQUARE_SIZE
-board_height = BOARD_SIZE * SQUARE_SIZE
-board_x_offset = (screen_width - board_width) // 2
-board_y_offset = (screen_height - board_height) // 2
+FPS_CAP = 60  # Frame rate limit while the bot is thinking
+INVALID_MOVE_SECONDS = 2  # How long the "X" for an invalid move stays up
+STATS_OVERLAY_KEY = pygame.K_F3  # Shows and hides the bot's search statistics
+ANALYSIS_KEY = pygame.K_F2  # Shows and hides the analysis of the position, in games between two players
+HINT_KEY = pygame.K_F1  # Outlines the analysis's best move until a move is made
+HINT_COLOR = (255, 215, 0)
+HINT_WIDTH = 4
+OVERLAY_FONT_SIZE = 22
+
+# Display, set up by init_display()
+screen = None
+screen_width = screen_height = 0
+font = None
+overlay_font = None
+clock = None
+
+# Rules variant, chosen on the main menu, and the size and position of its
+# board on the screen, set up by set_up_board()
+variant = ENGLISH
+board_size = variant.board_size
+square_size = SQUARE_SIZE
+board_width = board_size * square_size
+board_height = board_size * square_size
+board_x_offset = 0
+board_y_offset = 0
 
 # Game states
 STATE_MAIN_MENU = "main_menu"
@@ -46,139 +69,151 @@ player1_color = BLACK
 player2_color = RED
 current_turn = BLACK  # Start with Player 1
 
-# Piece types for clarity
-BLACK_PIECE = "B"
-RED_PIECE = "R"
-BLACK_KING = "BK"
-RED_KING = "RK"
-
-# Pieces
-black_piece = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-pygame.draw.circle(black_piece, BLACK, (SQUARE_SIZE // 2, SQUARE_SIZE // 2), SQUARE_SIZE // 2 - 10)
-red_piece = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-pygame.draw.circle(red_piece, RED, (SQUARE_SIZE // 2, SQUARE_SIZE // 2), SQUARE_SIZE // 2 - 10)
+# Piece sprites, the empty board and rendered text, set up by init_display()
+piece_sprites = None
+board_layer = None
+text_cache = None
 
 # Board setup
-board = [[None for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+board = [[None for _ in range(board_size)] for _ in range(board_size)]
 selected_piece = None
 invalid_move_timer = None  # Timer for displaying "X" for invalid moves
 
+# What is on the screen now, so a game frame only redraws what changed
+drawn_state = None
+drawn_board = None
+drawn_labels = None
+drawn_marker = None
+drawn_overlay = None
+drawn_analysis = None
+drawn_hint = ()
+full_redraw_needed = True
+show_stats_overlay = False  # Toggled with STATS_OVERLAY_KEY
+show_analysis = False  # Toggled with ANALYSIS_KEY
+show_hint = False  # Set with HINT_KEY, cleared by the next move
+analysed_position = None  # (board, turn) the bot worker is analysing, None when it isn't
+
 #bot settings
 bot_game = False
 bot_difficulty = None
 bot_color = BLACK
+bot_worker = BotWorker()  # Searches for the bot's move in the background
+
+# The game being played, appended to games.pdn when it ends or is left
+game_record = None
 
 # Functions
+def init_display():
+    """Initialize pygame, open the fullscreen window and render the surfaces the screens reuse."""
+    global screen, screen_width, screen_height, font, overlay_font, clock, text_cache
+    pygame.init()
+    screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)  # Fullscreen mode
+    screen_width, screen_height = screen.get_size()
+    font = pygame.font.Font(None, FONT_SIZE)
+    overlay_font = pygame.font.Font(None, OVERLAY_FONT_SIZE)
+    clock = pygame.time.Clock()
+
+    # Every piece of text is rendered once and reused
+    text_cache = TextCache(font)
+    set_up_board(variant)
+
+def set_up_board(new_variant):
+    """Play a variant from the next game on: size its board to the screen and render the board and pieces for it."""
+    global variant, board_size, square_size, board_width, board_height, board_x_offset, board_y_offset
+    global piece_sprites, board_layer
+    variant = new_variant
+    board_size = variant.board_size
+    square_size = min(SQUARE_SIZE, (screen_height - 2 * BOARD_MARGIN) // board_size)
+    board_width = board_height = board_size * square_size
+
+    # Calculate board position for centering
+    board_x_offset = (screen_width - board_width) // 2
+    board_y_offset = (screen_height - board_height) // 2
+
+    # Pieces, kings have a white marker in the middle
+    piece_sprites = {
+        BLACK_PIECE: render_piece(square_size, BLACK),
+        BLACK_KING: render_piece(square_size, BLACK, WHITE),
+        RED_PIECE: render_piece(square_size, RED),
+        RED_KING: render_piece(square_size, RED, WHITE),
+    }
+
+    # The empty board is rendered once and reused
+    board_layer = render_board_layer(board_size, square_size, WHITE, GRAY)
+
+def next_variant():
+    """The variant after the current one on the main menu's rules button, back to the first after the last."""
+    names = list(VARIANTS)
+    return VARIANTS[names[(names.index(variant.name) + 1) % len(names)]]
+
 def initialize_board():
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            if row < 3 and (row + col) % 2 != 0:
-                board[row][col] = BLACK_PIECE  # Black piece
-            elif row > 4 and (row + col) % 2 != 0:
-                board[row][col] = RED_PIECE  # Red piece
+    global board
+    board = variant.initial_board()
 
 def switch_turn():
     global current_turn
     current_turn = RED if current_turn == BLACK else BLACK
 
+def start_game_record():
+    global game_record
+    if variant is not ENGLISH:
+        game_record = None  # The PDN archive holds English games only
+        return
+    black_name, red_name = (player1_name, player2_name) if player1_color == BLACK else (player2_name, player1_name)
+    # A bot game starts with the human's color, which may be red
+    position = Position.from_board(board, black_to_move=(current_turn == BLACK))
+    game_record = GameRecorder(black_name, red_name, "Bot game" if bot_game else "Two player game", position)
+
+def save_game_record(winner_color=None):
+    """Write the game to the PDN archive, unfinished unless it has a winner"""
+    global game_record
+    if game_record is None:
+        return
+    try:
+        game_record.save(winner_color)
+    except OSError as error:
+        print(f"Couldn't save the game: {error}", file=sys.stderr)
+    game_record = None
+
 def get_square_under_mouse():
     mouse_x, mouse_y = pygame.mouse.get_pos()
-    row = (mouse_y - board_y_offset) // SQUARE_SIZE
-    col = (mouse_x - board_x_offset) // SQUARE_SIZE
-    if 0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE:
+    row = (mouse_y - board_y_offset) // square_size
+    col = (mouse_x - board_x_offset) // square_size
+    if 0 <= row < board_size and 0 <= col < board_size:
         return row, col
     return None, None
 
-def is_valid_move(start, end):
-    """Validate the move according to checkers rules, including simple moves and captures."""
-    start_row, start_col = start
-    end_row, end_col = end
-    piece = board[start_row][start_col]
-    direction = 1 if piece in [BLACK_PIECE, BLACK_KING] else -1  # Black moves down, red moves up
-    
-    king_piece = (piece == BLACK_KING or piece == RED_KING)
-
-    # Move must be diagonal
-    if abs(start_col - end_col) != abs(start_row - end_row):
-        return False
-
-    # Regular move
-    if abs(start_row - end_row) == 1 and board[end_row][end_col] is None:
-        # Single piece can only move forward, while king can move in any direction
-        if piece in [BLACK_PIECE, RED_PIECE] and end_row - start_row != direction:
-            return False
-        return True
-
-    # Capture move
-    elif abs(start_row - end_row) == 2:
-        mid_row = (start_row + end_row) // 2
-        mid_col = (start_col + end_col) // 2
-        mid_piece = board[mid_row][mid_col]
-        if mid_piece and (piece in [BLACK_PIECE, BLACK_KING] and mid_piece in [RED_PIECE, RED_KING]) or \
-           (piece in [RED_PIECE, RED_KING] and mid_piece in [BLACK_PIECE, BLACK_KING]):
-            # Ensure regular pieces can only capture forward
-            if not king_piece and (end_row - start_row != 2 * direction):
-                return False
-            # Ensure the destination is empty
-            if board[end_row][end_col] is None:
-                return True
-
-    return False
-
-def get_valid_moves(color):
-    """Get all valid moves for a given color"""
-    valid_moves = []
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            piece = board[row][col]
-            if piece and ((piece in [BLACK_PIECE, BLACK_KING] and color == BLACK) or (piece in [RED_PIECE, RED_KING] and color == RED)):
-                for dr, dc in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
-                    new_row, new_col = row + dr, col + dc
-                    if 0 <= new_row < BOARD_SIZE and 0 <= new_col < BOARD_SIZE:
-                        if board[new_row][new_col] is None and is_valid_move((row, col), (new_row, new_col)):
-                            valid_moves.append(((row, col), (new_row, new_col)))
-                    new_row, new_col = row + 2*dr, col + 2*dc
-                    if 0 <= new_row < BOARD_SIZE and 0 <= new_col < BOARD_SIZE:
-                        if board[new_row][new_col] is None and is_valid_move((row, col), (new_row, new_col)):
-                            valid_moves.append(((row, col), (new_row, new_col)))
-    return valid_moves
-
-def check_for_king(row, col):
-    """Promote to king if reaching the opposite side"""
-    piece = board[row][col]
-    if piece == BLACK_PIECE and row == BOARD_SIZE - 1:
-        board[row][col] = BLACK_KING
-    elif piece == RED_PIECE and row == 0:
-        board[row][col] = RED_KING
-
 def check_for_winner():
-    """Count pieces and set the winner if one player has no pieces left"""
+    """Show the winner screen once a side has no pieces left, or no move on its turn"""
     global game_state, winner_message
-    black_pieces = sum(row.count(BLACK_PIECE) + row.count(BLACK_KING) for row in board)
-    red_pieces = sum(row.count(RED_PIECE) + row.count(RED_KING) for row in board)
-
-    if black_pieces == 0:
-        winner_message = f"{player2_name if player2_color == RED else player1_name} is the Winner!"
-        game_state = STATE_WINNER
-    elif red_pieces == 0:
-        winner_message = f"{player1_name if player1_color == BLACK else player2_name} is the Winner!"
+    winner_color = winner(board, current_turn)
+    if winner_color is not None:
+        winner_message = f"{player1_name if player1_color == winner_color else player2_name} is the Winner!"
         game_state = STATE_WINNER
+        save_game_record(winner_color)
 
 def draw_invalid_move_marker(row, col):
-    x_pos = col * SQUARE_SIZE + board_x_offset + SQUARE_SIZE // 2
-    y_pos = row * SQUARE_SIZE + board_y_offset + SQUARE_SIZE // 2
+    x_pos = col * square_size + board_x_offset + square_size // 2
+    y_pos = row * square_size + board_y_offset + square_size // 2
     pygame.draw.line(screen, RED, (x_pos - 15, y_pos - 15), (x_pos + 15, y_pos + 15), 3)
     pygame.draw.line(screen, RED, (x_pos - 15, y_pos + 15), (x_pos + 15, y_pos - 15), 3)
 
 def draw_main_menu():
     screen.fill(BACKGROUND_COLOR)
-    local_play_text = font.render("Local Play", True, BLACK)
-    bot_play_text = font.render("Bot Play", True, BLACK)
-    quit_text = font.render("Quit", True, BLACK)
+    rules_text = text_cache.render(f"Rules: {variant.title}", BLACK)
+    local_play_text = text_cache.render("Local Play", BLACK)
+    bot_play_text = text_cache.render("Bot Play", BLACK)
+    quit_text = text_cache.render("Quit", BLACK)
     
     SELECTION_BACKGROUND_COLOR = (217, 217, 217)  # Color D9D9D9
 
     # Calculate background rectangles for each menu option
+    rules_rect = pygame.Rect(
+        screen_width // 2 - rules_text.get_width() // 2 - 20,
+        screen_height // 2 - 200 - 10,
+        rules_text.get_width() + 40,
+        rules_text.get_height() + 20
+    )
     local_play_rect = pygame.Rect(
         screen_width // 2 - local_play_text.get_width() // 2 - 20,
         screen_height // 2 - 100 - 10,
@@ -199,11 +234,13 @@ def draw_main_menu():
     )
 
     # Draw rounded rectangles as background for each menu option
+    pygame.draw.rect(screen, SELECTION_BACKGROUND_COLOR, rules_rect, border_radius=15)
     pygame.draw.rect(screen, SELECTION_BACKGROUND_COLOR, local_play_rect, border_radius=15)
     pygame.draw.rect(screen, SELECTION_BACKGROUND_COLOR, bot_play_rect, border_radius=15)
     pygame.draw.rect(screen, SELECTION_BACKGROUND_COLOR, quit_rect, border_radius=15)
 
     # Draw text on top of each background rectangle
+    screen.blit(rules_text, (rules_rect.x + 20, rules_rect.y + 10))
     screen.blit(local_play_text, (local_play_rect.x + 20, local_play_rect.y + 10))
     screen.blit(bot_play_text, (bot_play_rect.x + 20, bot_play_rect.y + 10))
     screen.blit(quit_text, (quit_rect.x + 20, quit_rect.y + 10))
@@ -214,11 +251,11 @@ def draw_player_setup():
     SELECTION_BACKGROUND_COLOR = (217, 217, 217)  # Color D9D9D9
 
     # Text elements for labels
-    player1_text = font.render("Player 1 Name:", True, BLACK)
-    player2_text = font.render("Player 2 Name:", True, BLACK)
-    select_color_text = font.render("Select Color:", True, BLACK)
-    start_text = font.render("Start Game", True, BLACK)
-    back_text = font.render("Back", True, BLACK)
+    player1_text = text_cache.render("Player 1 Name:", BLACK)
+    player2_text = text_cache.render("Player 2 Name:", BLACK)
+    select_color_text = text_cache.render("Select Color:", BLACK)
+    start_text = text_cache.render("Start Game", BLACK)
+    back_text = text_cache.render("Back", BLACK)
     
     # Background rectangles for labels
     player1_label_rect = pygame.Rect(screen_width // 2 - 200, screen_height // 2 - 200, player1_text.get_width() + 220, player1_text.get_height() + 20)
@@ -242,8 +279,8 @@ def draw_player_setup():
     # Draw input boxes with player name texts
     pygame.draw.rect(screen, WHITE, (screen_width // 2, player1_label_rect.y, 200, player1_text.get_height() + 20))
     pygame.draw.rect(screen, WHITE, (screen_width // 2, player2_label_rect.y, 200, player2_text.get_height() + 20))
-    player1_name_text = font.render(player1_name, True, BLACK)
-    player2_name_text = font.render(player2_name, True, BLACK)
+    player1_name_text = text_cache.render(player1_name, BLACK)
+    player2_name_text = text_cache.render(player2_name, BLACK)
     screen.blit(player1_name_text, (screen_width // 2 + 10, player1_label_rect.y + 10))
     screen.blit(player2_name_text, (screen_width // 2 + 10, player2_label_rect.y + 10))
 
@@ -258,8 +295,8 @@ def draw_player_setup():
         pygame.draw.circle(screen, WHITE, (screen_width // 2 + 50, screen_height // 2 + 60), 25, 2)
 
     # Display selected color texts
-    player1_color_text = font.render(f"Player 1 Color: {'Black' if player1_color == BLACK else 'Red'}", True, BLACK)
-    player2_color_text = font.render(f"Player 2 Color: {'Black' if player2_color == BLACK else 'Red'}", True, BLACK)
+    player1_color_text = text_cache.render(f"Player 1 Color: {'Black' if player1_color == BLACK else 'Red'}", BLACK)
+    player2_color_text = text_cache.render(f"Player 2 Color: {'Black' if player2_color == BLACK else 'Red'}", BLACK)
     screen.blit(player1_color_text, (screen_width // 2 - player1_color_text.get_width() // 2, screen_height // 2 + 100))
     screen.blit(player2_color_text, (screen_width // 2 - player2_color_text.get_width() // 2, screen_height // 2 + 150))
 
@@ -269,10 +306,10 @@ def draw_bot_setup():
     SELECTION_BACKGROUND_COLOR = (217, 217, 217)  # Color D9D9D9
 
     # Text elements for labels
-    player1_text = font.render("Player Name:", True, BLACK)
-    select_color_text = font.render("Select Color:", True, BLACK)
-    start_text = font.render("Start Game", True, BLACK)
-    back_text = font.render("Back", True, BLACK)
+    player1_text = text_cache.render("Player Name:", BLACK)
+    select_color_text = text_cache.render("Select Color:", BLACK)
+    start_text = text_cache.render("Start Game", BLACK)
+    back_text = text_cache.render("Back", BLACK)
     
     # Background rectangles for labels
     player1_label_rect = pygame.Rect(screen_width // 2 - 200, screen_height // 2 - 200, player1_text.get_width() + 220, player1_text.get_height() + 20)
@@ -292,7 +329,7 @@ def draw_bot_setup():
 
     # Draw input box with player name text
     pygame.draw.rect(screen, WHITE, (screen_width // 2, player1_label_rect.y, 200, player1_text.get_height() + 20))
-    player1_name_text = font.render(player1_name, True, BLACK)
+    player1_name_text = text_cache.render(player1_name, BLACK)
     screen.blit(player1_name_text, (screen_width // 2 + 10, player1_label_rect.y + 10))
 
     # Draw color selection circles
@@ -306,125 +343,60 @@ def draw_bot_setup():
         pygame.draw.circle(screen, WHITE, (screen_width // 2 + 50, screen_height // 2 + 60), 25, 2)
 
     # Display selected color texts
-    bot_color_text = font.render(f"Bot Color: {'Red' if player1_color == BLACK else 'Black'}", True, BLACK)
+    bot_color_text = text_cache.render(f"Bot Color: {'Red' if player1_color == BLACK else 'Black'}", BLACK)
     screen.blit(bot_color_text, (screen_width // 2 - bot_color_text.get_width() // 2, screen_height // 2 + 100))
 
 def bot_moves():
-    global winner_message, game_state
-    moves = get_valid_moves(bot_color)
-    if not moves:
-        # Bot has no valid moves, player wins
-        winner_message = f"{player1_name if player1_color == BLACK else player2_name} wins!"
-        game_state = STATE_WINNER
+    """Start the bot's search in the background, then play its move once the search is done."""
+    global winner_message, game_state, board
+    if not bot_worker.searching():
+        if not get_valid_moves(board, bot_color):
+            # Bot has no valid moves, player wins
+            winner_message = f"{player1_name if player1_color == BLACK else player2_name} wins!"
+            game_state = STATE_WINNER
+            save_game_record(opponent(bot_color))
+            return
+        bot_worker.start(board, bot_color, bot_difficulty)
         return
 
-    if bot_difficulty == 'easy':
-        # Random move
-        move = random.choice(moves)
-    elif bot_difficulty == 'medium':
-        # Use minimax with moderate depth
-        _, move = minimax(board, depth=3, alpha=float('-inf'), beta=float('inf'), maximizing_player=True, bot_color=bot_color)
-    elif bot_difficulty == 'hard':
-        # Use minimax with a deeper search
-        _, move = minimax(board, depth=5, alpha=float('-inf'), beta=float('inf'), maximizing_player=True, bot_color=bot_color)
-
-    # Execute move
-    (start_row, start_col), (end_row, end_col) = move
-    if abs(end_row - start_row) == 2:
-        mid_row = (start_row + end_row) // 2
-        mid_col = (start_col + end_col) // 2
-        board[mid_row][mid_col] = None
-    board[end_row][end_col] = board[start_row][start_col]
-    board[start_row][start_col] = None
-    check_for_king(end_row, end_col)
+    move = bot_worker.poll()
+    if move is None and bot_worker.error is not None:
+        # The search failed in the worker: end the game rather than wait for a move that won't come
+        print(f"The bot's search failed: {bot_worker.error!r}", file=sys.stderr)
+        winner_message = "Game aborted: the bot's search failed"
+        game_state = STATE_WINNER
+        save_game_record()  # Left unfinished
+        return
+    if move is None:
+        return  # Still thinking
+
+    # Execute move on the bitboard and hand the result back to the UI board
+    position = board_position(board, bot_color)
+    position.apply(move)
+    board = position.to_board()
+    if game_record is not None:
+        game_record.add(move, bot_worker.stats)
     switch_turn()
     check_for_winner()
+    if game_state == STATE_GAME:
+        bot_worker.ponder(board, bot_color, bot_difficulty)
+
+def quit_game():
+    if game_state == STATE_GAME:
+        save_game_record()
+    bot_worker.shutdown()
+    pygame.quit()
+    sys.exit()
             
-def evaluate_board(board, bot_color):
-    black_pieces = 0
-    red_pieces = 0
-    
-    for row in board:
-        for piece in row:
-            if piece == BLACK_PIECE:
-                black_pieces += 1
-            elif piece == RED_PIECE:
-                red_pieces += 1
-            elif piece == BLACK_KING:
-                black_pieces += 1.5
-            elif piece == RED_KING:
-                red_pieces += 1.5
-                
-    if bot_color == BLACK:
-        return black_pieces - red_pieces
-    else:
-        return red_pieces - black_pieces
-    
-def make_move(board, move):
-        new_board = copy.deepcopy(board)
-        (start_row, start_col), (end_row, end_col) = move
-        piece = new_board[start_row][start_col]
-        new_board[start_row][start_col] = None
-        new_board[end_row][end_col] = piece
-        
-        if abs(end_row - start_row) == 2:
-            mid_row = (start_row + end_row) // 2
-            mid_col = (start_col + end_col) // 2
-            new_board[mid_row][mid_col] = None
-            
-        if piece == BLACK_PIECE and end_row == BOARD_SIZE - 1:
-            new_board[end_row][end_col] = BLACK_KING
-        elif piece == RED_PIECE and end_row == 0:
-            new_board[end_row][end_col] = RED_KING
-            
-        return new_board
-    
-def minimax(board, depth, alpha, beta, maximizing_player, bot_color):
-    if depth == 0 or game_over(board):
-        return evaluate_board(board, bot_color), None
-
-    current_color = bot_color if maximizing_player else (RED if bot_color == BLACK else BLACK)
-    moves = get_valid_moves(current_color)
-    
-    if not moves:
-        return evaluate_board(board, bot_color), None
-
-    best_move = None
-
-    if maximizing_player:
-        max_eval = float('-inf')
-        for move in moves:
-            new_board = make_move(board, move)
-            eval_score, _ = minimax(new_board, depth - 1, alpha, beta, False, bot_color)
-            if eval_score > max_eval:
-                max_eval = eval_score
-                best_move = move
-            alpha = max(alpha, eval_score)
-            if beta <= alpha:
-                break
-        return max_eval, best_move
-    else:
-        min_eval = float('inf')
-        for move in moves:
-            new_board = make_move(board, move)
-            eval_score, _ = minimax(new_board, depth - 1, alpha, beta, True, bot_color)
-            if eval_score < min_eval:
-                min_eval = eval_score
-                best_move = move
-            beta = min(beta, eval_score)
-            if beta <= alpha:
-                break
-        return min_eval, best_move    
-
 def draw_difficulty_selection():
     screen.fill(BACKGROUND_COLOR)
     SELECTION_BACKGROUND_COLOR = (217, 217, 217)  # Color D9D9D9
 
     # Text elements
-    easy_text = font.render("Easy", True, BLACK)
-    medium_text = font.render("Medium", True, BLACK)
-    hard_text = font.render("Hard", True, BLACK)
-    back_text = font.render("Back", True, BLACK)
+    easy_text = text_cache.render("Easy", BLACK)
+    medium_text = text_cache.render("Medium", BLACK)
+    hard_text = text_cache.render("Hard", BLACK)
+    back_text = text_cache.render("Back", BLACK)
 
     # Background rectangles for each option
     easy_rect = pygame.Rect(screen_width // 2 - easy_text.get_width() // 2 - 20, screen_height // 2 - 100, easy_text.get_width() + 40, easy_text.get_height() + 20)
@@ -445,32 +417,39 @@ def draw_difficulty_selection():
     screen.blit(back_text, (back_rect.x + 20, back_rect.y + 10))
 
 
-def draw_board():
-    screen.fill(BACKGROUND_COLOR)
+def square_rect(row, col):
+    return pygame.Rect(col * square_size + board_x_offset, row * square_size + board_y_offset, square_size, square_size)
+
+def draw_square(row, col, hint=()):
+    """Draw one board square and the piece on it, outlined when it is in hint."""
+    rect = square_rect(row, col)
+    screen.blit(board_layer, rect, rect.move(-board_x_offset, -board_y_offset))
+    piece = board[row][col]
+    if piece:
+        screen.blit(piece_sprites[piece], rect)
+    if (row, col) in hint:
+        pygame.draw.rect(screen, HINT_COLOR, rect, HINT_WIDTH)
+
+def bot_thinking_text():
+    """The "Thinking" text shown next to the bot's name, with animated dots, or "" when it isn't."""
+    if bot_game and bot_worker.searching():
+        return "Thinking" + "." * (int(time.time() * 3) % 4)
+    return ""
+
+def draw_player_labels():
+    """Draw the player names, turn indicator and Back button; returns the screen areas drawn over."""
     SELECTION_BACKGROUND_COLOR = (217, 217, 217)  # Color D9D9D9
 
-    # Draw board squares and pieces
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            color = WHITE if (row + col) % 2 == 0 else GRAY
-            pygame.draw.rect(screen, color, 
-                             (col * SQUARE_SIZE + board_x_offset, row * SQUARE_SIZE + board_y_offset, 
-                              SQUARE_SIZE, SQUARE_SIZE))
-            piece = board[row][col]
-            if piece in [BLACK_PIECE, BLACK_KING]:
-                screen.blit(black_piece, (col * SQUARE_SIZE + board_x_offset, row * SQUARE_SIZE + board_y_offset))
-                if piece == BLACK_KING:
-                    pygame.draw.circle(screen, WHITE, (col * SQUARE_SIZE + board_x_offset + SQUARE_SIZE // 2, 
-                                                       row * SQUARE_SIZE + board_y_offset + SQUARE_SIZE // 2), 10)
-            elif piece in [RED_PIECE, RED_KING]:
-                screen.blit(red_piece, (col * SQUARE_SIZE + board_x_offset, row * SQUARE_SIZE + board_y_offset))
-                if piece == RED_KING:
-                    pygame.draw.circle(screen, WHITE, (col * SQUARE_SIZE + board_x_offset + SQUARE_SIZE // 2, 
-                                                       row * SQUARE_SIZE + board_y_offset + SQUARE_SIZE // 2), 10)
+    # Clear the strips above and below the board so this can be redrawn on its own
+    strip_height = font.get_height() + 30
+    top_strip = pygame.Rect(0, board_y_offset - 60, screen_width, strip_height)
+    bottom_strip = pygame.Rect(0, board_y_offset + board_height + 10, screen_width, strip_height)
+    screen.fill(BACKGROUND_COLOR, top_strip)
+    screen.fill(BACKGROUND_COLOR, bottom_strip)
 
     # Define player name text and turn indicator triangle color
-    player1_text = font.render(player1_name, True, player1_color)
-    player2_text = font.render(player2_name, True, player2_color)
+    player1_text = text_cache.render(player1_name, player1_color)
+    player2_text = text_cache.render(player2_name, player2_color)
     triangle_color = BLACK if current_turn == BLACK else RED
 
     # Position the names and turn indicator triangle based on color selection
@@ -511,166 +490,367 @@ def draw_board():
         ]
     pygame.draw.polygon(screen, triangle_color, triangle_points)
 
-    # Draw "Back" button with rounded background
-    back_text = font.render("Back", True, BLACK)
+    # Show that the bot is thinking next to its name
+    thinking = bot_thinking_text()
+    if thinking:
+        thinking_text = text_cache.render(thinking, BLACK)
+        screen.blit(thinking_text, (player2_name_rect.right + 20, player2_name_rect.y + 10))
+
+    # Draw "Back" button with rounded background, the bottom strip may have covered part of it
+    back_text = text_cache.render("Back", BLACK)
     back_rect = pygame.Rect(screen_width - 150, screen_height - 50, back_text.get_width() + 40, back_text.get_height() + 20)
     pygame.draw.rect(screen, SELECTION_BACKGROUND_COLOR, back_rect, border_radius=15)
     screen.blit(back_text, (back_rect.x + 20, back_rect.y + 10))
+    return [top_strip, bottom_strip, back_rect]
+
+def stats_overlay_lines():
+    """The lines of the search statistics overlay, () while it is hidden."""
+    if not show_stats_overlay:
+        return ()
+    stats = bot_worker.search_stats()
+    if stats is None:
+        return ("Search statistics (F3 hides)", "none yet, they start with the bot's next search")
+    if bot_worker.pondering():
+        title = "Bot pondering"
+    elif bot_worker.searching():
+        title = "Bot thinking"
+    else:
+        title = "Bot's last search"
+    return (f"{title} (F3 hides)", *stats.summary_lines())
+
+def draw_stats_overlay(lines):
+    """Draw the overlay lines left of the board, clearing what was there; returns the area drawn over."""
+    area = pygame.Rect(10, board_y_offset, max(board_x_offset - 20, 0), board_height)
+    screen.fill(BACKGROUND_COLOR, area)
+    screen.set_clip(area)
+    y = area.y
+    for index, line in enumerate(lines):
+        # The figures change every frame while the bot searches, so they aren't worth caching
+        screen.blit(overlay_font.render(line, True, BLACK if index == 0 else WHITE), (area.x, y))
+        y += overlay_font.get_linesize()
+    screen.set_clip(None)
+    return area
+
+def update_analysis():
+    """Keep the bot worker analysing the position on the board during games between two players, and only then."""
+    global analysed_position, show_hint
+    if game_state == STATE_GAME and not bot_game:
+        position = (tuple(map(tuple, board)), current_turn)
+        if position != analysed_position:
+            analysed_position = position
+            show_hint = False
+            bot_worker.analyse(board, current_turn)
+    elif analysed_position is not None:
+        analysed_position = None
+        show_hint = False
+        bot_worker.stop_analysis()
+
+def analysis_lines():
+    """The lines of the analysis panel, () while it is hidden."""
+    if not show_analysis:
+        return ()
+    if bot_game:
+        return ("Analysis (F2 hides)", "only in games between two players")
+    side = "Black" if current_turn == BLACK else "Red"
+    analysis = bot_worker.analysis_lines()
+    if analysis is None:
+        return (f"Analysis, {side} to move (F2 hides)", "searching")
+    depth, lines = analysis
+    return (f"Analysis, {side} to move (F2 hides)", f"depth {depth}, F1 shows the best move",
+            *(f"{index}. {score:+.2f}  {' '.join(variant.move_to_text(move) for move in moves)}"
+              for index, (score, moves) in enumerate(lines, 1)))
+
+def draw_analysis(lines):
+    """Draw the analysis lines right of the board, clearing what was there; returns the area drawn over."""
+    left = board_x_offset + board_width + 10
+    area = pygame.Rect(left, board_y_offset, max(screen_width - left - 10, 0), board_height)
+    screen.fill(BACKGROUND_COLOR, area)
+    screen.set_clip(area)
+    y = area.y
+    for index, line in enumerate(lines):
+        screen.blit(overlay_font.render(line, True, BLACK if index == 0 else WHITE), (area.x, y))
+        y += overlay_font.get_linesize()
+    screen.set_clip(None)
+    return area
+
+def hint_squares():
+    """The start and end squares of the analysis's best move while the hint is shown, () otherwise."""
+    if not show_hint or bot_game:
+        return ()
+    analysis = bot_worker.analysis_lines()
+    if analysis is None or not analysis[1]:
+        return ()
+    return variant.move_to_rowcol(analysis[1][0][1][0])
+
+def draw_board():
+    screen.fill(BACKGROUND_COLOR)
+
+    # Draw board squares and pieces
+    screen.blit(board_layer, (board_x_offset, board_y_offset))
+    for row in range(board_size):
+        for col in range(board_size):
+            piece = board[row][col]
+            if piece:
+                screen.blit(piece_sprites[piece], square_rect(row, col))
+    for row, col in hint_squares():
+        pygame.draw.rect(screen, HINT_COLOR, square_rect(row, col), HINT_WIDTH)
+
+    draw_player_labels()
+    if show_stats_overlay:
+        draw_stats_overlay(stats_overlay_lines())
+    if show_analysis:
+        draw_analysis(analysis_lines())
+
+    if invalid_move_timer:
+        draw_invalid_move_marker(*invalid_move_timer["position"])
 
 
 def draw_winner_screen():
     """Displays the winner message and option to return to the main menu."""
     screen.fill(BACKGROUND_COLOR)
-    win_text = font.render(winner_message, True, BLACK)
+    win_text = text_cache.render(winner_message, BLACK)
     screen.blit(win_text, (screen_width // 2 - win_text.get_width() // 2, screen_height // 2 - FONT_SIZE // 2))
 
     # Option to return to main menu
-    main_menu_text = font.render("Return to Main Menu", True, BLACK)
+    main_menu_text = text_cache.render("Return to Main Menu", BLACK)
     screen.blit(main_menu_text, (screen_width // 2 - main_menu_text.get_width() // 2, screen_height // 2 + 50))
 
-def game_over(board):
-    black_moves = get_valid_moves(BLACK)
-    red_moves = get_valid_moves(RED)
-    if not black_moves or not red_moves:
-        return True
-    return False
+def render_frame():
+    """Bring the screen up to date.
+
+    Menus are redrawn whole. During a game only the squares whose piece
+    changed, the invalid move marker and the name strips (when the turn or
+    the bot's thinking text changed) are redrawn and pushed to the display,
+    and the overlay, the analysis and the hint when they changed.
+    """
+    global drawn_state, drawn_board, drawn_labels, drawn_marker, drawn_overlay, drawn_analysis, drawn_hint
+    global full_redraw_needed
+    marker = invalid_move_timer["position"] if invalid_move_timer else None
+    labels = (current_turn, player1_name, player2_name, bot_thinking_text())
+    overlay = stats_overlay_lines()
+    analysis = analysis_lines()
+    hint = hint_squares()
+
+    if game_state != STATE_GAME:
+        if game_state == STATE_MAIN_MENU:
+            draw_main_menu()
+        elif game_state == STATE_PLAYER_SETUP:
+            draw_player_setup()
+        elif game_state == STATE_BOT_SETUP:
+            draw_bot_setup()
+        elif game_state == STATE_DIFFICULTY_SELECTION:
+            draw_difficulty_selection()
+        elif game_state == STATE_WINNER:
+            draw_winner_screen()
+        pygame.display.flip()
+    elif drawn_state != STATE_GAME or full_redraw_needed:
+        draw_board()
+        pygame.display.flip()
+    else:
+        dirty = []
+        hint_changed = hint != drawn_hint
+        for row in range(board_size):
+            for col in range(board_size):
+                if (board[row][col] != drawn_board[row][col] or (row, col) in (marker, drawn_marker)
+                        or (hint_changed and ((row, col) in hint or (row, col) in drawn_hint))):
+                    draw_square(row, col, hint)
+                    dirty.append(square_rect(row, col))
+        if marker:
+            draw_invalid_move_marker(*marker)
+        if labels != drawn_labels:
+            dirty.extend(draw_player_labels())
+        if overlay != drawn_overlay:
+            dirty.append(draw_stats_overlay(overlay))
+        if analysis != drawn_analysis:
+            dirty.append(draw_analysis(analysis))
+        if dirty:
+            pygame.display.update(dirty)
+
+    drawn_state = game_state
+    drawn_board = [row[:] for row in board]
+    drawn_labels = labels
+    drawn_marker = marker
+    drawn_overlay = overlay
+    drawn_analysis = analysis
+    drawn_hint = hint
+    full_redraw_needed = False
+
+def screen_is_animating():
+    """True while the screen changes without any input.
+
+    That is while the bot is thinking, about to move or pondering on the
+    overlay, and while the analysis being shown or hinted at goes deeper.
+    """
+    if game_state != STATE_GAME:
+        return False
+    if not bot_game:
+        return (show_analysis or show_hint) and bot_worker.analysing()
+    return current_turn == bot_color or bot_worker.searching() or (show_stats_overlay and bot_worker.pondering())
+
+def wait_for_events():
+    """Return the next batch of events, at most FPS_CAP times a second.
+
+    When nothing is animating this sleeps until there is input, or until the
+    invalid move marker is due to disappear.
+    """
+    if screen_is_animating():
+        clock.tick(FPS_CAP)
+        return pygame.event.get()
+    if invalid_move_timer:
+        remaining = INVALID_MOVE_SECONDS - (time.time() - invalid_move_timer["start_time"])
+        event = pygame.event.wait(max(1, int(remaining * 1000) + 1))
+    else:
+        event = pygame.event.wait()
+    clock.tick()
+    events = [] if event.type == pygame.NOEVENT else [event]
+    return events + pygame.event.get()
 
 # Main game loop
-running = True
-initialize_board()
-
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            y_start = screen_height // 2 - 200  # Define y_start within the main loop
-            if game_state == STATE_MAIN_MENU:
-                player1_name = ""
-                player2_name = ""
-                bot_game = False
-                active_input = None
-                if screen_height // 2 - 100 <= mouse_y <= screen_height // 2 - 60:
-                    game_state = STATE_PLAYER_SETUP
-                elif screen_height // 2 <= mouse_y <= screen_height // 2 + 40:
-                    game_state = STATE_DIFFICULTY_SELECTION
-                elif screen_height // 2 + 100 <= mouse_y <= screen_height // 2 + 140:
-                    pygame.quit()
-                    sys.exit()
-            elif game_state == STATE_PLAYER_SETUP:
-                if y_start <= mouse_y <= y_start + 40 and screen_width // 2 <= mouse_x <= screen_width // 2 + 200:
-                    active_input = "player1"
-                elif y_start + 100 <= mouse_y <= y_start + 140 and screen_width // 2 <= mouse_x <= screen_width // 2 + 200:
-                    active_input = "player2"
-                elif y_start + 250 - 20 <= mouse_y <= y_start + 250 + 20:
-                    if screen_width // 2 - 50 - 20 <= mouse_x <= screen_width // 2 - 50 + 20:
-                        player1_color, player2_color = BLACK, RED
-                    elif screen_width // 2 + 50 - 20 <= mouse_x <= screen_width // 2 + 50 + 20:
-                        player1_color, player2_color = RED, BLACK
-                elif y_start + 400 <= mouse_y <= y_start + 440:
-                    board = [[None for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-                    initialize_board()
-                    current_turn = BLACK
-                    selected_piece = None
+def main():
+    global game_state, player1_name, player2_name, bot_game, active_input, player1_color, player2_color
+    global board, current_turn, selected_piece, bot_color, bot_difficulty, invalid_move_timer, full_redraw_needed
+    global show_stats_overlay, show_analysis, show_hint
+    init_display()
+    running = True
+    initialize_board()
+
+    while running:
+        for event in wait_for_events():
+            if event.type == pygame.QUIT:
+                quit_game()
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                full_redraw_needed = True
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_x, mouse_y = pygame.mouse.get_pos()
+                y_start = screen_height // 2 - 200  # Define y_start within the main loop
+                if game_state == STATE_MAIN_MENU:
+                    player1_name = ""
+                    player2_name = ""
                     bot_game = False
-                    game_state = STATE_GAME
-                elif y_start + 450 <= mouse_y <= y_start + 490:
-                    game_state = STATE_MAIN_MENU
-            elif game_state == STATE_BOT_SETUP:
-                if y_start <= mouse_y <= y_start + 40 and screen_width // 2 <= mouse_x <= screen_width // 2 + 200:
-                    active_input = "player1"
-                elif y_start + 250 - 20 <= mouse_y <= y_start + 250 +20:
-                    if screen_width // 2 - 50 - 20 <= mouse_x <= screen_width // 2 - 50 + 20:
-                        player1_color, bot_color = BLACK, RED
-                    elif screen_width // 2 + 50 - 20 <= mouse_x <= screen_width // 2 + 50 + 20:
-                        player1_color, bot_color = RED, BLACK
-                elif y_start + 400 <= mouse_y <= y_start + 440:
-                    player2_name = f"{bot_difficulty.capitalize()} Bot"
-                    player2_color = bot_color
-                    board = [[None for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-                    initialize_board()
-                    current_turn = player1_color
-                    selected_piece = None
-                    game_state = STATE_GAME
-                elif y_start + 450 <= mouse_y <= y_start + 490:
-                    game_state = STATE_MAIN_MENU
-            elif game_state == STATE_DIFFICULTY_SELECTION:
-                y_start = screen_height // 2 - 100
-                if y_start <= mouse_y <= screen_height // 2 + 40:
-                    bot_game = True
-                    bot_difficulty = 'easy'         # easy bot game
-                    game_state = STATE_BOT_SETUP
-                elif y_start +100 <= mouse_y <= screen_height // 2 + 140:
-                    bot_game = True
-                    bot_difficulty = 'medium'       # medium bot game
-                    game_state = STATE_BOT_SETUP
-                elif y_start + 200 <= mouse_y <= screen_height // 2 + 240:
-                    bot_game = True
-                    bot_difficulty = 'hard'         # hard bot game
-                    game_state = STATE_BOT_SETUP
-                elif y_start + 300 <= mouse_y <= screen_height // 2 + 340:
-                    game_state = STATE_MAIN_MENU
-            elif game_state == STATE_GAME:
-                row, col = get_square_under_mouse()
-                if row is not None and col is not None:
-                    if selected_piece:
-                        if is_valid_move(selected_piece, (row, col)):
-                            old_row, old_col = selected_piece
-                            if abs(row - old_row) == 2:
-                                mid_row = (old_row +row) // 2
-                                mid_col = (old_col + col) // 2
-                                board[mid_row][mid_col] = None
-                            board[row][col] = board[old_row][old_col]
-                            board[old_row][old_col] = None
-                            check_for_king(row, col)
-                            selected_piece = None
-                            switch_turn()
-                            check_for_winner()  # Check for a winner after each valid move
-                        else:
-                            invalid_move_timer = {"position": (row, col), "start_time": time.time()}
-                            selected_piece = None
-                    elif board[row][col] and ((board[row][col] in [BLACK_PIECE, BLACK_KING] and current_turn == BLACK) or (board[row][col] in [RED_PIECE, RED_KING] and current_turn == RED)):
-                        selected_piece = (row, col)
-                elif screen_width - 150 <= mouse_x <= screen_width - 50 and screen_height - 50 <= mouse_y <= screen_height - 20:
-                    game_state = STATE_MAIN_MENU
-            elif game_state == STATE_WINNER:
-                # If on the winner screen, check if the player clicks to return to the main menu
-                main_menu_text = font.render("Return to Main Menu", True, BLACK)
-                if screen_width // 2 - main_menu_text.get_width() // 2 <= mouse_x <= screen_width // 2 + main_menu_text.get_width() // 2 and \
-                   screen_height // 2 + 50 <= mouse_y <= screen_height // 2 + 50 + FONT_SIZE:
-                    game_state = STATE_MAIN_MENU
-
-        elif event.type == pygame.KEYDOWN and active_input:
-            if event.key == pygame.K_BACKSPACE:
-                if active_input == "player1":
-                    player1_name = player1_name[:-1]
-                elif active_input == "player2":
-                    player2_name = player2_name[:-1]
-            elif event.unicode.isprintable():
-                if active_input == "player1" and len(player1_name) < 10:
-                    player1_name += event.unicode
-                elif active_input == "player2" and len(player2_name) < 10:
-                    player2_name += event.unicode
+                    active_input = None
+                    if screen_height // 2 - 200 <= mouse_y <= screen_height // 2 - 160:
+                        set_up_board(next_variant())
+                    elif screen_height // 2 - 100 <= mouse_y <= screen_height // 2 - 60:
+                        game_state = STATE_PLAYER_SETUP
+                    elif screen_height // 2 <= mouse_y <= screen_height // 2 + 40:
+                        game_state = STATE_DIFFICULTY_SELECTION
+                    elif screen_height // 2 + 100 <= mouse_y <= screen_height // 2 + 140:
+                        quit_game()
+                elif game_state == STATE_PLAYER_SETUP:
+                    if y_start <= mouse_y <= y_start + 40 and screen_width // 2 <= mouse_x <= screen_width // 2 + 200:
+                        active_input = "player1"
+                    elif y_start + 100 <= mouse_y <= y_start + 140 and screen_width // 2 <= mouse_x <= screen_width // 2 + 200:
+                        active_input = "player2"
+                    elif y_start + 250 - 20 <= mouse_y <= y_start + 250 + 20:
+                        if screen_width // 2 - 50 - 20 <= mouse_x <= screen_width // 2 - 50 + 20:
+                            player1_color, player2_color = BLACK, RED
+                        elif screen_width // 2 + 50 - 20 <= mouse_x <= screen_width // 2 + 50 + 20:
+                            player1_color, player2_color = RED, BLACK
+                    elif y_start + 400 <= mouse_y <= y_start + 440:
+                        initialize_board()
+                        current_turn = BLACK if variant.black_moves_first else RED
+                        selected_piece = None
+                        bot_game = False
+                        game_state = STATE_GAME
+                        start_game_record()
+                    elif y_start + 450 <= mouse_y <= y_start + 490:
+                        game_state = STATE_MAIN_MENU
+                elif game_state == STATE_BOT_SETUP:
+                    if y_start <= mouse_y <= y_start + 40 and screen_width // 2 <= mouse_x <= screen_width // 2 + 200:
+                        active_input = "player1"
+                    elif y_start + 250 - 20 <= mouse_y <= y_start + 250 +20:
+                        if screen_width // 2 - 50 - 20 <= mouse_x <= screen_width // 2 - 50 + 20:
+                            player1_color, bot_color = BLACK, RED
+                        elif screen_width // 2 + 50 - 20 <= mouse_x <= screen_width // 2 + 50 + 20:
+                            player1_color, bot_color = RED, BLACK
+                    elif y_start + 400 <= mouse_y <= y_start + 440:
+                        player2_name = f"{bot_difficulty.capitalize()} Bot"
+                        player2_color = bot_color
+                        initialize_board()
+                        current_turn = player1_color
+                        selected_piece = None
+                        game_state = STATE_GAME
+                        start_game_record()
+                    elif y_start + 450 <= mouse_y <= y_start + 490:
+                        game_state = STATE_MAIN_MENU
+                elif game_state == STATE_DIFFICULTY_SELECTION:
+                    y_start = screen_height // 2 - 100
+                    if y_start <= mouse_y <= screen_height // 2 + 40:
+                        bot_game = True
+                        bot_difficulty = 'easy'         # easy bot game
+                        game_state = STATE_BOT_SETUP
+                    elif y_start +100 <= mouse_y <= screen_height // 2 + 140:
+                        bot_game = True
+                        bot_difficulty = 'medium'       # medium bot game
+                        game_state = STATE_BOT_SETUP
+                    elif y_start + 200 <= mouse_y <= screen_height // 2 + 240:
+                        bot_game = True
+                        bot_difficulty = 'hard'         # hard bot game
+                        game_state = STATE_BOT_SETUP
+                    elif y_start + 300 <= mouse_y <= screen_height // 2 + 340:
+                        game_state = STATE_MAIN_MENU
+                elif game_state == STATE_GAME:
+                    row, col = get_square_under_mouse()
+                    if row is not None and col is not None:
+                        if bot_game and current_turn == bot_color:
+                            pass  # The bot is thinking in the background; its pieces aren't the human's to move
+                        elif selected_piece:
+                            # A multi-jump is played whole by clicking where its last jump lands
+                            if is_valid_move(board, selected_piece, (row, col)):
+                                if game_record is not None:
+                                    game_record.add(find_move(board, selected_piece, (row, col)))
+                                make_move(board, selected_piece, (row, col))
+                                selected_piece = None
+                                switch_turn()
+                                check_for_winner()  # Check for a winner after each valid move
+                            else:
+                                invalid_move_timer = {"position": (row, col), "start_time": time.time()}
+                                selected_piece = None
+                        elif board[row][col] and ((board[row][col] in [BLACK_PIECE, BLACK_KING] and current_turn == BLACK) or (board[row][col] in [RED_PIECE, RED_KING] and current_turn == RED)):
+                            selected_piece = (row, col)
+                    elif screen_width - 150 <= mouse_x <= screen_width - 50 and screen_height - 50 <= mouse_y <= screen_height - 20:
+                        save_game_record()  # Left unfinished
+                        game_state = STATE_MAIN_MENU
+                elif game_state == STATE_WINNER:
+                    # If on the winner screen, check if the player clicks to return to the main menu
+                    main_menu_text = text_cache.render("Return to Main Menu", BLACK)
+                    if screen_width // 2 - main_menu_text.get_width() // 2 <= mouse_x <= screen_width // 2 + main_menu_text.get_width() // 2 and \
+                       screen_height // 2 + 50 <= mouse_y <= screen_height // 2 + 50 + FONT_SIZE:
+                        game_state = STATE_MAIN_MENU
+
+            elif event.type == pygame.KEYDOWN and event.key == STATS_OVERLAY_KEY:
+                show_stats_overlay = not show_stats_overlay
+                bot_worker.set_instrumented(show_stats_overlay)
+            elif event.type == pygame.KEYDOWN and event.key == ANALYSIS_KEY:
+                show_analysis = not show_analysis
+            elif event.type == pygame.KEYDOWN and event.key == HINT_KEY:
+                show_hint = game_state == STATE_GAME and not bot_game
+            elif event.type == pygame.KEYDOWN and active_input:
+                if event.key == pygame.K_BACKSPACE:
+                    if active_input == "player1":
+                        player1_name = player1_name[:-1]
+                    elif active_input == "player2":
+                        player2_name = player2_name[:-1]
+                elif event.unicode.isprintable():
+                    if active_input == "player1" and len(player1_name) < 10:
+                        player1_name += event.unicode
+                    elif active_input == "player2" and len(player2_name) < 10:
+                        player2_name += event.unicode
                     
-    if game_state == STATE_GAME and bot_game and current_turn == bot_color:
-        bot_moves()
-
-    if invalid_move_timer and time.time() - invalid_move_timer["start_time"] > 2:
-        invalid_move_timer = None
-
-    if game_state == STATE_MAIN_MENU:
-        draw_main_menu()
-    elif game_state == STATE_PLAYER_SETUP:
-        draw_player_setup()
-    elif game_state == STATE_BOT_SETUP:
-        draw_bot_setup()
-    elif game_state == STATE_DIFFICULTY_SELECTION:
-        draw_difficulty_selection()
-    elif game_state == STATE_GAME:
-        draw_board()
-    elif game_state == STATE_WINNER:
-        draw_winner_screen()
+        if game_state == STATE_GAME and bot_game and current_turn == bot_color:
+            bot_moves()
+        elif bot_worker.searching():
+            # Left the game while the bot was thinking, its move is no longer needed
+            bot_worker.cancel()
+        elif bot_worker.pondering() and not (game_state == STATE_GAME and bot_game):
+            bot_worker.stop_pondering()
+        update_analysis()
+
+        if invalid_move_timer and time.time() - invalid_move_timer["start_time"] > INVALID_MOVE_SECONDS:
+            invalid_move_timer = None
+
+        render_frame()
+
 
-    pygame.display.flip()
+if __name__ == "__main__":
+    main()
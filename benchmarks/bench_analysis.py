@@ -0,0 +1,127 @@
+"""The analysis mode: what a warm start saves, and what the analysis costs the game loop.
+
+Run from the repository root:
+
+    python benchmarks/bench_analysis.py [depth] [seconds]
+
+For every position in positions.fen, analyses it for the three best moves
+to `depth`, plays the best move, and analyses the reply position to the
+same depth twice: with the transposition table and move ordering left by
+the first analysis, the way the bot worker keeps them, and from a fresh
+table. Reports nodes and seconds for both.
+
+Then runs the game loop of a game between two players at the FPS_CAP
+frame rate the game keeps while the analysis is shown, with the panel
+shown, for `seconds` with the analysis running in the bot worker and with
+it stopped: frames per second, the longest frame, the game's CPU share and
+the depth the analysis reached. Uses SDL's dummy video driver
+unless SDL_VIDEODRIVER is set, so it runs without a display.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+import Checkers  # noqa: E402
+import engine  # noqa: E402
+from bench_suite import load_positions  # noqa: E402
+from engine import analyse  # noqa: E402
+from transposition import TranspositionTable  # noqa: E402
+
+LINES = 3
+
+
+def reset_move_ordering():
+    engine.history[:] = [0] * len(engine.history)
+    engine.killer_moves[:] = [[None, None] for _ in range(engine.MAX_PLY)]
+
+
+def timed_analysis(position, depth, table):
+    engine.nodes_searched = 0
+    start = time.perf_counter()
+    analyse(position, LINES, table, max_depth=depth)
+    return engine.nodes_searched, time.perf_counter() - start
+
+
+def warm_start(depth):
+    """Nodes and seconds to analyse each reply position to depth, (warm, cold), summed over the suite."""
+    warm_nodes = cold_nodes = 0
+    warm_seconds = cold_seconds = 0.0
+    count = 0
+    for _, position in load_positions():
+        reset_move_ordering()
+        table = TranspositionTable()
+        _, lines = analyse(position, LINES, table, max_depth=depth)
+        if not lines:
+            continue
+        child = position.copy()
+        child.apply(lines[0][1][0])
+        if not child.generate_moves():
+            continue
+        nodes, seconds = timed_analysis(child, depth, table)
+        warm_nodes, warm_seconds = warm_nodes + nodes, warm_seconds + seconds
+        reset_move_ordering()
+        nodes, seconds = timed_analysis(child, depth, TranspositionTable())
+        cold_nodes, cold_seconds = cold_nodes + nodes, cold_seconds + seconds
+        count += 1
+    return count, (warm_nodes, warm_seconds), (cold_nodes, cold_seconds)
+
+
+def run_loop(seconds, analysing):
+    """Frames per second, longest frame in ms, CPU share and analysis depth of the game loop."""
+    Checkers.initialize_board()
+    Checkers.player1_name, Checkers.player2_name = "Alice", "Bob"
+    Checkers.current_turn = Checkers.BLACK if Checkers.variant.black_moves_first else Checkers.RED
+    Checkers.bot_game = False
+    Checkers.show_analysis = True
+    Checkers.game_state = Checkers.STATE_GAME
+    Checkers.full_redraw_needed = True
+    frames, longest = 0, 0.0
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    while time.perf_counter() - wall_start < seconds:
+        frame_start = time.perf_counter()
+        # What wait_for_events() does while the screen is animating
+        Checkers.clock.tick(Checkers.FPS_CAP)
+        pygame.event.get()
+        if analysing:
+            Checkers.update_analysis()
+        Checkers.render_frame()
+        longest = max(longest, time.perf_counter() - frame_start)
+        frames += 1
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    analysis = Checkers.bot_worker.analysis_lines()
+    Checkers.game_state = Checkers.STATE_MAIN_MENU
+    Checkers.update_analysis()
+    return frames / wall, longest * 1000, 100 * cpu / wall, analysis[0] if analysis else 0
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 9
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+
+    count, (warm_nodes, warm_seconds), (cold_nodes, cold_seconds) = warm_start(depth)
+    print(f"{count} reply positions analysed to depth {depth}, {LINES} lines")
+    print(f"{'':<22}{'nodes':>12}{'seconds':>10}")
+    print(f"{'fresh table':<22}{cold_nodes:>12,}{cold_seconds:>10.2f}")
+    print(f"{'table from parent':<22}{warm_nodes:>12,}{warm_seconds:>10.2f}"
+          f"   {1 - warm_nodes / cold_nodes:.0%} fewer nodes")
+
+    Checkers.init_display()
+    print(f"\ngame loop for {seconds:.1f}s, analysis panel shown, video driver {pygame.display.get_driver()}:")
+    try:
+        for name, analysing in (("analysis stopped", False), ("analysis running", True)):
+            rate, longest, cpu, reached = run_loop(seconds, analysing)
+            print(f"  {name:<18}{rate:7.1f} frames/s  longest frame {longest:6.1f} ms  {cpu:5.1f}% CPU"
+                  f"{f'  depth {reached}' if analysing else ''}")
+    finally:
+        Checkers.bot_worker.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Check the bitboard move generator against known perft counts, then compare
+its speed with the old list-of-lists board.
+
+Run from the repository root:
+
+    python benchmarks/bench_bitboard.py [depth]
+
+PERFT_REFERENCE holds the published English draughts perft counts from the
+starting position; CAPTURE_CASES are small positions whose moves were worked
+out by hand, covering multi-jumps, promotion ending a jump sequence and a king
+jumping round to the square it started on.
+
+The legacy functions below are the make_move / get_valid_moves / is_valid_move
+code the bot used before the bitboard, kept as-is (reading the module-level
+``board``) so the comparison measures exactly what was replaced. They play the
+old rules (single jumps, captures not forced), so their node counts differ
+and only the speed is compared.
+"""
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitboard import Position, perft, move_to_text, BLACK_PIECE, RED_PIECE, BLACK_KING, RED_KING  # noqa: E402
+
+BOARD_SIZE = 8
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+board = None
+
+# perft(depth) from the starting position under English draughts rules
+PERFT_REFERENCE = {
+    1: 7, 2: 49, 3: 302, 4: 1469, 5: 7361, 6: 36768, 7: 179740,
+    8: 845931, 9: 3963680, 10: 18391564, 11: 85242128,
+}
+
+# (FEN, the moves allowed there)
+CAPTURE_CASES = [
+    ("B:W6,14:B1", ["1x17"]),                       # double jump, and the single jump isn't a move
+    ("B:W26,27:B22", ["22x31"]),                    # crowned on the far row, so no jump back out
+    ("B:W14,15,22,23:BK10", ["10x10"]),             # king takes four round a square, both ways are one move
+    ("B:W14,18:B9,10,11", ["10x17"]),               # forced capture rules out every step
+    ("W:W18:B14,15", ["18x9", "18x11"]),            # red men capture towards lower squares
+]
+
+
+def is_valid_move(start, end):
+    start_row, start_col = start
+    end_row, end_col = end
+    piece = board[start_row][start_col]
+    direction = 1 if piece in [BLACK_PIECE, BLACK_KING] else -1
+    king_piece = (piece == BLACK_KING or piece == RED_KING)
+    if abs(start_col - end_col) != abs(start_row - end_row):
+        return False
+    if abs(start_row - end_row) == 1 and board[end_row][end_col] is None:
+        if piece in [BLACK_PIECE, RED_PIECE] and end_row - start_row != direction:
+            return False
+        return True
+    elif abs(start_row - end_row) == 2:
+        mid_row = (start_row + end_row) // 2
+        mid_col = (start_col + end_col) // 2
+        mid_piece = board[mid_row][mid_col]
+        if mid_piece and (piece in [BLACK_PIECE, BLACK_KING] and mid_piece in [RED_PIECE, RED_KING]) or \
+           (piece in [RED_PIECE, RED_KING] and mid_piece in [BLACK_PIECE, BLACK_KING]):
+            if not king_piece and (end_row - start_row != 2 * direction):
+                return False
+            if board[end_row][end_col] is None:
+                return True
+    return False
+
+
+def get_valid_moves(color):
+    valid_moves = []
+    for row in range(BOARD_SIZE):
+        for col in range(BOARD_SIZE):
+            piece = board[row][col]
+            if piece and ((piece in [BLACK_PIECE, BLACK_KING] and color == BLACK) or (piece in [RED_PIECE, RED_KING] and color == RED)):
+                for dr, dc in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
+                    new_row, new_col = row + dr, col + dc
+                    if 0 <= new_row < BOARD_SIZE and 0 <= new_col < BOARD_SIZE:
+                        if board[new_row][new_col] is None and is_valid_move((row, col), (new_row, new_col)):
+                            valid_moves.append(((row, col), (new_row, new_col)))
+                    new_row, new_col = row + 2*dr, col + 2*dc
+                    if 0 <= new_row < BOARD_SIZE and 0 <= new_col < BOARD_SIZE:
+                        if board[new_row][new_col] is None and is_valid_move((row, col), (new_row, new_col)):
+                            valid_moves.append(((row, col), (new_row, new_col)))
+    return valid_moves
+
+
+def make_move(board, move):
+    new_board = copy.deepcopy(board)
+    (start_row, start_col), (end_row, end_col) = move
+    piece = new_board[start_row][start_col]
+    new_board[start_row][start_col] = None
+    new_board[end_row][end_col] = piece
+    if abs(end_row - start_row) == 2:
+        mid_row = (start_row + end_row) // 2
+        mid_col = (start_col + end_col) // 2
+        new_board[mid_row][mid_col] = None
+    if piece == BLACK_PIECE and end_row == BOARD_SIZE - 1:
+        new_board[end_row][end_col] = BLACK_KING
+    elif piece == RED_PIECE and end_row == 0:
+        new_board[end_row][end_col] = RED_KING
+    return new_board
+
+
+def legacy_perft(depth, color):
+    """Perft over the list board, one deepcopy per node like the old search."""
+    global board
+    if depth == 0:
+        return 1
+    root = board
+    nodes = 0
+    for move in get_valid_moves(color):
+        board = make_move(root, move)
+        nodes += legacy_perft(depth - 1, RED if color == BLACK else BLACK)
+    board = root
+    return nodes
+
+
+def check_rules(depth):
+    """Compare the move generator with the reference counts; returns the number of mismatches."""
+    failures = 0
+    for fen, expected in CAPTURE_CASES:
+        moves = sorted(move_to_text(move) for move in Position.from_fen(fen).generate_moves())
+        if moves != sorted(expected):
+            print(f"{fen}: moves {moves}, expected {sorted(expected)}")
+            failures += 1
+    position = Position.initial()
+    for d in range(1, min(depth, max(PERFT_REFERENCE)) + 1):
+        nodes = perft(position, d)
+        if nodes != PERFT_REFERENCE[d]:
+            print(f"perft({d}) = {nodes}, expected {PERFT_REFERENCE[d]}")
+            failures += 1
+    return failures
+
+
+def main():
+    global board
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+
+    failures = check_rules(depth)
+    if failures:
+        sys.exit(1)
+    print(f"{len(CAPTURE_CASES)} capture positions and perft(1..{min(depth, max(PERFT_REFERENCE))}) match")
+
+    board = Position.initial().to_board()
+    start = time.perf_counter()
+    legacy_nodes = legacy_perft(depth, BLACK)
+    legacy_time = time.perf_counter() - start
+
+    position = Position.initial()
+    start = time.perf_counter()
+    bitboard_nodes = perft(position, depth)
+    bitboard_time = time.perf_counter() - start
+
+    print(f"list board (old rules): {legacy_nodes:>10} nodes {legacy_time:8.3f}s "
+          f"{legacy_nodes / legacy_time:12,.0f} nodes/s")
+    print(f"bitboard:               {bitboard_nodes:>10} nodes {bitboard_time:8.3f}s "
+          f"{bitboard_nodes / bitboard_time:12,.0f} nodes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Checks, speed and playing strength of the evaluation in evaluation.py.
+
+Run from the repository root:
+
+    python benchmarks/bench_evaluation.py [games] [seconds per move] [opponent weights file]
+
+First checks that the running score sum Position.apply()/undo() keep matches
+one worked out from scratch, and that the NumPy batch evaluation gives the
+same scores as evaluating one position at a time. Then times both ways of
+evaluating, and plays paired games at a fixed time per move between the
+current weights and material only (the evaluation before this module), or
+the weights in another file, such as ones written by tuning.py.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+import evaluation  # noqa: E402
+from bitboard import Position  # noqa: E402
+from engine import BLACK, RED, iterative_deepening  # noqa: E402
+from tournament import REPETITION_LIMIT, elo_difference  # noqa: E402
+from transposition import TranspositionTable  # noqa: E402
+
+MATERIAL_ONLY = dict(evaluation.DEFAULT_WEIGHTS, back_rank=0, centre=0, king_tempo=0, mobility=0, runaway=0)
+OPENING_PLIES = 6
+MAX_PLIES = 200
+
+
+def sample_positions(count, seed=0):
+    """Positions from random games, each reached by apply() and the odd undo() and replay."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position = Position.initial()
+        for _ in range(rng.randint(0, 100)):
+            moves = position.generate_moves()
+            if not moves:
+                break
+            move = rng.choice(moves)
+            kings = position.apply(move)
+            if rng.random() < 0.2:
+                position.undo(move, kings)
+                position.apply(move)
+        positions.append(position)
+    return positions
+
+
+def check(positions):
+    """Count positions whose running score or batch evaluation disagree with a fresh one."""
+    wrong_sums = sum(1 for p in positions if p.score != p.compute_score())
+    batch = evaluation.evaluate_batch([p.black for p in positions], [p.red for p in positions],
+                                      [p.kings for p in positions])
+    wrong_batch = sum(1 for p, score in zip(positions, batch) if evaluation.evaluate(p) / 1000 != score)
+    return wrong_sums, wrong_batch
+
+
+def play(players, seed):
+    """One game between weight sets; players maps a color to its weights. Returns the winner or None."""
+    rng = random.Random(seed)
+    position = Position.initial()
+    tables = {BLACK: TranspositionTable(), RED: TranspositionTable()}
+    seen = {position.hash: 1}
+    for ply in range(MAX_PLIES):
+        color = BLACK if position.black_to_move else RED
+        moves = position.generate_moves()
+        if not moves:
+            return engine.opponent(color)
+        if ply < OPENING_PLIES:
+            move = rng.choice(moves)
+        else:
+            evaluation.set_weights(players[color])
+            position.score = position.compute_score()
+            _, move, _ = iterative_deepening(position, color, players['time'], 30, tables[color])
+        position.apply(move)
+        seen[position.hash] = seen.get(position.hash, 0) + 1
+        if seen[position.hash] >= REPETITION_LIMIT:
+            return None
+    return None
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    time_budget = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    weights = dict(evaluation.weights)
+    if len(sys.argv) > 3:
+        opponent, opponent_name = evaluation.load_weights(sys.argv[3]), sys.argv[3]
+    else:
+        opponent, opponent_name = MATERIAL_ONLY, "material only"
+
+    positions = sample_positions(2000)
+    wrong_sums, wrong_batch = check(positions)
+    print(f"{len(positions)} positions: {wrong_sums} running sums and {wrong_batch} batch scores wrong")
+    if wrong_sums or wrong_batch:
+        sys.exit(1)
+
+    for name, values in (("material only", MATERIAL_ONLY), ("current weights", weights)):
+        evaluation.set_weights(values)
+        for p in positions:
+            p.score = p.compute_score()
+        start = time.perf_counter()
+        for p in positions:
+            engine.evaluate_board(p, BLACK)
+        elapsed = time.perf_counter() - start
+        print(f"evaluate_board, {name + ':':<17}{elapsed * 1e6 / len(positions):6.2f} us/position")
+    masks = ([p.black for p in positions], [p.red for p in positions], [p.kings for p in positions])
+    evaluation.evaluate_batch(*masks)
+    start = time.perf_counter()
+    evaluation.evaluate_batch(*masks)
+    elapsed = time.perf_counter() - start
+    print(f"evaluate_batch, {len(positions)} at once: {elapsed * 1e6 / len(positions):6.2f} us/position")
+
+    wins = draws = losses = 0
+    for game in range(games):
+        players = {BLACK: weights, RED: opponent} if game % 2 == 0 else {BLACK: opponent, RED: weights}
+        players['time'] = time_budget
+        winner = play(players, game // 2)
+        if winner is None:
+            draws += 1
+        elif players[winner] is weights:
+            wins += 1
+        else:
+            losses += 1
+        print(f"\r{game + 1}/{games} games", end='', file=sys.stderr)
+    print(file=sys.stderr)
+    evaluation.set_weights(weights)
+    elo = elo_difference(wins, draws, losses)
+    elo_text = "n/a" if elo is None or elo[0] is None else f"{elo[0]:+.0f}"
+    print(f"current weights vs {opponent_name}, {time_budget}s per move: "
+          f"{wins} wins, {draws} draws, {losses} losses, Elo {elo_text}")
+
+
+if __name__ == "__main__":
+    main()
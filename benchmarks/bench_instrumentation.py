@@ -0,0 +1,93 @@
+"""What the search instrumentation costs, switched off and on, and what it reports.
+
+Run from the repository root:
+
+    python benchmarks/bench_instrumentation.py [depth] [rounds]
+
+Searches every position in positions.fen to a fixed depth with
+iterative_deepening, a fresh transposition table per position, and reports
+the best nodes/s of several rounds:
+
+- with engine.search_stats None, the default
+- with a SearchStats filled in
+- with a SearchStats running the trace exporter and the sampling profiler
+
+Then prints the statistics of the whole run, the functions the profiler
+found the search in most often, and the size of the trace written.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+from bench_suite import load_positions, side_to_move  # noqa: E402
+from engine import iterative_deepening  # noqa: E402
+from search_stats import SamplingProfiler, SearchStats, TraceExporter  # noqa: E402
+from transposition import TranspositionTable  # noqa: E402
+
+
+def run(positions, depth, stats):
+    """Search every position; returns (nodes, seconds) and leaves stats summed over the run in `total`."""
+    engine.search_stats = stats
+    total = SearchStats()
+    nodes, elapsed = 0, 0.0
+    for position, color in positions:
+        engine.nodes_searched = 0
+        engine.history[:] = [0] * len(engine.history)
+        start = time.perf_counter()
+        iterative_deepening(position, color, 1e9, depth, TranspositionTable())
+        elapsed += time.perf_counter() - start
+        nodes += engine.nodes_searched
+        if stats is not None:
+            total.merge(stats)
+            total.nodes += stats.nodes
+            total.quiescence_nodes += stats.quiescence_nodes
+            total.elapsed += stats.elapsed
+            total.depth = max(total.depth, stats.depth)
+    engine.search_stats = None
+    return nodes, elapsed, total
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    positions = [(position, side_to_move(position)) for _, position in load_positions()]
+
+    trace, profiler = TraceExporter(), SamplingProfiler()
+    modes = [("off", lambda: None), ("stats", SearchStats), ("stats + trace + profiler",
+                                                            lambda: SearchStats([trace, profiler]))]
+    print(f"{len(positions)} positions to depth {depth}, best of {rounds}")
+    print(f"{'instrumentation':<28}{'nodes':>10}{'nodes/s':>10}{'vs off':>8}")
+    baseline = None
+    totals = {}
+    for name, make in modes:
+        best = None
+        for _ in range(rounds):
+            nodes, elapsed, totals[name] = run(positions, depth, make())
+            best = max(best or 0, nodes / elapsed)
+        baseline = baseline or best
+        print(f"{name:<28}{nodes:>10,}{best:>10,.0f}{best / baseline - 1:>+8.1%}")
+
+    print()
+    for line in totals["stats"].summary_lines():
+        print(line)
+    print()
+    print("profiler, share of samples by function:")
+    for function, share in profiler.top_functions(8):
+        print(f"  {share:6.1%}  {function}")
+    directory = tempfile.mkdtemp()
+    trace_path, folded_path = os.path.join(directory, "trace.json"), os.path.join(directory, "stacks.folded")
+    trace.save(trace_path)
+    profiler.write_folded(folded_path)
+    print(f"trace: {len(trace.events):,} events, {os.path.getsize(trace_path) / 1024:.0f} KiB; "
+          f"folded stacks: {len(profiler.samples):,} stacks")
+    for path in (trace_path, folded_path):
+        os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Iterative deepening against a single fixed-depth search, and depth reached per time budget.
+
+Run from the repository root:
+
+    python benchmarks/bench_iterative_deepening.py [depth]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+from bench_transposition import test_positions  # noqa: E402
+from engine import BLACK, RED, BOT_SEARCH_SETTINGS, minimax, iterative_deepening  # noqa: E402
+from transposition import TranspositionTable  # noqa: E402
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    positions = test_positions()
+
+    # Same final depth both ways: the shallower iterations should cost less
+    # than the cutoffs their move ordering buys
+    engine.nodes_searched = 0
+    start = time.perf_counter()
+    for position in positions:
+        color = BLACK if position.black_to_move else RED
+        minimax(position.copy(), depth, float('-inf'), float('inf'), True, color, TranspositionTable())
+    direct_nodes, direct_time = engine.nodes_searched, time.perf_counter() - start
+
+    engine.nodes_searched = 0
+    start = time.perf_counter()
+    for position in positions:
+        color = BLACK if position.black_to_move else RED
+        iterative_deepening(position, color, float('inf'), depth, TranspositionTable())
+    deepening_nodes, deepening_time = engine.nodes_searched, time.perf_counter() - start
+
+    print(f"depth {depth}, {len(positions)} positions")
+    print(f"fixed depth:         {direct_nodes:>10,} nodes  {direct_time:7.3f}s")
+    print(f"iterative deepening: {deepening_nodes:>10,} nodes  {deepening_time:7.3f}s")
+
+    print("\ndepth reached per difficulty:")
+    for difficulty, settings in BOT_SEARCH_SETTINGS.items():
+        depths = []
+        slowest = 0.0
+        for position in positions:
+            color = BLACK if position.black_to_move else RED
+            start = time.perf_counter()
+            _, _, reached = iterative_deepening(position, color, settings['time_budget'], settings['max_depth'])
+            slowest = max(slowest, time.perf_counter() - start)
+            depths.append(reached)
+        print(f"  {difficulty:<7} budget {settings['time_budget']:.2f}s: depth {min(depths)}-{max(depths)}, "
+              f"mean {sum(depths) / len(depths):.1f}, slowest move {slowest:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Memory and garbage collector pauses of the search, against the old deepcopy search.
+
+Run from the repository root:
+
+    python benchmarks/bench_memory.py [depth] [seconds per move]
+
+Searches every position in positions.fen three ways:
+
+- the old search: minimax over the list-of-lists board, making a deepcopy
+  of the board for every child (bench_bitboard's legacy functions, old rules)
+- engine.minimax to the same depth, playing moves in place on a Position
+- the hard bot's timed search with its transposition table, one table kept
+  for the whole run like a game
+
+and reports for each the peak memory traced by tracemalloc (in a separate
+run, as tracing slows the search down), how many collections of each
+generation the garbage collector ran, and the total and longest pause.
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_bitboard  # noqa: E402
+import engine  # noqa: E402
+from bench_suite import load_positions, side_to_move  # noqa: E402
+from bitboard import BLACK_KING, BLACK_PIECE, RED_KING, RED_PIECE  # noqa: E402
+from engine import BLACK, iterative_deepening, minimax  # noqa: E402
+from transposition import TranspositionTable  # noqa: E402
+
+PIECE_VALUES = {BLACK_PIECE: 1, BLACK_KING: 1.5, RED_PIECE: -1, RED_KING: -1.5, None: 0}
+
+
+def legacy_minimax(board, depth, alpha, beta, maximizing_player, bot_color):
+    """The search before the bitboard: a new board per child, moves read from bench_bitboard.board."""
+    engine.nodes_searched += 1
+    score = sum(PIECE_VALUES[piece] for row in board for piece in row)
+    score = score if bot_color == BLACK else -score
+    if depth == 0:
+        return score
+    color = bot_color if maximizing_player else engine.opponent(bot_color)
+    bench_bitboard.board = board
+    moves = bench_bitboard.get_valid_moves(color)
+    if not moves:
+        return score
+    best = float('-inf') if maximizing_player else float('inf')
+    for move in moves:
+        child = bench_bitboard.make_move(board, move)
+        eval_score = legacy_minimax(child, depth - 1, alpha, beta, not maximizing_player, bot_color)
+        if maximizing_player:
+            best = max(best, eval_score)
+            alpha = max(alpha, eval_score)
+        else:
+            best = min(best, eval_score)
+            beta = min(beta, eval_score)
+        if beta <= alpha:
+            break
+    return best
+
+
+class PauseTimer:
+    """Times every garbage collection through gc.callbacks while active."""
+
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.pauses = []
+        self.started = None
+
+    def callback(self, phase, info):
+        if phase == "start":
+            self.started = time.perf_counter()
+        elif self.started is not None:
+            self.pauses.append(time.perf_counter() - self.started)
+            self.collections[info["generation"]] += 1
+
+    def __enter__(self):
+        gc.collect()
+        gc.callbacks.append(self.callback)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self.callback)
+
+
+def measure(name, run):
+    """Run the search once for its GC pauses and time, once under tracemalloc for its peak memory."""
+    engine.nodes_searched = 0
+    with PauseTimer() as timer:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+    nodes = engine.nodes_searched
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pauses = timer.pauses
+    print(f"{name:<24}{nodes:>10,}{nodes / elapsed:>10,.0f}{peak / 1024:>10,.0f}"
+          f"{'/'.join(str(n) for n in timer.collections):>14}"
+          f"{sum(pauses) * 1000:>9.1f}{max(pauses, default=0) * 1000:>9.2f}")
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    time_budget = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    positions = [(position, side_to_move(position)) for _, position in load_positions()]
+
+    def old_search():
+        for position, color in positions:
+            legacy_minimax(position.to_board(), depth, float('-inf'), float('inf'), True, color)
+
+    def new_search():
+        for position, color in positions:
+            minimax(position.copy(), depth, float('-inf'), float('inf'), True, color)
+
+    def hard_bot():
+        table = TranspositionTable()
+        for position, color in positions:
+            iterative_deepening(position, color, time_budget, 30, table)
+
+    print(f"{'search':<24}{'nodes':>10}{'nodes/s':>10}{'peak KiB':>10}{'collections':>14}"
+          f"{'GC ms':>9}{'max ms':>9}")
+    measure(f"deepcopy, depth {depth}", old_search)
+    measure(f"make/unmake, depth {depth}", new_search)
+    measure(f"hard bot, {time_budget}s", hard_bot)
+
+
+if __name__ == "__main__":
+    main()
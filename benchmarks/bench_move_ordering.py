@@ -0,0 +1,74 @@
+"""Nodes and effective branching factor of the search with and without move ordering.
+
+Run from the repository root:
+
+    python benchmarks/bench_move_ordering.py [depth]
+
+Searches every position in positions.fen by iterative deepening to `depth`,
+with a transposition table like the hard bot, once with only the table's
+best move first (the search before move ordering) and once with
+engine.order_moves. The effective branching factor of an iteration is its
+node count divided by the previous iteration's, so it shows how much each
+extra ply costs.
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+from bench_suite import load_positions, side_to_move  # noqa: E402
+from engine import minimax  # noqa: E402
+from transposition import TranspositionTable  # noqa: E402
+
+
+def iteration_nodes(positions, depth, ordering):
+    """Nodes searched by each iteration, summed over the positions; returns (nodes per depth, seconds)."""
+    engine.move_ordering = ordering
+    totals = [0] * (depth + 1)
+    start = time.perf_counter()
+    for _, position in positions:
+        if not position.generate_moves():
+            continue
+        table = TranspositionTable()
+        engine.age_move_ordering()
+        color = side_to_move(position)
+        for d in range(1, depth + 1):
+            engine.nodes_searched = 0
+            minimax(position.copy(), d, float('-inf'), float('inf'), True, color, table)
+            totals[d] += engine.nodes_searched
+    engine.move_ordering = True
+    return totals, time.perf_counter() - start
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    positions = load_positions()
+
+    plain, plain_time = iteration_nodes(positions, depth, False)
+    ordered, ordered_time = iteration_nodes(positions, depth, True)
+
+    print(f"{'depth':>5}{'nodes':>12}{'EBF':>7}{'ordered':>12}{'EBF':>7}")
+    for d in range(1, depth + 1):
+        plain_ebf = f"{plain[d] / plain[d - 1]:.2f}" if d > 1 else ""
+        ordered_ebf = f"{ordered[d] / ordered[d - 1]:.2f}" if d > 1 else ""
+        print(f"{d:>5}{plain[d]:>12,}{plain_ebf:>7}{ordered[d]:>12,}{ordered_ebf:>7}")
+
+    # Mean branching factor over the deeper iterations, where the tree is big enough to mean something
+    first = min(3, depth)
+    plain_mean = (plain[depth] / plain[first]) ** (1 / max(depth - first, 1))
+    ordered_mean = (ordered[depth] / ordered[first]) ** (1 / max(depth - first, 1))
+    print(f"\nmean EBF, depths {first + 1}-{depth}: {plain_mean:.2f} without ordering, {ordered_mean:.2f} with")
+    print(f"total nodes: {sum(plain):,} without ordering, {sum(ordered):,} with "
+          f"({sum(ordered) / sum(plain):.0%})")
+    print(f"time: {plain_time:.2f}s without ordering, {ordered_time:.2f}s with "
+          f"({sum(plain) / plain_time:,.0f} and {sum(ordered) / ordered_time:,.0f} nodes/s)")
+    if plain_mean > 1 and ordered_mean > 1:
+        print(f"plies gained in the same nodes at depth {depth}: "
+              f"{depth * (math.log(plain_mean) / math.log(ordered_mean) - 1):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Opening book lookups against searching the same positions.
+
+Run from the repository root after building a book with opening_book.py:
+
+    python benchmarks/bench_opening_book.py [book file] [difficulty]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitboard import Position  # noqa: E402
+from engine import BLACK, RED, BOT_SEARCH_SETTINGS, choose_move  # noqa: E402
+from opening_book import DEFAULT_BOOK_PATH, OpeningBook  # noqa: E402
+
+
+def book_positions(book, limit):
+    """Positions reachable from the start by book moves, breadth first."""
+    positions = [Position.initial()]
+    seen = {positions[0].hash}
+    for position in positions:
+        if len(positions) >= limit:
+            break
+        for move, _ in book.lookup(position):
+            child = position.copy()
+            child.apply(move)
+            if child.hash not in seen and book.lookup(child):
+                seen.add(child.hash)
+                positions.append(child)
+    return positions[:limit]
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BOOK_PATH
+    difficulty = sys.argv[2] if len(sys.argv) > 2 else "hard"
+
+    start = time.perf_counter()
+    book = OpeningBook(path)
+    open_time = time.perf_counter() - start
+    print(f"{path}: {book.count} moves, {os.path.getsize(path):,} bytes, opened in {open_time * 1e6:.0f} us")
+
+    positions = book_positions(book, 2000)
+    repeats = 20
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for position in positions:
+            book.choose(position)
+    lookup_time = (time.perf_counter() - start) / (repeats * len(positions))
+    print(f"book move:   {lookup_time * 1e6:8.1f} us per position ({len(positions)} book positions)")
+
+    sample = positions[:10]
+    start = time.perf_counter()
+    for position in sample:
+        choose_move(position, BLACK if position.black_to_move else RED, difficulty)
+    search_time = (time.perf_counter() - start) / len(sample)
+    print(f"{difficulty} search: {search_time * 1e6:8.0f} us per position "
+          f"(budget {BOT_SEARCH_SETTINGS[difficulty]['time_budget']}s, {len(sample)} positions)")
+    book.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Speedup of the parallel root search against the number of worker processes.
+
+Run from the repository root:
+
+    python benchmarks/bench_parallel.py [depth] [max_workers] [seed]
+
+Every worker count searches the same positions to a fixed depth twice; the
+moves chosen must be identical across runs and across worker counts.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+from bench_transposition import test_positions  # noqa: E402
+from engine import BLACK, RED, minimax  # noqa: E402
+from parallel_search import ParallelSearcher  # noqa: E402
+from transposition import TranspositionTable  # noqa: E402
+
+
+def run(searcher, positions, depth, seed):
+    engine.nodes_searched = 0
+    start = time.perf_counter()
+    moves = []
+    for position in positions:
+        color = BLACK if position.black_to_move else RED
+        moves.append(searcher.search(position, color, depth, seed)[1])
+    return moves, engine.nodes_searched, time.perf_counter() - start
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    positions = test_positions(10)
+
+    engine.nodes_searched = 0
+    start = time.perf_counter()
+    for position in positions:
+        color = BLACK if position.black_to_move else RED
+        minimax(position.copy(), depth, float('-inf'), float('inf'), True, color, TranspositionTable())
+    serial_time = time.perf_counter() - start
+    print(f"depth {depth}, {len(positions)} positions, {os.cpu_count()} CPUs")
+    print(f"serial minimax:  {engine.nodes_searched:>10,} nodes  {serial_time:7.2f}s")
+
+    reference = None
+    base_time = None
+    worker_counts = sorted({1, 2, 4, 8, 16, max_workers} & set(range(1, max_workers + 1)))
+    for workers in worker_counts:
+        searcher = ParallelSearcher(workers)
+        moves, nodes, elapsed = run(searcher, positions, depth, seed)
+        repeat, _, _ = run(searcher, positions, depth, seed)
+        searcher.shutdown()
+        if base_time is None:
+            base_time = elapsed
+        if reference is None:
+            reference = moves
+        deterministic = moves == repeat == reference
+        print(f"{workers:>2} workers:     {nodes:>10,} nodes  {elapsed:7.2f}s  "
+              f"speedup {base_time / elapsed:4.2f}x  deterministic: {'yes' if deterministic else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
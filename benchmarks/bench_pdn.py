@@ -0,0 +1,134 @@
+"""PDN archives: how fast they are written, read and replayed, the reader's memory, and batch analysis.
+
+Run from the repository root:
+
+    python benchmarks/bench_pdn.py [games] [analysed games] [depth]
+
+Writes an archive of random games with the comments the game records (the
+seconds since the start on every move, the search figures on every other
+one) to a temporary file. Then reads it back with read_games(), checking
+every game comes back as it was written, replays every position, and
+measures the reader's peak memory under tracemalloc against the size of
+the file. Last, pdn.py's analyse runs over the first games of the archive
+and is compared with searching the same positions in a plain loop, which
+shows what the pool and the incremental output cost.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdn  # noqa: E402
+from bitboard import Position  # noqa: E402
+from pdn import Game, format_comment, move_text, read_games  # noqa: E402
+
+MAX_PLIES = 120
+
+
+def random_game(rng):
+    position = Position.initial()
+    game = Game({"Event": "Benchmark", "Black": "Random", "White": "Random", "GameType": pdn.GAME_TYPE})
+    clock = 0.0
+    for ply in range(MAX_PLIES):
+        moves = position.generate_moves()
+        if not moves:
+            game.headers["Result"] = "0-1" if position.black_to_move else "1-0"
+            break
+        move = rng.choice(moves)
+        clock += rng.uniform(0.5, 10.0)
+        stats = {"source": "search", "score": rng.uniform(-3, 3), "depth": rng.randint(6, 14),
+                 "nodes": rng.randint(10000, 200000), "search": rng.uniform(0.2, 1.0)} if ply % 2 else {}
+        game.moves.append(move_text(position, move))
+        game.comments.append(format_comment(time=clock, **stats))
+        position.apply(move)
+    else:
+        game.headers["Result"] = "*"
+    return game
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    analysed = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    depth = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+    rng = random.Random(0)
+    directory = tempfile.mkdtemp()
+    archive = os.path.join(directory, "games.pdn")
+
+    written = [random_game(rng) for _ in range(games)]
+    start = time.perf_counter()
+    with open(archive, "w") as pdn_file:
+        for game in written:
+            pdn_file.write(game.to_pdn())
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(archive) / 2 ** 20
+    plies = sum(len(game.moves) for game in written)
+    print(f"archive: {games} games, {plies} moves, {size:.1f} MiB")
+    print(f"write:   {elapsed:.2f}s, {size / elapsed:.1f} MiB/s")
+
+    start = time.perf_counter()
+    count = 0
+    for game, original in zip(read_games(archive), written):
+        assert game.moves == original.moves and game.comments == original.comments, count
+        assert game.headers == original.headers, count
+        count += 1
+    elapsed = time.perf_counter() - start
+    assert count == games
+    print(f"read:    {elapsed:.2f}s, {size / elapsed:.1f} MiB/s, {games / elapsed:,.0f} games/s")
+
+    start = time.perf_counter()
+    positions = sum(1 for game in read_games(archive) for _ in game.positions())
+    elapsed = time.perf_counter() - start
+    print(f"replay:  {elapsed:.2f}s, {positions / elapsed:,.0f} positions/s ({positions} positions)")
+
+    del written
+    tracemalloc.start()
+    for game in read_games(archive):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"reader peak memory: {peak / 1024:.0f} KiB for a {size:.1f} MiB file")
+
+    sample = os.path.join(directory, "sample.pdn")
+    with open(sample, "w") as pdn_file:
+        for game, _ in zip(read_games(archive), range(analysed)):
+            pdn_file.write(game.to_pdn())
+    tasks = [(game_number, ply, (p.black, p.red, p.kings, p.black_to_move), depth)
+             for game_number, game in enumerate(read_games(sample)) for ply, p in game.positions()]
+    pdn._init_worker()
+    start = time.perf_counter()
+    for task in tasks:
+        pdn._analyse_position(task)
+    loop = time.perf_counter() - start
+    print(f"analysis, depth {depth}, {len(tasks)} positions:")
+    print(f"  plain loop             {loop:6.2f}s {len(tasks) / loop:8.1f} positions/s")
+    for workers in sorted({1, os.cpu_count() or 1}):
+        output = os.path.join(directory, f"scores{workers}.jsonl")
+        start = time.perf_counter()
+        pdn.analyse(sample, output, depth, workers)
+        elapsed = time.perf_counter() - start
+        with open(output) as output_file:
+            lines = sum(1 for _ in output_file)
+        assert lines == len(tasks)
+        print(f"  analyse, {workers} worker{'s' if workers > 1 else ' '}     "
+              f"{elapsed:6.2f}s {len(tasks) / elapsed:8.1f} positions/s")
+
+    # Resuming: cut the output in the middle of a line, the rest is searched again
+    output = os.path.join(directory, "scores1.jsonl")
+    with open(output, "rb+") as output_file:
+        output_file.truncate(os.path.getsize(output) // 2)
+    pdn.analyse(sample, output, depth, 1)
+    with open(output) as output_file:
+        resumed = [line for line in output_file]
+    assert len(resumed) == len(tasks) and all(line.endswith("}\n") for line in resumed)
+    print(f"  resumed from half the output: {len(resumed)} lines, as many as positions")
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Pondering: how often it guesses the human's reply, what that saves, and what it costs the UI.
+
+Run from the repository root:
+
+    python benchmarks/bench_ponder.py [games] [bot moves per game] [human seconds per move]
+
+Plays the hard bot through BotWorker, the way the game does, against a
+stand-in human: the medium bot's move, played after the human's thinking
+time. Everything runs in a loop capped at 60 frames a second like the game
+loop, and every BotWorker call is timed as part of its frame. Each game is
+played once with pondering and once without, from the same random opening.
+
+Reports how often the bot predicted the human's move, how long the human
+waited for each bot reply, and the longest time a BotWorker call held up a
+frame.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+from bitboard import Position  # noqa: E402
+from bot_worker import BotWorker  # noqa: E402
+from engine import BLACK, RED, BOT_SEARCH_SETTINGS, choose_move  # noqa: E402
+
+FRAME_SECONDS = 1 / 60
+OPENING_PLIES = 6
+
+
+def play(seed, bot_moves, human_seconds):
+    """One game; returns (bot reply times, predicted human moves, human moves, longest BotWorker call)."""
+    rng = random.Random(seed)
+    position = Position.initial()
+    for _ in range(OPENING_PLIES):
+        position.apply(rng.choice(position.generate_moves()))
+    bot_color = BLACK if position.black_to_move else RED
+    worker = BotWorker()
+    replies, predicted, human_moves, longest_call = [], 0, 0, 0.0
+    ponder_future = human_move = None
+    try:
+        while len(replies) < bot_moves and position.generate_moves():
+            call = time.perf_counter()
+            worker.start(position.to_board(), bot_color, 'hard')
+            started = time.perf_counter()
+            longest_call = max(longest_call, started - call)
+            move = None
+            while move is None:
+                time.sleep(FRAME_SECONDS)
+                call = time.perf_counter()
+                move = worker.poll()
+                longest_call = max(longest_call, time.perf_counter() - call)
+            replies.append(time.perf_counter() - started)
+            # The pondering ran before the search, so it has returned its guess by now
+            if ponder_future is not None and not ponder_future.cancelled() and ponder_future.result() == human_move:
+                predicted += 1
+            position.apply(move)
+            if not position.generate_moves():
+                break
+
+            call = time.perf_counter()
+            worker.ponder(position.to_board(), bot_color, 'hard')
+            longest_call = max(longest_call, time.perf_counter() - call)
+            ponder_future = worker.ponder_future
+            human_move = choose_move(position, engine.opponent(bot_color), 'medium', rng=rng)
+            thinking_until = time.perf_counter() + human_seconds
+            while time.perf_counter() < thinking_until:
+                time.sleep(FRAME_SECONDS)
+            position.apply(human_move)
+            human_moves += 1
+    finally:
+        worker.shutdown()
+    return replies, predicted, human_moves, longest_call
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    bot_moves = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    human_seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+    budget = BOT_SEARCH_SETTINGS['hard']['time_budget']
+
+    print(f"hard bot, {budget}s budget; human thinks {human_seconds}s per move")
+    print(f"{'':<18}{'predicted':>10}{'mean reply s':>14}{'instant replies':>17}{'longest call ms':>17}")
+    for ponder in (False, True):
+        BOT_SEARCH_SETTINGS['hard']['ponder'] = ponder
+        replies, predicted, human_moves, longest_call = [], 0, 0, 0.0
+        for game in range(games):
+            game_replies, game_predicted, game_human_moves, game_longest = play(game, bot_moves, human_seconds)
+            replies += game_replies
+            predicted += game_predicted
+            human_moves += game_human_moves
+            longest_call = max(longest_call, game_longest)
+            print(f"\r{game + 1}/{games} games", end='', file=sys.stderr)
+        print(file=sys.stderr)
+        instant = sum(1 for seconds in replies if seconds < budget / 4)
+        prediction = f"{predicted}/{human_moves}" if ponder else "-"
+        print(f"{'pondering' if ponder else 'no pondering':<18}{prediction:>10}"
+              f"{sum(replies) / len(replies):>14.2f}{f'{instant}/{len(replies)}':>17}{longest_call * 1000:>17.2f}")
+    BOT_SEARCH_SETTINGS['hard']['ponder'] = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Quiescence search at a low depth against a deeper search without it.
+
+Run from the repository root:
+
+    python benchmarks/bench_quiescence.py [games] [quiescence depth] [plain depth] [seconds per move]
+
+Plays games between a fixed-depth search with quiescence (default depth 5)
+and one without it searching deeper (default depth 7), in pairs from the
+same random opening with colors swapped, like tournament.py. Then does the
+same at equal depth, to show what quiescence alone is worth, and with both
+sides on the same time budget (default 0.1s per move), the way the bots
+play. Reports W/D/L with the Elo difference and the time and nodes each
+side spent per move.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+from bitboard import Position  # noqa: E402
+from engine import BLACK, RED, iterative_deepening  # noqa: E402
+from tournament import REPETITION_LIMIT, elo_difference  # noqa: E402
+from transposition import TranspositionTable  # noqa: E402
+
+OPENING_PLIES = 6
+MAX_PLIES = 200
+
+
+def play(players, seed):
+    """Play one game; players maps a color to (depth, quiescence, time budget).
+
+    Returns the winning color or None, and each color's stats.
+    """
+    rng = random.Random(seed)
+    position = Position.initial()
+    tables = {BLACK: TranspositionTable(), RED: TranspositionTable()}
+    stats = {BLACK: [0, 0, 0.0], RED: [0, 0, 0.0]}  # moves, nodes, seconds
+    seen = {position.hash: 1}
+    for ply in range(MAX_PLIES):
+        color = BLACK if position.black_to_move else RED
+        moves = position.generate_moves()
+        if not moves:
+            return engine.opponent(color), stats
+        if ply < OPENING_PLIES:
+            move = rng.choice(moves)
+        else:
+            depth, engine.quiescence_search, time_budget = players[color]
+            engine.nodes_searched = 0
+            start = time.perf_counter()
+            _, move, _ = iterative_deepening(position, color, time_budget, depth, tables[color])
+            stats[color][2] += time.perf_counter() - start
+            stats[color][1] += engine.nodes_searched
+            stats[color][0] += 1
+        position.apply(move)
+        seen[position.hash] = seen.get(position.hash, 0) + 1
+        if seen[position.hash] >= REPETITION_LIMIT:
+            break
+    return None, stats
+
+
+def match(first, second, games):
+    """Play games between two (depth, quiescence, time budget) players; prints and returns the first player's W/D/L."""
+    wins = draws = losses = 0
+    totals = {first: [0, 0, 0.0], second: [0, 0, 0.0]}
+    for game in range(games):
+        # Each opening is played twice, with the colors swapped
+        players = {BLACK: first, RED: second} if game % 2 == 0 else {BLACK: second, RED: first}
+        winner, stats = play(players, game // 2)
+        for color, player in players.items():
+            totals[player] = [a + b for a, b in zip(totals[player], stats[color])]
+        if winner is None:
+            draws += 1
+        elif players[winner] == first:
+            wins += 1
+        else:
+            losses += 1
+        print(f"\r{game + 1}/{games} games", end='', file=sys.stderr)
+    print(file=sys.stderr)
+
+    def name(player):
+        depth, quiescence, time_budget = player
+        limit = f"{time_budget}s" if time_budget != float('inf') else f"depth {depth}"
+        return f"{limit}{' + quiescence' if quiescence else ''}"
+
+    elo = elo_difference(wins, draws, losses)
+    elo_text = "n/a" if elo is None or elo[0] is None else f"{elo[0]:+.0f}"
+    print(f"{name(first)} vs {name(second)}: {wins} wins, {draws} draws, {losses} losses, Elo {elo_text}")
+    for player in (first, second):
+        moves, nodes, seconds = totals[player]
+        moves = max(moves, 1)
+        print(f"  {name(player):<24}{nodes / moves:>10,.0f} nodes/move{seconds * 1000 / moves:>9.1f} ms/move")
+    return wins, draws, losses
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    low = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    high = int(sys.argv[3]) if len(sys.argv) > 3 else 7
+    time_budget = float(sys.argv[4]) if len(sys.argv) > 4 else 0.1
+    unlimited = float('inf')
+
+    match((low, True, unlimited), (high, False, unlimited), games)
+    match((low, True, unlimited), (low, False, unlimited), games)
+    match((30, True, time_budget), (30, False, time_budget), games)
+    engine.quiescence_search = True
+
+
+if __name__ == "__main__":
+    main()
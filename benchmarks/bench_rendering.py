@@ -0,0 +1,179 @@
+"""Frame time and CPU use of the game screens.
+
+Compares full redraws of the game screen against dirty rectangles, and the
+menus with and without the text surface cache.
+
+Run from the repository root:
+
+    python benchmarks/bench_rendering.py [frames] [seconds]
+
+Uses SDL's dummy video driver unless SDL_VIDEODRIVER is set, so it runs
+without a display. The dummy driver makes flip() and update() nearly free;
+on a real display the full redraw also pays for pushing the whole screen.
+Every dirty-rectangle frame is checked against a full redraw of the same
+state, pixel for pixel.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+import Checkers  # noqa: E402
+from bitboard import Position  # noqa: E402
+from surface_cache import TextCache  # noqa: E402
+
+
+def new_game():
+    Checkers.initialize_board()
+    Checkers.player1_name, Checkers.player2_name = "Alice", "Bob"
+    Checkers.current_turn = Checkers.BLACK
+    Checkers.bot_game = False
+    Checkers.invalid_move_timer = None
+    Checkers.game_state = Checkers.STATE_GAME
+
+
+def play_random_move(rng):
+    """Play one random legal move on the game board, starting a new game when it is over."""
+    position = Position.from_board(Checkers.board, black_to_move=(Checkers.current_turn == Checkers.BLACK))
+    moves = position.generate_moves()
+    if not moves:
+        new_game()
+        return
+    position.apply(rng.choice(moves))
+    Checkers.board = position.to_board()
+    Checkers.switch_turn()
+
+
+def flag_invalid_move(rng):
+    Checkers.invalid_move_timer = {"position": (rng.randrange(8), rng.randrange(8)), "start_time": time.time()}
+
+
+def full_frame():
+    Checkers.draw_board()
+    pygame.display.flip()
+
+
+def time_frames(render, change, frames, check=False):
+    """Average wall and CPU milliseconds per frame; optionally compare each frame with a full redraw."""
+    rng = random.Random(0)
+    new_game()
+    Checkers.full_redraw_needed = True
+    render()
+    mismatches = 0
+    wall = cpu = 0.0
+    for _ in range(frames):
+        change(rng)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        render()
+        wall += time.perf_counter() - wall_start
+        cpu += time.process_time() - cpu_start
+        if check:
+            shown = Checkers.screen.copy()
+            Checkers.draw_board()
+            mismatches += pygame.image.tobytes(shown, "RGB") != pygame.image.tobytes(Checkers.screen, "RGB")
+            # Carry on from what render() drew, so differences would add up rather than be painted over
+            Checkers.screen.blit(shown, (0, 0))
+    return wall * 1000 / frames, cpu * 1000 / frames, mismatches
+
+
+def time_menus(frames):
+    """Milliseconds per frame of each menu screen, drawn and flipped."""
+    screens = [
+        (Checkers.STATE_MAIN_MENU, Checkers.draw_main_menu),
+        (Checkers.STATE_PLAYER_SETUP, Checkers.draw_player_setup),
+        (Checkers.STATE_BOT_SETUP, Checkers.draw_bot_setup),
+        (Checkers.STATE_DIFFICULTY_SELECTION, Checkers.draw_difficulty_selection),
+    ]
+    times = []
+    for state, draw in screens:
+        Checkers.game_state = state
+        start = time.perf_counter()
+        for _ in range(frames):
+            draw()
+            pygame.display.flip()
+        times.append((state, (time.perf_counter() - start) * 1000 / frames))
+    return times
+
+
+def old_loop_iteration():
+    pygame.event.get()
+    full_frame()
+
+
+def new_loop_iteration():
+    Checkers.wait_for_events()
+    Checkers.render_frame()
+
+
+def bot_to_move():
+    # The bot's turn without a search running: the loop keeps animating
+    Checkers.bot_game = True
+    Checkers.bot_color = Checkers.current_turn
+
+
+def run_loop(iteration, seconds, setup=None):
+    """Frames drawn and CPU share of a game loop left running with light input."""
+    new_game()
+    if setup:
+        setup()
+    Checkers.full_redraw_needed = True
+    # Stand-in for a user moving the mouse now and then
+    pygame.time.set_timer(pygame.event.Event(pygame.MOUSEMOTION, pos=(0, 0), rel=(0, 0), buttons=(0, 0, 0)), 100)
+    frames = 0
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    while time.perf_counter() - wall_start < seconds:
+        iteration()
+        frames += 1
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    pygame.time.set_timer(pygame.MOUSEMOTION, 0)
+    return frames / wall, 100 * cpu / wall
+
+
+def main():
+    Checkers.init_display()
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    print(f"screen {Checkers.screen_width}x{Checkers.screen_height}, "
+          f"video driver {pygame.display.get_driver()}, {frames} frames per case")
+
+    cases = [
+        ("nothing changed", lambda rng: None),
+        ("one move played", play_random_move),
+        ("invalid move marker", flag_invalid_move),
+    ]
+    print(f"\n{'':<22}{'full redraw':>22}{'dirty rectangles':>22}")
+    for name, change in cases:
+        full_wall, full_cpu, _ = time_frames(full_frame, change, frames)
+        dirty_wall, dirty_cpu, _ = time_frames(Checkers.render_frame, change, frames)
+        _, _, mismatches = time_frames(Checkers.render_frame, change, frames, check=True)
+        print(f"{name:<22}{full_wall:>8.3f} ms {full_cpu:>6.3f} cpu"
+              f"{dirty_wall:>8.3f} ms {dirty_cpu:>6.3f} cpu   "
+              f"{'matches full redraw' if not mismatches else f'{mismatches} FRAMES DIFFER'}")
+
+    cached_text = Checkers.text_cache
+    Checkers.text_cache = TextCache(Checkers.font, size=0)
+    uncached = time_menus(frames)
+    Checkers.text_cache = cached_text
+    cached = time_menus(frames)
+    print(f"\n{'':<22}{'text rendered':>16}{'text cache':>14}")
+    for (state, uncached_ms), (_, cached_ms) in zip(uncached, cached):
+        print(f"{state:<22}{uncached_ms:>13.3f} ms{cached_ms:>11.3f} ms")
+    print(f"text cache: {len(cached_text.surfaces)} surfaces, "
+          f"{cached_text.hits / max(1, cached_text.hits + cached_text.misses):.1%} hits")
+
+    print(f"\ngame loop for {seconds:.1f}s with a mouse event every 100 ms:")
+    for turn, setup in (("human's turn", None), ("bot's turn", bot_to_move)):
+        for name, iteration in (("old", old_loop_iteration), ("new", new_loop_iteration)):
+            rate, cpu = run_loop(iteration, seconds, setup)
+            print(f"  {name} loop, {turn:<13}{rate:9.1f} frames/s  {cpu:5.1f}% CPU")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Node counts and playing strength of the position-aware search against the old one.
+
+Run from the repository root:
+
+    python benchmarks/bench_search_nodes.py [depth] [games]
+
+The old minimax generated moves from the module-level game board at every
+ply instead of from the child it was searching. It is reproduced here on top
+of the legacy list-board code from bench_bitboard.py, with the real game
+position placed in that global before each search, the same way the game did.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_bitboard as legacy  # noqa: E402
+import engine  # noqa: E402
+from bitboard import Position, move_to_rowcol, BLACK_PIECE, RED_PIECE, BLACK_KING, RED_KING  # noqa: E402
+from engine import BLACK, RED, minimax  # noqa: E402
+
+MAX_PLIES = 200
+legacy_nodes = 0
+
+
+def legacy_game_over(board):
+    black_moves = legacy.get_valid_moves(BLACK)
+    red_moves = legacy.get_valid_moves(RED)
+    if not black_moves or not red_moves:
+        return True
+    return False
+
+
+def legacy_evaluate_board(board, bot_color):
+    black_pieces = 0
+    red_pieces = 0
+    for row in board:
+        for piece in row:
+            if piece == BLACK_PIECE:
+                black_pieces += 1
+            elif piece == RED_PIECE:
+                red_pieces += 1
+            elif piece == BLACK_KING:
+                black_pieces += 1.5
+            elif piece == RED_KING:
+                red_pieces += 1.5
+    if bot_color == BLACK:
+        return black_pieces - red_pieces
+    else:
+        return red_pieces - black_pieces
+
+
+def legacy_minimax(board, depth, alpha, beta, maximizing_player, bot_color):
+    global legacy_nodes
+    legacy_nodes += 1
+    if depth == 0 or legacy_game_over(board):
+        return legacy_evaluate_board(board, bot_color), None
+    current_color = bot_color if maximizing_player else (RED if bot_color == BLACK else BLACK)
+    moves = legacy.get_valid_moves(current_color)
+    if not moves:
+        return legacy_evaluate_board(board, bot_color), None
+    best_move = None
+    if maximizing_player:
+        max_eval = float('-inf')
+        for move in moves:
+            new_board = legacy.make_move(board, move)
+            eval_score, _ = legacy_minimax(new_board, depth - 1, alpha, beta, False, bot_color)
+            if eval_score > max_eval:
+                max_eval = eval_score
+                best_move = move
+            alpha = max(alpha, eval_score)
+            if beta <= alpha:
+                break
+        return max_eval, best_move
+    else:
+        min_eval = float('inf')
+        for move in moves:
+            new_board = legacy.make_move(board, move)
+            eval_score, _ = legacy_minimax(new_board, depth - 1, alpha, beta, True, bot_color)
+            if eval_score < min_eval:
+                min_eval = eval_score
+                best_move = move
+            beta = min(beta, eval_score)
+            if beta <= alpha:
+                break
+        return min_eval, best_move
+
+
+def legacy_choose(position, depth):
+    color = BLACK if position.black_to_move else RED
+    legacy.board = position.to_board()
+    _, move = legacy_minimax(legacy.board, depth, float('-inf'), float('inf'), True, color)
+    for candidate in position.generate_moves():
+        if move_to_rowcol(candidate) == move:
+            return candidate
+    # The old search returns no move when the opponent is already blocked, and can pick
+    # a move the forced-capture rules no longer allow
+    return position.generate_moves()[0]
+
+
+def engine_choose(position, depth):
+    color = BLACK if position.black_to_move else RED
+    _, move = minimax(position, depth, float('-inf'), float('inf'), True, color)
+    return move
+
+
+def random_opening(rng, plies=4):
+    position = Position.initial()
+    for _ in range(plies):
+        position.apply(rng.choice(position.generate_moves()))
+    return position
+
+
+def count_nodes(depth, positions):
+    global legacy_nodes
+    print(f"{'depth':>5} {'old nodes':>12} {'new nodes':>12} {'old time':>10} {'new time':>10}")
+    for d in range(1, depth + 1):
+        legacy_nodes = 0
+        engine.nodes_searched = 0
+        legacy_time = engine_time = 0.0
+        for position in positions:
+            start = time.perf_counter()
+            legacy_choose(position, d)
+            legacy_time += time.perf_counter() - start
+            start = time.perf_counter()
+            engine_choose(position.copy(), d)
+            engine_time += time.perf_counter() - start
+        print(f"{d:>5} {legacy_nodes:>12,} {engine.nodes_searched:>12,} {legacy_time:>9.3f}s {engine_time:>9.3f}s")
+
+
+def play_match(depth, games, seed=1):
+    rng = random.Random(seed)
+    wins = draws = losses = 0
+    for game in range(games):
+        position = random_opening(rng)
+        engine_is_black = position.black_to_move if game % 2 == 0 else not position.black_to_move
+        winner = None
+        for _ in range(MAX_PLIES):
+            moves = position.generate_moves()
+            if not moves:
+                winner = "red" if position.black_to_move else "black"
+                break
+            if position.black_to_move == engine_is_black:
+                move = engine_choose(position, depth)
+            else:
+                move = legacy_choose(position, depth)
+            position.apply(move)
+        if winner is None:
+            draws += 1
+        elif (winner == "black") == engine_is_black:
+            wins += 1
+        else:
+            losses += 1
+    return wins, draws, losses
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    rng = random.Random(0)
+    positions = [random_opening(rng, plies) for plies in (0, 4, 8, 12, 16) for _ in range(2)]
+    count_nodes(depth, positions)
+
+    start = time.perf_counter()
+    wins, draws, losses = play_match(depth, games)
+    print(f"\nnew vs old search at depth {depth}, {games} games: "
+          f"{wins} wins, {draws} draws, {losses} losses ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
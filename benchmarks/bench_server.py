@@ -0,0 +1,150 @@
+"""Load test for game_server.py: hundreds of games at once from scripted clients.
+
+Run from the repository root:
+
+    python benchmarks/bench_server.py [--sessions 200] [--connections 20] [--moves 10] [--time 0.02]
+    python benchmarks/bench_server.py --port 8765   # against a server that is already running
+
+Without --port it starts a server in this process on a free port. The
+sessions are spread over the connections, except for one extra connection
+holding a single session, which shows whether the fair queuing keeps a
+small client's waits in line with a busy one's. Every client plays random
+legal moves as soon as it may, for --moves moves per game or until the game
+ends, and times each move from sending it to receiving the bot's reply.
+
+Reports throughput, the clients' latencies, the same figures as the server
+measured them, and the mean latency of each connection.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_server import GameServer, latency_summary  # noqa: E402
+
+
+class Client:
+    """One connection, playing any number of sessions at once."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.replies = {}  # request id -> future
+        self.events = {}  # session -> queue of events
+        self.listener = asyncio.create_task(self.listen())
+
+    async def listen(self):
+        while line := await self.reader.readline():
+            message = json.loads(line)
+            if 'id' in message:
+                self.replies.pop(message['id']).set_result(message)
+            else:
+                self.events.setdefault(message['session'], asyncio.Queue()).put_nowait(message)
+
+    async def request(self, **request):
+        request['id'] = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.replies[request['id']] = future
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        reply = await future
+        if not reply['ok']:
+            raise RuntimeError(reply['error'])
+        return reply
+
+    async def event(self, session):
+        return await self.events.setdefault(session, asyncio.Queue()).get()
+
+    async def play(self, moves, time_budget, seed):
+        """Play one random game against the hard bot; returns the latency of each bot reply."""
+        rng = random.Random(seed)
+        color = rng.choice(('black', 'red'))
+        state = await self.request(op='new', difficulty='hard', color=color, time=time_budget)
+        session = state['session']
+        latencies = []
+        if 'moves' not in state:
+            state = await self.event(session)  # The bot moves first
+        for _ in range(moves):
+            if 'moves' not in state:
+                break  # Game over
+            sent = time.perf_counter()
+            reply = await self.request(op='move', session=session, move=rng.choice(state['moves']))
+            if 'moves' in reply:
+                break  # Can't happen: after our move it is the bot's turn
+            state = await self.event(session)
+            if state['event'] == 'game_over':
+                break
+            latencies.append(time.perf_counter() - sent)
+        await self.request(op='close', session=session)
+        return latencies
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.listener.cancel()
+
+
+async def run(args):
+    server = listener = None
+    port = args.port
+    if port is None:
+        server = GameServer(args.workers, args.max_time)
+        listener = await server.start('127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+
+    connections = [args.sessions // args.connections + (i < args.sessions % args.connections)
+                   for i in range(args.connections)] + [1]
+    clients = [Client(*await asyncio.open_connection(args.host, port)) for _ in connections]
+    start = time.perf_counter()
+    seeds = itertools.count(args.seed * 1000003)
+    games = [[client.play(args.moves, args.time, next(seeds)) for _ in range(count)]
+             for client, count in zip(clients, connections)]
+    results = await asyncio.gather(*(asyncio.gather(*client_games) for client_games in games))
+    elapsed = time.perf_counter() - start
+    stats = await clients[0].request(op='stats')
+    for client in clients:
+        await client.close()
+    if listener is not None:
+        while server.connections:
+            await asyncio.sleep(0.01)  # Let the server see the connections close
+        listener.close()
+        server.close()
+
+    latencies = [latency for client_results in results for game in client_results for latency in game]
+    summary = latency_summary(latencies)
+    print(f"{sum(connections)} games on {len(connections)} connections, {summary['count']} bot replies "
+          f"in {elapsed:.1f}s: {summary['count'] / elapsed:.1f} replies/s, {args.time}s per bot move")
+    server_latency = stats['server']['latency']
+    for name, figures in (("client latency", summary), ("server latency", server_latency)):
+        if figures['count']:
+            print(f"{name:<16}mean {figures['mean']:.3f}s  p50 {figures['p50']:.3f}s  "
+                  f"p95 {figures['p95']:.3f}s  max {figures['max']:.3f}s")
+    means = [sum(lat for game in client_results for lat in game) / max(1, sum(len(game) for game in client_results))
+             for client_results in results]
+    print(f"mean latency per connection: {min(means[:-1]):.3f}s to {max(means[:-1]):.3f}s; "
+          f"single-game connection {means[-1]:.3f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive many games against the game server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="port of a running server; by default one is started here")
+    parser.add_argument("--sessions", type=int, default=200, help="games played at once")
+    parser.add_argument("--connections", type=int, default=20, help="connections the games are spread over")
+    parser.add_argument("--moves", type=int, default=10, help="moves each client plays per game")
+    parser.add_argument("--time", type=float, default=0.02, help="bot seconds per move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="search processes of the server started here")
+    parser.add_argument("--max-time", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
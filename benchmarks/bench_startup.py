@@ -0,0 +1,48 @@
+"""Import and startup time of the engine path against the pygame front end.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [runs]
+
+Each command runs in a fresh interpreter; the median wall time is reported.
+The front end's display is opened with SDL's dummy video driver.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = [
+    ("python (nothing imported)", ["-c", "pass"]),
+    ("import engine", ["-c", "import engine"]),
+    ("checkers_cli.py analyse, depth 1", ["checkers_cli.py", "analyse", "--depth", "1"]),
+    ("import Checkers (no window)", ["-c", "import Checkers"]),
+    ("import Checkers + init_display()", ["-c", "import Checkers; Checkers.init_display()"]),
+]
+
+
+def time_command(args, runs):
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    check = "import sys, engine, checkers_cli; print(','.join(m for m in ('pygame', 'numpy') if m in sys.modules))"
+    loaded = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True, check=True)
+    print(f"modules pulled in by the engine path: {loaded.stdout.strip() or 'no pygame'}")
+    print(f"median of {runs} runs:")
+    for name, args in COMMANDS:
+        print(f"  {name:<36}{time_command(args, runs) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Benchmark suite for the rules and the bot, with the results written as JSON.
+
+Run from the repository root:
+
+    python benchmarks/bench_suite.py [--perft-depth 5] [--search-depth 6] [--output results.json]
+    python benchmarks/bench_suite.py --baseline results.json   # compare with an earlier run
+
+Every test runs on the positions in positions.fen:
+
+- perft to --perft-depth, in nodes per second
+- time per call of the engine's board functions the game calls (get_valid_moves,
+  is_valid_move, make_move) and of evaluate_board
+- a fixed-depth minimax with a transposition table: nodes, nodes per second,
+  and the memory it allocates per node
+- each difficulty's move choice with its own time budget, single process
+
+Only engine code is imported, no pygame, so the suite runs without a display.
+With --baseline, the speeds are compared with an earlier results file and the
+exit status is 1 when any of them dropped by more than --tolerance. Fixed-depth
+node counts that changed are listed too: the same search on the same position
+visits the same nodes, so a change means the search itself changed.
+
+CPython has no counter of every allocation made, so memory is measured two
+ways: the allocated blocks the search leaves behind per node
+(sys.getallocatedblocks, mostly transposition table entries), and the peak
+memory traced by tracemalloc during the search per node.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+from bitboard import Position, move_to_rowcol, perft  # noqa: E402
+from engine import BLACK, RED, BOT_SEARCH_SETTINGS, choose_move, evaluate_board, get_valid_moves, \
+    is_valid_move, iterative_deepening, make_move, minimax  # noqa: E402
+from transposition import TranspositionTable  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_POSITIONS = os.path.join(ROOT, "benchmarks", "positions.fen")
+MIN_TIMING_SECONDS = 0.05  # Each timed call is repeated for at least this long...
+TIMING_ROUNDS = 5  # ...this many times over
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+
+def load_positions(path=DEFAULT_POSITIONS):
+    """Read (name, Position) pairs from a file of "name FEN" lines; # starts a comment."""
+    positions = []
+    with open(path) as positions_file:
+        for line in positions_file:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                name, fen = line.split(None, 1)
+                positions.append((name, Position.from_fen(fen)))
+    return positions
+
+
+def side_to_move(position):
+    return BLACK if position.black_to_move else RED
+
+
+def time_per_call(function):
+    """Seconds per call of function(), the best of TIMING_ROUNDS rounds of at least MIN_TIMING_SECONDS each.
+
+    The best round is the one least disturbed by the rest of the machine, so
+    it is what is compared between runs.
+    """
+    best = None
+    for _ in range(TIMING_ROUNDS):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            function()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= MIN_TIMING_SECONDS:
+                break
+        best = elapsed / calls if best is None else min(best, elapsed / calls)
+    return best
+
+
+def bench_perft(positions, depth):
+    results = []
+    for name, position in positions:
+        nodes = perft(position.copy(), depth)
+        elapsed = time_per_call(lambda: perft(position.copy(), depth))
+        results.append({'position': name, 'depth': depth, 'nodes': nodes, 'seconds': elapsed,
+                        'nodes_per_second': nodes / elapsed})
+    return results
+
+
+def bench_board_functions(positions):
+    """Microseconds per call of the engine functions the game runs on its list board."""
+    totals = {'get_valid_moves': 0.0, 'is_valid_move': 0.0, 'make_move': 0.0, 'evaluate_board': 0.0}
+    for _, position in positions:
+        board = position.to_board()
+        color = side_to_move(position)
+        moves = position.generate_moves()
+        if not moves:
+            continue
+        start, end = move_to_rowcol(moves[0])
+        totals['get_valid_moves'] += time_per_call(lambda: get_valid_moves(board, color))
+        totals['is_valid_move'] += time_per_call(lambda: is_valid_move(board, start, end))
+        # make_move plays in place, so it gets a fresh copy of the board each time
+        totals['make_move'] += time_per_call(lambda: make_move([row[:] for row in board], start, end))
+        totals['evaluate_board'] += time_per_call(lambda: evaluate_board(position, color))
+    return {name: total * 1e6 / len(positions) for name, total in totals.items()}
+
+
+def bench_search(positions, depth):
+    """Fixed-depth minimax on every position: nodes, speed and memory per node."""
+    results = []
+    for name, position in positions:
+        color = side_to_move(position)
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        table = TranspositionTable()
+        engine.nodes_searched = 0
+        minimax(position.copy(), depth, float('-inf'), float('inf'), True, color, table)
+        nodes = engine.nodes_searched
+        retained = sys.getallocatedblocks() - blocks
+        del table
+
+        def search():
+            minimax(position.copy(), depth, float('-inf'), float('inf'), True, color, TranspositionTable())
+        elapsed = time_per_call(search)
+
+        # The same search again under tracemalloc, which slows it down too much to time
+        table = TranspositionTable()
+        gc.collect()
+        tracemalloc.start()
+        minimax(position.copy(), depth, float('-inf'), float('inf'), True, color, table)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del table
+
+        results.append({'position': name, 'depth': depth, 'nodes': nodes, 'seconds': elapsed,
+                        'nodes_per_second': nodes / elapsed,
+                        'retained_blocks_per_node': retained / nodes,
+                        'peak_traced_bytes_per_node': peak / nodes})
+    return results
+
+
+def bench_difficulties(positions):
+    """Each difficulty choosing a move on every position with its own settings, in one process."""
+    results = []
+    for difficulty in DIFFICULTIES:
+        settings = BOT_SEARCH_SETTINGS.get(difficulty)
+        nodes = 0
+        elapsed = 0.0
+        depths = []
+        for _, position in positions:
+            color = side_to_move(position)
+            engine.nodes_searched = 0
+            start = time.perf_counter()
+            if settings is None:
+                choose_move(position.copy(), color, difficulty)
+            else:
+                _, _, depth = iterative_deepening(position.copy(), color, settings['time_budget'],
+                                                  settings['max_depth'], TranspositionTable())
+                depths.append(depth)
+            elapsed += time.perf_counter() - start
+            nodes += engine.nodes_searched
+        results.append({'difficulty': difficulty, 'positions': len(positions), 'nodes': nodes,
+                        'seconds': elapsed, 'nodes_per_second': nodes / elapsed if nodes else None,
+                        'mean_depth': sum(depths) / len(depths) if depths else None})
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def speeds(results):
+    """The nodes-per-second figures of a results dict, keyed by a name that stays the same between runs."""
+    found = {}
+    for entry in results['perft']:
+        found[f"perft {entry['position']} depth {entry['depth']}"] = entry['nodes_per_second']
+    for entry in results['search']:
+        found[f"search {entry['position']} depth {entry['depth']}"] = entry['nodes_per_second']
+    for entry in results['difficulties']:
+        if entry['nodes_per_second']:
+            found[f"{entry['difficulty']} bot"] = entry['nodes_per_second']
+    for name, microseconds in results['board_functions'].items():
+        # Calls per second, so that bigger is better like the rest
+        found[name] = 1e6 / microseconds
+    return found
+
+
+def compare(results, baseline, tolerance):
+    """Print how the speeds moved against a baseline run; returns the names that got slower than tolerance allows."""
+    regressions = []
+    old_speeds = speeds(baseline)
+    print(f"\nagainst {baseline.get('commit') or 'baseline'}:")
+    for name, speed in speeds(results).items():
+        if name not in old_speeds:
+            continue
+        ratio = speed / old_speeds[name]
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"  {name:<40}{ratio:>7.2f}x{flag}")
+    old_nodes = {(e['position'], e['depth']): e['nodes'] for e in baseline['search']}
+    for entry in results['search']:
+        key = (entry['position'], entry['depth'])
+        if key in old_nodes and old_nodes[key] != entry['nodes']:
+            print(f"  search {entry['position']} depth {entry['depth']}: "
+                  f"{old_nodes[key]:,} -> {entry['nodes']:,} nodes")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the rules and the bot.")
+    parser.add_argument("--positions", default=DEFAULT_POSITIONS, help="file of \"name FEN\" lines")
+    parser.add_argument("--perft-depth", type=int, default=5)
+    parser.add_argument("--search-depth", type=int, default=6, help="depth of the fixed-depth search")
+    parser.add_argument("--output", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="slowdown allowed before it counts as a regression")
+    parser.add_argument("--skip-difficulties", action="store_true", help="leave out the timed move choices")
+    args = parser.parse_args(argv)
+
+    positions = load_positions(args.positions)
+    results = {
+        'commit': git_commit(),
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'positions': {name: position.to_fen() for name, position in positions},
+    }
+
+    results['perft'] = bench_perft(positions, args.perft_depth)
+    print(f"{'perft':<20}{'depth':>6}{'nodes':>12}{'nodes/s':>12}")
+    for entry in results['perft']:
+        print(f"{entry['position']:<20}{entry['depth']:>6}{entry['nodes']:>12,}{entry['nodes_per_second']:>12,.0f}")
+
+    results['board_functions'] = bench_board_functions(positions)
+    print(f"\n{'board function':<20}{'us/call':>10}")
+    for name, microseconds in results['board_functions'].items():
+        print(f"{name:<20}{microseconds:>10.1f}")
+
+    results['search'] = bench_search(positions, args.search_depth)
+    print(f"\n{'search':<20}{'depth':>6}{'nodes':>10}{'nodes/s':>10}{'blocks/node':>13}{'peak B/node':>13}")
+    for entry in results['search']:
+        print(f"{entry['position']:<20}{entry['depth']:>6}{entry['nodes']:>10,}{entry['nodes_per_second']:>10,.0f}"
+              f"{entry['retained_blocks_per_node']:>13.2f}{entry['peak_traced_bytes_per_node']:>13.1f}")
+
+    results['difficulties'] = [] if args.skip_difficulties else bench_difficulties(positions)
+    if results['difficulties']:
+        print(f"\n{'bot':<20}{'nodes':>10}{'nodes/s':>10}{'s/move':>8}{'depth':>7}")
+    for entry in results['difficulties']:
+        nps = f"{entry['nodes_per_second']:,.0f}" if entry['nodes_per_second'] else "-"
+        depth = f"{entry['mean_depth']:.1f}" if entry['mean_depth'] is not None else "-"
+        print(f"{entry['difficulty']:<20}{entry['nodes']:>10,}{nps:>10}"
+              f"{entry['seconds'] / entry['positions']:>8.3f}{depth:>7}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
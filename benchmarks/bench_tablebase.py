@@ -0,0 +1,107 @@
+"""Tablebase probe speed and consistency, and how often the bot converts won endgames.
+
+Run from the repository root after generating tables with tablebase.py:
+
+    python benchmarks/bench_tablebase.py [directory] [positions] [seconds per move]
+
+The consistency check samples positions and re-derives each stored result
+from its children. The conversion test starts from positions the tables
+call won and has the bot play them out, with and without tablebases,
+against a defender that plays the longest loss.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+from bitboard import Position  # noqa: E402
+from engine import BLACK, iterative_deepening  # noqa: E402
+from tablebase import (DEFAULT_DIRECTORY, WIN, LOSS, Tablebases, index_position, materials,  # noqa: E402
+                       table_size)
+from transposition import TranspositionTable  # noqa: E402
+
+MOVE_LIMIT = 100  # Plies the bot gets to finish a won endgame
+
+
+def sample_positions(tablebases, count, rng):
+    """Random legal positions with black to move, spread over the materials in the tables."""
+    covered = [m for m in materials(tablebases.max_pieces) if tablebases._table(m) is not None]
+    positions = []
+    while len(positions) < count:
+        material = rng.choice(covered)
+        masks = index_position(rng.randrange(table_size(material)), material)
+        if masks is not None:
+            positions.append(Position(*masks, True))
+    return positions
+
+
+def expected_result(tablebases, position):
+    """The result and distance a position's children say it should have."""
+    children = []
+    for move in position.generate_moves():
+        kings = position.apply(move)
+        children.append(tablebases.probe(position))
+        position.undo(move, kings)
+    if not children:
+        return LOSS, 0
+    losses = [distance for result, distance in children if result == LOSS]
+    if losses:
+        return WIN, min(losses) + 1
+    if all(result == WIN for result, _ in children):
+        return LOSS, max(distance for _, distance in children) + 1
+    return 0, 0
+
+
+def convert(tablebases, position, seconds, use_tablebases):
+    """Plies the bot (black) needs to win against perfect defence, None if it doesn't within MOVE_LIMIT."""
+    position = position.copy()
+    table = TranspositionTable()
+    for ply in range(MOVE_LIMIT):
+        if not position.generate_moves():
+            return ply if not position.black_to_move else None
+        if position.black_to_move:
+            engine.tablebases = tablebases if use_tablebases else None
+            _, move, _ = iterative_deepening(position, BLACK, seconds, 30, table)
+        else:
+            engine.tablebases = None
+            move = tablebases.best_move(position)
+        position.apply(move)
+    return None
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIRECTORY
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+    tablebases = Tablebases(directory)
+    if not tablebases.max_pieces:
+        sys.exit(f"no tablebases in {directory}, generate them with tablebase.py")
+    rng = random.Random(0)
+
+    positions = sample_positions(tablebases, 20000, rng)
+    start = time.perf_counter()
+    for position in positions:
+        tablebases.probe(position)
+    probe_time = (time.perf_counter() - start) / len(positions)
+    mismatches = sum(tablebases.probe(p) != expected_result(tablebases, p) for p in positions[:5000])
+    print(f"{directory}: up to {tablebases.max_pieces} pieces")
+    print(f"probe: {probe_time * 1e6:.1f} us; {mismatches} of 5000 sampled positions inconsistent with their children")
+
+    won = [p for p in sample_positions(tablebases, 20 * count, rng)
+           if sum(p.piece_counts()) == tablebases.max_pieces and tablebases.probe(p)[0] == WIN
+           and tablebases.probe(p)[1] > 5][:count]
+    print(f"\nbot playing {len(won)} won {tablebases.max_pieces}-piece positions, {seconds}s per move:")
+    for use_tablebases in (False, True):
+        plies = [convert(tablebases, p, seconds, use_tablebases) for p in won]
+        converted = [n for n in plies if n is not None]
+        average = sum(converted) / len(converted) if converted else 0
+        print(f"  {'with' if use_tablebases else 'without':<7} tablebases: won {len(converted)}/{len(won)}, "
+              f"{average:.1f} plies on average")
+    engine.tablebases = None
+
+
+if __name__ == "__main__":
+    main()
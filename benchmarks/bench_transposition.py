@@ -0,0 +1,67 @@
+"""Effect of the transposition table on the 'hard' search.
+
+Run from the repository root:
+
+    python benchmarks/bench_transposition.py [depth] [table_size]
+
+Searches a fixed set of positions with and without a table, from the given
+depth to three plies deeper, and reports nodes, hit rate and time per move.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+from bitboard import Position  # noqa: E402
+from engine import BLACK, RED, minimax  # noqa: E402
+from transposition import TranspositionTable, DEFAULT_SIZE  # noqa: E402
+
+
+def test_positions(count=20, seed=0):
+    """Positions from short random games, from the opening to the middlegame."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position = Position.initial()
+        for _ in range(rng.randrange(0, 30)):
+            moves = position.generate_moves()
+            if not moves:
+                break
+            position.apply(rng.choice(moves))
+        if position.generate_moves():
+            positions.append(position)
+    return positions
+
+
+def search_all(positions, depth, table=None):
+    engine.nodes_searched = 0
+    start = time.perf_counter()
+    for position in positions:
+        if table is not None:
+            table.new_search()
+        color = BLACK if position.black_to_move else RED
+        minimax(position.copy(), depth, float('-inf'), float('inf'), True, color, table)
+    return engine.nodes_searched, time.perf_counter() - start
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SIZE
+    positions = test_positions()
+
+    print(f"{len(positions)} positions, table size {TranspositionTable(size).size:,}")
+    print(f"{'depth':>5} {'plain nodes':>12} {'table nodes':>12} {'reduction':>10} {'hit rate':>9} "
+          f"{'plain s/move':>13} {'table s/move':>13}")
+    for d in range(depth, depth + 4):
+        plain_nodes, plain_time = search_all(positions, d)
+        table = TranspositionTable(size)
+        table_nodes, table_time = search_all(positions, d, table)
+        print(f"{d:>5} {plain_nodes:>12,} {table_nodes:>12,} {1 - table_nodes / plain_nodes:>10.1%} "
+              f"{table.hit_rate():>9.1%} {plain_time / len(positions):>13.3f} {table_time / len(positions):>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
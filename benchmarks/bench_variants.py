@@ -0,0 +1,90 @@
+"""The rules variants side by side: move generation, branching factor and search within the hard bot's budget.
+
+Run from the repository root:
+
+    python benchmarks/bench_variants.py [positions] [seconds]
+
+For each variant (English 8x8, international 10x10):
+
+- perft from the starting position, and for international draughts from a
+  position full of captures, checked against the published counts, in
+  leaf nodes per second
+- the average number of legal moves over a sample of positions reached by
+  random play from the start
+- iterative deepening on the same sample with the hard bot's time budget
+  (or `seconds`) and a fresh transposition table per position, single
+  process: nodes per second and the depth it finished
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+from bitboard import perft  # noqa: E402
+from engine import BLACK, RED, BOT_SEARCH_SETTINGS, iterative_deepening  # noqa: E402
+from variants import VARIANTS  # noqa: E402
+
+# (FEN or None for the starting position, depth, leaf nodes) per variant
+PERFT_CHECKS = {
+    "english": [(None, 7, 179740)],
+    "international": [(None, 6, 167140),
+                      # The Woldouby position, a standard test of the capture rules
+                      ("W:W25,27,28,30,32,33,34,35,37,38:B12,13,14,16,18,19,21,23,24,26", 9, 22369)],
+}
+
+
+def sample_positions(variant, count, rng):
+    """Positions after 4-40 random plies from the start with a choice of moves; a forced move isn't searched."""
+    positions = []
+    while len(positions) < count:
+        position = variant.position_class.initial()
+        for _ in range(rng.randint(4, 40)):
+            moves = position.generate_moves()
+            if not moves:
+                break
+            position.apply(rng.choice(moves))
+        if len(position.generate_moves()) > 1:
+            positions.append(position)
+    return positions
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else BOT_SEARCH_SETTINGS['hard']['time_budget']
+    print(f"{'variant':<15}{'perft':>24}{'leaves/s':>11}  {'moves':>5}  {'nodes/s':>8}  depth in {budget:g}s")
+    for variant in VARIANTS.values():
+        perft_results = []
+        for fen, depth, expected in PERFT_CHECKS[variant.name]:
+            position = variant.position_class.initial() if fen is None else variant.position_class.from_fen(fen)
+            start = time.perf_counter()
+            leaves = perft(position, depth)
+            elapsed = time.perf_counter() - start
+            assert leaves == expected, (variant.name, fen, depth, leaves)
+            perft_results.append((f"{'start' if fen is None else 'test'} d{depth} {leaves:,}", leaves / elapsed))
+
+        positions = sample_positions(variant, count, random.Random(0))
+        branching = statistics.mean(len(position.generate_moves()) for position in positions)
+        depths, nodes, elapsed = [], 0, 0.0
+        for position in positions:
+            table = variant.table_class()
+            engine.nodes_searched = 0
+            start = time.perf_counter()
+            _, _, depth = iterative_deepening(position, BLACK if position.black_to_move else RED, budget,
+                                              BOT_SEARCH_SETTINGS['hard']['max_depth'], table)
+            elapsed += time.perf_counter() - start
+            nodes += engine.nodes_searched
+            depths.append(depth)
+        for index, (label, speed) in enumerate(perft_results):
+            if index == 0:
+                print(f"{variant.title:<15}{label:>24}{speed:>11,.0f}  {branching:>5.1f}  {nodes / elapsed:>8,.0f}  "
+                      f"min {min(depths)}, median {statistics.median(depths):g}, max {max(depths)}")
+            else:
+                print(f"{'':<15}{label:>24}{speed:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
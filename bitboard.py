@@ -0,0 +1,502 @@
+"""Bitboard position and move generator for 8x8 checkers.
+
+Only the 32 dark squares can hold a piece, so a position is three 32-bit
+masks: black pieces, red pieces and kings (of either color). Squares are
+numbered 0-31 in reading order, four per row, so square = row * 4 + col // 2.
+Black starts on squares 0-11 and moves towards higher numbers, red starts on
+squares 20-31 and moves towards lower numbers.
+
+Each position also carries a 64-bit Zobrist hash that apply() and undo()
+keep up to date, for the transposition table, and the part of its evaluation
+that is a sum over single pieces (see evaluation.py), kept up to date the same
+way.
+"""
+import random
+
+BOARD_SIZE = 8
+NUM_SQUARES = 32
+FULL_MASK = 0xFFFFFFFF
+
+# Piece types used by the list-of-lists board
+BLACK_PIECE = "B"
+RED_PIECE = "R"
+BLACK_KING = "BK"
+RED_KING = "RK"
+
+# Rows where a man is promoted
+BLACK_KING_ROW = 0xF0000000  # Row 7
+RED_KING_ROW = 0x0000000F    # Row 0
+
+# Diagonal directions as (row step, col step)
+UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT = (-1, -1), (-1, 1), (1, -1), (1, 1)
+BLACK_MAN_DIRECTIONS = (DOWN_LEFT, DOWN_RIGHT)
+RED_MAN_DIRECTIONS = (UP_LEFT, UP_RIGHT)
+KING_DIRECTIONS = (UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT)
+
+
+def dark_squares(board_size):
+    """Square -> (row, col) list and (row, col) -> square dict for the dark squares of a board.
+
+    Squares are numbered in reading order, board_size // 2 per row; the top
+    left corner is light, as on every draughts board.
+    """
+    per_row = board_size // 2
+    square_to_rowcol = [(sq // per_row, (sq % per_row) * 2 + (1 if (sq // per_row) % 2 == 0 else 0))
+                        for sq in range(per_row * board_size)]
+    return square_to_rowcol, {rowcol: sq for sq, rowcol in enumerate(square_to_rowcol)}
+
+
+# Square <-> (row, col) lookups
+SQUARE_TO_ROWCOL, ROWCOL_TO_SQUARE = dark_squares(BOARD_SIZE)
+
+
+def build_shift_tables(square_to_rowcol, rowcol_to_square):
+    """Work out which bit shifts move a piece one and two squares along each diagonal.
+
+    A single step uses a different shift on even and odd rows (3, 4 or 5 on
+    8x8), so every direction gets a list of (shift, source mask) pairs. A
+    jump always shifts by the same amount (7 or 9 on 8x8), whatever row it
+    starts on.
+    """
+    steps = {}
+    jumps = {}
+    over = {}
+    for direction in KING_DIRECTIONS:
+        dr, dc = direction
+        by_shift = {}
+        jump_mask = 0
+        jump_shift = 0
+        over[direction] = [None] * len(square_to_rowcol)
+        for sq, (row, col) in enumerate(square_to_rowcol):
+            step = rowcol_to_square.get((row + dr, col + dc))
+            if step is not None:
+                by_shift[step - sq] = by_shift.get(step - sq, 0) | (1 << sq)
+            land = rowcol_to_square.get((row + 2 * dr, col + 2 * dc))
+            if land is not None:
+                jump_mask |= 1 << sq
+                jump_shift = land - sq
+                over[direction][sq] = step
+        steps[direction] = tuple(sorted(by_shift.items()))
+        jumps[direction] = (jump_shift, jump_mask)
+    return steps, jumps, over
+
+
+STEP_SHIFTS, JUMP_SHIFTS, JUMP_OVER = build_shift_tables(SQUARE_TO_ROWCOL, ROWCOL_TO_SQUARE)
+
+
+def _steps(directions):
+    """(shift, source mask) pairs for one step in any of these directions.
+
+    No square has two such steps with the same shift, so the masks of a
+    shift can be merged and each shift costs one operation.
+    """
+    by_shift = {}
+    for direction in directions:
+        for shift, source_mask in STEP_SHIFTS[direction]:
+            by_shift[abs(shift)] = by_shift.get(abs(shift), 0) | source_mask
+    return tuple(by_shift.items())
+
+
+# Steps towards higher squares (black men's way) and towards lower ones (red men's)
+DOWN_STEPS = _steps(BLACK_MAN_DIRECTIONS)
+UP_STEPS = _steps(RED_MAN_DIRECTIONS)
+
+# For following a jump sequence square by square: (jumped bit, landing square) per direction, or None
+JUMP_LANDINGS = {
+    direction: [None if JUMP_OVER[direction][sq] is None else (1 << JUMP_OVER[direction][sq], sq + JUMP_SHIFTS[direction][0])
+                for sq in range(NUM_SQUARES)]
+    for direction in KING_DIRECTIONS
+}
+
+
+# Zobrist keys: one random 64-bit number per piece kind and square, plus one
+# that is mixed in when black is to move. Fixed seed so hashes are stable
+# between runs.
+_zobrist_rng = random.Random(0x5DEECE66D)
+ZOBRIST_BLACK_MAN = [_zobrist_rng.getrandbits(64) for _ in range(NUM_SQUARES)]
+ZOBRIST_BLACK_KING = [_zobrist_rng.getrandbits(64) for _ in range(NUM_SQUARES)]
+ZOBRIST_RED_MAN = [_zobrist_rng.getrandbits(64) for _ in range(NUM_SQUARES)]
+ZOBRIST_RED_KING = [_zobrist_rng.getrandbits(64) for _ in range(NUM_SQUARES)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_rng.getrandbits(64)
+
+
+# Piece-square values: what a piece on each square adds to Position.score,
+# in thousandths of a man from black's side. evaluation.set_weights() fills
+# them in from the evaluation weights; until then they count material only.
+SCORE_SCALE = 1000
+SQUARE_VALUES_BLACK_MAN = [SCORE_SCALE] * NUM_SQUARES
+SQUARE_VALUES_BLACK_KING = [SCORE_SCALE * 3 // 2] * NUM_SQUARES
+SQUARE_VALUES_RED_MAN = [-SCORE_SCALE] * NUM_SQUARES
+SQUARE_VALUES_RED_KING = [-SCORE_SCALE * 3 // 2] * NUM_SQUARES
+
+
+def set_square_values(black_man, black_king, red_man, red_king):
+    """Replace the piece-square values in place. Positions built before keep their old scores."""
+    SQUARE_VALUES_BLACK_MAN[:] = black_man
+    SQUARE_VALUES_BLACK_KING[:] = black_king
+    SQUARE_VALUES_RED_MAN[:] = red_man
+    SQUARE_VALUES_RED_KING[:] = red_king
+
+
+def _shift(bits, shift):
+    return (bits << shift) & FULL_MASK if shift > 0 else bits >> -shift
+
+
+class Position:
+    """A checkers position stored as bitmasks, with the side to move."""
+
+    __slots__ = ("black", "red", "kings", "black_to_move", "hash", "score")
+
+    # The row the side to move crowns its men on, indexed by black_to_move
+    king_rows = (RED_KING_ROW, BLACK_KING_ROW)
+
+    def __init__(self, black=0, red=0, kings=0, black_to_move=True):
+        self.black = black
+        self.red = red
+        self.kings = kings
+        self.black_to_move = black_to_move
+        self.hash = self.compute_hash()
+        self.score = self.compute_score()
+
+    @classmethod
+    def initial(cls):
+        """Starting position: black on rows 0-2, red on rows 5-7, black to move."""
+        return cls(0x00000FFF, 0xFFF00000, 0, True)
+
+    @classmethod
+    def from_board(cls, board, black_to_move=True):
+        """Build a position from the list-of-lists board used by the UI."""
+        black = red = kings = 0
+        for sq, (row, col) in enumerate(SQUARE_TO_ROWCOL):
+            piece = board[row][col]
+            if piece == BLACK_PIECE:
+                black |= 1 << sq
+            elif piece == RED_PIECE:
+                red |= 1 << sq
+            elif piece == BLACK_KING:
+                black |= 1 << sq
+                kings |= 1 << sq
+            elif piece == RED_KING:
+                red |= 1 << sq
+                kings |= 1 << sq
+        return cls(black, red, kings, black_to_move)
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Parse a PDN FEN string such as "B:W21,22,K30:B1,2,3".
+
+        Squares are numbered 1-32 as in PDN, which is this module's square
+        number plus one. Black is black and White is red; ranges like "1-12"
+        are accepted.
+        """
+        return cls(*parse_fen(fen, NUM_SQUARES))
+
+    def to_fen(self):
+        """Return the position as a PDN FEN string, the inverse of from_fen()."""
+        return format_fen(self, NUM_SQUARES)
+
+    def to_board(self):
+        """Return the position as a list-of-lists board of "B"/"R"/"BK"/"RK"/None."""
+        board = [[None for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+        for sq, (row, col) in enumerate(SQUARE_TO_ROWCOL):
+            bit = 1 << sq
+            if self.black & bit:
+                board[row][col] = BLACK_KING if self.kings & bit else BLACK_PIECE
+            elif self.red & bit:
+                board[row][col] = RED_KING if self.kings & bit else RED_PIECE
+        return board
+
+    def copy(self):
+        return Position(self.black, self.red, self.kings, self.black_to_move)
+
+    def compute_hash(self):
+        """Zobrist hash of the position from scratch; apply() and undo() update it incrementally."""
+        h = ZOBRIST_BLACK_TO_MOVE if self.black_to_move else 0
+        for sq in range(NUM_SQUARES):
+            bit = 1 << sq
+            if self.black & bit:
+                h ^= ZOBRIST_BLACK_KING[sq] if self.kings & bit else ZOBRIST_BLACK_MAN[sq]
+            elif self.red & bit:
+                h ^= ZOBRIST_RED_KING[sq] if self.kings & bit else ZOBRIST_RED_MAN[sq]
+        return h
+
+    def compute_score(self):
+        """Sum of the piece-square values from scratch; apply() and undo() update it incrementally."""
+        score = 0
+        for sq in range(NUM_SQUARES):
+            bit = 1 << sq
+            if self.black & bit:
+                score += SQUARE_VALUES_BLACK_KING[sq] if self.kings & bit else SQUARE_VALUES_BLACK_MAN[sq]
+            elif self.red & bit:
+                score += SQUARE_VALUES_RED_KING[sq] if self.kings & bit else SQUARE_VALUES_RED_MAN[sq]
+        return score
+
+    def __eq__(self, other):
+        return (isinstance(other, Position) and self.black == other.black and self.red == other.red
+                and self.kings == other.kings and self.black_to_move == other.black_to_move)
+
+    def __repr__(self):
+        return f"Position(black={self.black:#010x}, red={self.red:#010x}, kings={self.kings:#010x}, black_to_move={self.black_to_move})"
+
+    def generate_moves(self):
+        """Get all moves for the side to move as (from_square, to_square, captured_mask) tuples.
+
+        English draughts rules: men step and capture forward only, kings go
+        both ways, and capturing is forced. A capture is the whole jump
+        sequence as one move, with every piece it takes in captured_mask; a
+        man that reaches the far row is crowned and its sequence ends there.
+        Sequences that take the same pieces to the same square are one move.
+        """
+        if self.black_to_move:
+            own, opp, man_directions, king_row = self.black, self.red, BLACK_MAN_DIRECTIONS, BLACK_KING_ROW
+        else:
+            own, opp, man_directions, king_row = self.red, self.black, RED_MAN_DIRECTIONS, RED_KING_ROW
+        empty = ~(self.black | self.red) & FULL_MASK
+        own_kings = own & self.kings
+
+        # Captures first: the first jump of every sequence, found for all pieces at once
+        moves = []
+        for direction in KING_DIRECTIONS:
+            movers = own if direction in man_directions else own_kings
+            if not movers:
+                continue
+            jump_shift, source_mask = JUMP_SHIFTS[direction]
+            over_table = JUMP_OVER[direction]
+            targets = _shift(movers & source_mask, jump_shift) & empty
+            while targets:
+                bit = targets & -targets
+                to = bit.bit_length() - 1
+                frm = to - jump_shift
+                over_bit = 1 << over_table[frm]
+                if opp & over_bit:
+                    if own_kings & (1 << frm):
+                        # The king's own square is empty while it jumps, it may pass over or land on it
+                        _extend_capture(moves, frm, to, over_bit, opp, empty | (1 << frm), KING_DIRECTIONS, 0)
+                    else:
+                        _extend_capture(moves, frm, to, over_bit, opp, empty, man_directions, king_row)
+                targets ^= bit
+        if moves:
+            return list(dict.fromkeys(moves)) if len(moves) > 1 else moves
+
+        # No capture, so simple moves, one shift per row parity
+        for direction in KING_DIRECTIONS:
+            movers = own if direction in man_directions else own_kings
+            if not movers:
+                continue
+            for shift, source_mask in STEP_SHIFTS[direction]:
+                targets = _shift(movers & source_mask, shift) & empty
+                while targets:
+                    bit = targets & -targets
+                    to = bit.bit_length() - 1
+                    moves.append((to - shift, to, 0))
+                    targets ^= bit
+        return moves
+
+    def has_capture(self):
+        """True when the side to move has a capture, which it then has to play."""
+        if self.black_to_move:
+            own, opp, man_directions = self.black, self.red, BLACK_MAN_DIRECTIONS
+        else:
+            own, opp, man_directions = self.red, self.black, RED_MAN_DIRECTIONS
+        empty = ~(self.black | self.red) & FULL_MASK
+        own_kings = own & self.kings
+        for direction in KING_DIRECTIONS:
+            movers = own if direction in man_directions else own_kings
+            if not movers:
+                continue
+            # An opponent one step away with an empty square behind it
+            jump_shift, source_mask = JUMP_SHIFTS[direction]
+            for shift, step_mask in STEP_SHIFTS[direction]:
+                if _shift(_shift(movers & source_mask & step_mask, shift) & opp, jump_shift - shift) & empty:
+                    return True
+        return False
+
+    def has_quiet_move(self):
+        """True when the side to move has a move that isn't a capture, a step to an empty square."""
+        if self.black_to_move:
+            down, up = self.black, self.black & self.kings
+        else:
+            down, up = self.red & self.kings, self.red
+        empty = ~(self.black | self.red) & FULL_MASK
+        if down:
+            for shift, source_mask in DOWN_STEPS:
+                if (down & source_mask) << shift & empty:
+                    return True
+        if up:
+            for shift, source_mask in UP_STEPS:
+                if (up & source_mask) >> shift & empty:
+                    return True
+        return False
+
+    def apply(self, move):
+        """Play a move in place and return the kings mask needed to undo it.
+
+        The move and that one int are the whole undo record: the move holds
+        the squares moved and captured, and the old kings mask tells which
+        captured pieces were kings and whether the moving man was crowned.
+        """
+        frm, to, captured = move
+        # XOR, not OR: a king can capture its way round back to the square it started on
+        bits = (1 << frm) ^ (1 << to)
+        kings = self.kings
+        hash_delta, score_delta = _move_deltas(frm, to, captured, kings, self.black_to_move)
+        self.hash ^= hash_delta
+        self.score += score_delta
+        if self.black_to_move:
+            self.black ^= bits
+            self.red ^= captured
+            promoted = (1 << to) & BLACK_KING_ROW
+        else:
+            self.red ^= bits
+            self.black ^= captured
+            promoted = (1 << to) & RED_KING_ROW
+        if kings & (1 << frm):
+            self.kings = (kings ^ bits) & ~captured
+        else:
+            self.kings = (kings & ~captured) | promoted
+        self.black_to_move = not self.black_to_move
+        return kings
+
+    def undo(self, move, kings):
+        """Take back a move played with apply()."""
+        frm, to, captured = move
+        bits = (1 << frm) ^ (1 << to)
+        self.black_to_move = not self.black_to_move
+        if self.black_to_move:
+            self.black ^= bits
+            self.red ^= captured
+        else:
+            self.red ^= bits
+            self.black ^= captured
+        self.kings = kings
+        hash_delta, score_delta = _move_deltas(frm, to, captured, kings, self.black_to_move)
+        self.hash ^= hash_delta
+        self.score -= score_delta
+
+    def piece_counts(self):
+        """Return (black men, black kings, red men, red kings)."""
+        kings = self.kings
+        return ((self.black & ~kings).bit_count(), (self.black & kings).bit_count(),
+                (self.red & ~kings).bit_count(), (self.red & kings).bit_count())
+
+
+def _extend_capture(moves, frm, square, captured, opp, empty, directions, king_row):
+    """Follow a capture sequence that has reached `square`, adding each way it can end to moves.
+
+    A sequence goes on while there is another piece to jump that it hasn't
+    taken yet. Taken pieces stay on the board until the move is over, so they
+    can't be jumped twice or landed on. A man crowned on king_row stops.
+    """
+    if (1 << square) & king_row:
+        moves.append((frm, square, captured))
+        return
+    extended = False
+    for direction in directions:
+        landing = JUMP_LANDINGS[direction][square]
+        if landing is None:
+            continue
+        over_bit, land = landing
+        if opp & over_bit and not captured & over_bit and empty & (1 << land):
+            _extend_capture(moves, frm, land, captured | over_bit, opp, empty, directions, king_row)
+            extended = True
+    if not extended:
+        moves.append((frm, square, captured))
+
+
+def _move_deltas(frm, to, captured, kings, black_to_move):
+    """Zobrist hash and score changes for a move, given the kings mask before it was played."""
+    if black_to_move:
+        man_keys, king_keys = ZOBRIST_BLACK_MAN, ZOBRIST_BLACK_KING
+        captured_man_keys, captured_king_keys = ZOBRIST_RED_MAN, ZOBRIST_RED_KING
+        man_values, king_values = SQUARE_VALUES_BLACK_MAN, SQUARE_VALUES_BLACK_KING
+        captured_man_values, captured_king_values = SQUARE_VALUES_RED_MAN, SQUARE_VALUES_RED_KING
+        king_row = BLACK_KING_ROW
+    else:
+        man_keys, king_keys = ZOBRIST_RED_MAN, ZOBRIST_RED_KING
+        captured_man_keys, captured_king_keys = ZOBRIST_BLACK_MAN, ZOBRIST_BLACK_KING
+        man_values, king_values = SQUARE_VALUES_RED_MAN, SQUARE_VALUES_RED_KING
+        captured_man_values, captured_king_values = SQUARE_VALUES_BLACK_MAN, SQUARE_VALUES_BLACK_KING
+        king_row = RED_KING_ROW
+    if kings & (1 << frm):
+        delta = king_keys[frm] ^ king_keys[to]
+        score = king_values[to] - king_values[frm]
+    elif king_row & (1 << to):
+        delta = man_keys[frm] ^ king_keys[to]
+        score = king_values[to] - man_values[frm]
+    else:
+        delta = man_keys[frm] ^ man_keys[to]
+        score = man_values[to] - man_values[frm]
+    while captured:
+        bit = captured & -captured
+        sq = bit.bit_length() - 1
+        if kings & bit:
+            delta ^= captured_king_keys[sq]
+            score -= captured_king_values[sq]
+        else:
+            delta ^= captured_man_keys[sq]
+            score -= captured_man_values[sq]
+        captured ^= bit
+    return delta ^ ZOBRIST_BLACK_TO_MOVE, score
+
+
+def parse_fen(fen, num_squares):
+    """The (black, red, kings, black_to_move) masks of a PDN FEN string on a board of num_squares squares."""
+    fields = fen.strip().rstrip(".").split(":")
+    if not fields[0] or fields[0][0].upper() not in "BW":
+        raise ValueError(f"bad FEN side to move: {fen!r}")
+    black = red = kings = 0
+    for field in fields[1:]:
+        if not field:
+            continue
+        side = field[0].upper()
+        if side not in "BW":
+            raise ValueError(f"bad FEN field {field!r}")
+        for entry in filter(None, field[1:].split(",")):
+            king = entry[0].upper() == "K"
+            if king:
+                entry = entry[1:]
+            first, _, last = entry.partition("-")
+            for number in range(int(first), int(last or first) + 1):
+                if not 1 <= number <= num_squares:
+                    raise ValueError(f"square {number} out of range in FEN {fen!r}")
+                bit = 1 << (number - 1)
+                if side == "B":
+                    black |= bit
+                else:
+                    red |= bit
+                if king:
+                    kings |= bit
+    return black, red, kings, fields[0][0].upper() == "B"
+
+
+def format_fen(position, num_squares):
+    """Write a position's masks as a PDN FEN string, the inverse of parse_fen()."""
+    def squares(bits):
+        return ",".join(("K" if position.kings & (1 << sq) else "") + str(sq + 1)
+                        for sq in range(num_squares) if bits & (1 << sq))
+    return f"{'B' if position.black_to_move else 'W'}:W{squares(position.red)}:B{squares(position.black)}"
+
+
+def move_to_rowcol(move):
+    """Convert a bitboard move to the ((start_row, start_col), (end_row, end_col)) form the UI uses."""
+    return SQUARE_TO_ROWCOL[move[0]], SQUARE_TO_ROWCOL[move[1]]
+
+
+def move_to_text(move):
+    """Write a move in PDN style, "9-13" for a step and "9x18" for a capture."""
+    return f"{move[0] + 1}{'x' if move[2] else '-'}{move[1] + 1}"
+
+
+def perft(position, depth):
+    """Count the leaf nodes of the move tree to the given depth."""
+    if depth == 0:
+        return 1
+    moves = position.generate_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        kings = position.apply(move)
+        nodes += perft(position, depth - 1)
+        position.undo(move, kings)
+    return nodes
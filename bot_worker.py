@@ -0,0 +1,330 @@
+"""Runs the bot's search in the background so the game loop keeps drawing.
+
+The search goes to a single worker process, which keeps its own transposition
+table between moves. Processes are forked, so the worker starts without
+importing the game again. Platforms without fork use a worker thread
+instead, and skip the parallel search.
+
+Difficulties with 'ponder' set keep the worker busy on the human's time:
+after the bot moves, the worker guesses the human's reply and searches the
+position it leads to until it is told to stop. If the human plays that
+reply and the bot pondered for longer than its time budget, the pondered
+move is played at once; otherwise the search starts over with the
+transposition table and history scores the pondering filled.
+
+With instrumentation on (BotWorker.set_instrumented) the worker fills in a
+SearchStats on every search and copies it into an array shared with the
+game as the search goes, for the game's statistics overlay.
+
+In games without a bot the same worker analyses the position on the board
+(BotWorker.analyse): a multi-PV search that goes deeper until it is stopped
+and sends the best lines back to the game after every depth. The worker's
+transposition table carries over from one position to the next, so after a
+move the analysis starts from what it found for the position before.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import engine
+from engine import BOT_SEARCH_SETTINGS, board_position
+from opening_book import load_book
+from tablebase import load_tablebases
+from parallel_search import ParallelSearcher
+from search_stats import VALUE_COUNT, SearchStats, SharedStatsHook
+from transposition import TranspositionTable
+from variants import ENGLISH, position_variant
+
+_table = None
+_book = None
+_parallel_context = None
+_parallel = None
+_ponder_result = None  # (position fields, move, search stats) of the last ponder search
+_instrumented = None  # Shared flag: fill in search statistics
+_live_stats = None  # Shared array the statistics are copied into
+_analysis_results = None  # Queue the analysis sends its lines to the game through
+
+PONDER_SECONDS = 60.0  # Longest the bot ponders before leaving the CPU alone
+PREDICTION_DEPTH = 4  # Depth of the search guessing the human's reply when the table has no guess
+ANALYSIS_LINES = 3  # Best moves the analysis keeps scores and lines for
+ANALYSIS_SECONDS = 120.0  # Longest the analysis of one position runs before leaving the CPU alone
+ANALYSIS_MAX_DEPTH = 40
+
+
+def _init_worker(stop_event, parallel_context, instrumented, live_stats, analysis_results):
+    global _table, _book, _parallel_context, _instrumented, _live_stats, _analysis_results
+    engine.search_stop_event = stop_event
+    _instrumented, _live_stats, _analysis_results = instrumented, live_stats, analysis_results
+    _table = TranspositionTable()
+    _book = load_book()
+    engine.tablebases = load_tablebases()
+    _parallel_context = parallel_context
+
+
+def _set_up_stats():
+    """Switch the search statistics on or off for the next search, as the game last asked."""
+    if not _instrumented.value:
+        engine.search_stats = None
+    elif engine.search_stats is None:
+        engine.search_stats = SearchStats([SharedStatsHook(_live_stats)])
+
+
+def _use_table_for(position):
+    """Replace the transposition table with one of the position's variant, unless it already is."""
+    global _table
+    table_class = position_variant(position).table_class
+    if type(_table) is not table_class:
+        _table = table_class()
+
+
+def _book_for(position):
+    """The opening book, None when there is none or the position isn't English checkers."""
+    return _book if position_variant(position) is ENGLISH else None
+
+
+def _fields(position):
+    return position.__class__, position.black, position.red, position.kings, position.black_to_move
+
+
+def _bot_search(position, bot_color, settings, time_budget):
+    """Iterative deepening for a searching difficulty, across processes when it has workers to spare."""
+    global _parallel
+    if settings['workers'] > 1 and _parallel_context is not None:
+        if _parallel is None:
+            _parallel = ParallelSearcher(settings['workers'], _parallel_context, engine.search_stop_event)
+        return _parallel.iterative_deepening(position, bot_color, time_budget, settings['max_depth'])
+    return engine.iterative_deepening(position, bot_color, time_budget, settings['max_depth'], _table)
+
+
+def _search(board, bot_color, difficulty):
+    """Choose the bot's move; returns (move, stats).
+
+    stats says where the move came from ('book', 'ponder', 'search' or
+    'random') and, when it was searched, the score for the bot in men, the
+    depth reached, the nodes searched and the seconds it took.
+    """
+    global _ponder_result
+    # A stop request for an earlier search may still be pending, it isn't for this one
+    engine.search_stop_event.clear()
+    _set_up_stats()
+    position = board_position(board, bot_color)
+    _use_table_for(position)
+    book = _book_for(position)
+    settings = BOT_SEARCH_SETTINGS.get(difficulty)
+    if settings and book is not None:
+        move = book.choose(position)
+        if move is not None:
+            return move, {'source': 'book'}
+    if settings and position.generate_moves():
+        pondered, _ponder_result = _ponder_result, None
+        if pondered is not None and pondered[0] == _fields(position) and pondered[2]['search'] >= settings['time_budget']:
+            # The human played the expected reply and the bot has already thought longer than it would now
+            return pondered[1], dict(pondered[2], source='ponder')
+        start = time.perf_counter()
+        engine.nodes_searched = 0
+        score, move, depth = _bot_search(position, bot_color, settings, settings['time_budget'])
+        return move, _search_stats(score, depth, start)
+    return engine.choose_move(position, bot_color, difficulty, _table), {'source': 'random'}
+
+
+def _search_stats(score, depth, start):
+    return {'source': 'search', 'score': score, 'depth': depth, 'nodes': engine.nodes_searched,
+            'search': time.perf_counter() - start}
+
+
+def _predict_reply(position, bot_color):
+    """The human's most likely move: the one the bot's last search expected, or a short search's choice."""
+    moves = position.generate_moves()
+    for table in (_table, _parallel.table if _parallel is not None else None):
+        entry = table.probe(position.hash) if table is not None else None
+        if entry is not None and entry[4] in moves:
+            return entry[4]
+    try:
+        _, move = engine.minimax(position.copy(), PREDICTION_DEPTH, float('-inf'), float('inf'), True,
+                                 engine.opponent(bot_color), _table)
+    except engine.SearchTimeout:
+        return None
+    return move
+
+
+def _ponder(board, bot_color, difficulty):
+    """Search the position after the human's most likely reply until stopped; returns that reply.
+
+    The stop event isn't cleared here: a stop requested before this started
+    was meant for it.
+    """
+    global _ponder_result
+    _set_up_stats()
+    position = board_position(board, engine.opponent(bot_color))
+    _use_table_for(position)
+    reply = _predict_reply(position, bot_color) if position.generate_moves() else None
+    if reply is None:
+        return None
+    position.apply(reply)
+    book = _book_for(position)
+    if not position.generate_moves() or (book is not None and book.lookup(position)):
+        return reply  # Nothing to think about, or the book answers at once anyway
+    start = time.perf_counter()
+    engine.nodes_searched = 0
+    score, move, depth = _bot_search(position, bot_color, BOT_SEARCH_SETTINGS[difficulty], PONDER_SECONDS)
+    _ponder_result = (_fields(position), move, _search_stats(score, depth, start))
+    return reply
+
+
+def _analyse(board, color, count, analysis_id):
+    """Analyse the position with color to move until stopped, sending (analysis_id, depth, lines) after every depth."""
+    engine.search_stop_event.clear()
+    engine.search_stats = None
+    position = board_position(board, color)
+    _use_table_for(position)
+    engine.analyse(position, count, _table, ANALYSIS_SECONDS, ANALYSIS_MAX_DEPTH,
+                   lambda depth, lines: _analysis_results.put((analysis_id, depth, lines)))
+
+
+class BotWorker:
+    """One background bot search at a time, which can be polled and cancelled.
+
+    Every call returns at once, so the game loop can make them between frames.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.stop_event = None
+        self.future = None
+        self.ponder_future = None
+        self.analysis_future = None
+        self.analysis_id = 0  # Numbers the analyses, so lines sent for an earlier position are told apart
+        self.analysis_results = None
+        self.analysis = None  # (depth, lines) of the position analysed last, see engine.analyse()
+        self.stats = None  # How the last move poll() returned was found, see _search()
+        self.error = None  # Why the last search failed, see poll()
+        # Shared with the worker, which reads the flag at the start of each search
+        self.instrumented = multiprocessing.RawValue('b', 0)
+        self.live_stats = multiprocessing.RawArray('d', VALUE_COUNT)
+
+    def _start_executor(self):
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+            self.stop_event = context.Event()
+            self.analysis_results = context.Queue()
+            self.executor = ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker,
+                                                initargs=(self.stop_event, context, self.instrumented, self.live_stats,
+                                                          self.analysis_results))
+        else:
+            self.stop_event = threading.Event()
+            self.analysis_results = queue.Queue()
+            self.executor = ThreadPoolExecutor(max_workers=1, initializer=_init_worker,
+                                               initargs=(self.stop_event, None, self.instrumented, self.live_stats,
+                                                         self.analysis_results))
+
+    def _submit(self, function, *args):
+        if self.executor is None:
+            self._start_executor()
+        try:
+            return self.executor.submit(function, *args)
+        except BrokenExecutor:
+            # The worker died while pondering or analysing: start a new one
+            self.shutdown()
+            self._start_executor()
+            return self.executor.submit(function, *args)
+
+    def start(self, board, bot_color, difficulty):
+        """Start searching for the bot's move on a copy of the board."""
+        self.error = None
+        # The search waits in the queue until the pondering has stopped
+        self.stop_pondering()
+        self.future = self._submit(_search, [row[:] for row in board], bot_color, difficulty)
+
+    def searching(self):
+        return self.future is not None
+
+    def poll(self):
+        """Return the bitboard move once the search has finished, None while it is still running.
+
+        Also None when the search failed, with the exception in error; the
+        worker is then shut down and the next search starts a new one.
+        """
+        if self.future is None or not self.future.done():
+            return None
+        future, self.future = self.future, None
+        try:
+            move, self.stats = future.result()
+        except Exception as error:  # An error in the search, or BrokenProcessPool when the worker died
+            self.error = error
+            self.shutdown()
+            return None
+        return move
+
+    def ponder(self, board, bot_color, difficulty):
+        """After the bot's move, think on the human's time if the difficulty ponders."""
+        settings = BOT_SEARCH_SETTINGS.get(difficulty)
+        if not settings or not settings.get('ponder'):
+            return
+        self.ponder_future = self._submit(_ponder, [row[:] for row in board], bot_color, difficulty)
+
+    def pondering(self):
+        return self.ponder_future is not None
+
+    def stop_pondering(self):
+        if self.ponder_future is not None:
+            if not self.ponder_future.cancel():
+                self.stop_event.set()
+            self.ponder_future = None
+
+    def analyse(self, board, color, count=ANALYSIS_LINES):
+        """Start analysing a copy of the board with color to move, dropping the analysis of any earlier position."""
+        self.stop_analysis()
+        self.analysis_id += 1
+        self.analysis = None
+        self.analysis_future = self._submit(_analyse, [row[:] for row in board], color, count, self.analysis_id)
+
+    def analysing(self):
+        """True until the analysis stops: it was stopped, or it reached ANALYSIS_MAX_DEPTH or ANALYSIS_SECONDS."""
+        return self.analysis_future is not None and not self.analysis_future.done()
+
+    def stop_analysis(self):
+        if self.analysis_future is not None:
+            if not self.analysis_future.cancel():
+                self.stop_event.set()
+            self.analysis_future = None
+
+    def analysis_lines(self):
+        """The deepest (depth, lines) the analysis of the current position has sent, None before the first.
+
+        Never waits: this takes what has arrived since the last call and
+        drops lines left over from positions analysed before.
+        """
+        while self.analysis_results is not None:
+            try:
+                analysis_id, depth, lines = self.analysis_results.get_nowait()
+            except queue.Empty:
+                break
+            if analysis_id == self.analysis_id:
+                self.analysis = (depth, lines)
+        return self.analysis
+
+    def cancel(self):
+        """Drop the current search and any pondering; work that already started is told to stop."""
+        self.stop_pondering()
+        if self.future is not None:
+            if not self.future.cancel():
+                self.stop_event.set()
+            self.future = None
+
+    def set_instrumented(self, on):
+        """Fill in search statistics from the next search on, or stop."""
+        self.instrumented.value = bool(on)
+
+    def search_stats(self):
+        """The statistics of the running or last search as a SearchStats, None before there are any."""
+        stats = SearchStats.from_values(self.live_stats[:])
+        return stats if stats.elapsed > 0 else None
+
+    def shutdown(self):
+        self.cancel()
+        self.stop_analysis()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
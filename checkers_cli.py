@@ -0,0 +1,146 @@
+"""Command line use of the engine, without pygame or a display.
+
+    python checkers_cli.py analyse [--fen FEN] [--difficulty hard] [--time 2.0] [--depth 12]
+                                   [--stats] [--trace trace.json] [--profile stacks.folded]
+    python checkers_cli.py selfplay [--games 10] [--black medium] [--red hard] [--max-moves 200]
+
+For thousands of games across all cores, use tournament.py.
+
+Positions are PDN FEN strings, e.g. "B:W21-32:B1-12" for the start, and
+moves are written with PDN square numbers.
+
+analyse --stats prints the search statistics of search_stats.py, --trace
+writes the search as Chrome trace events and --profile writes the stacks
+the sampling profiler saw, for a flame graph.
+"""
+import argparse
+import sys
+import time
+
+import engine
+from bitboard import Position, move_to_text
+from engine import BLACK, RED, BOT_SEARCH_SETTINGS, iterative_deepening, principal_variation
+from search_stats import SamplingProfiler, SearchStats, TraceExporter
+from tablebase import DEFAULT_DIRECTORY, WIN, LOSS, DRAW, load_tablebases
+from tournament import play_game
+from transposition import TranspositionTable
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+
+def search_settings(difficulty, time_budget=None, max_depth=None):
+    """Time budget and maximum depth for a difficulty, with optional overrides."""
+    settings = dict(BOT_SEARCH_SETTINGS.get(difficulty, BOT_SEARCH_SETTINGS['hard']))
+    if time_budget is not None:
+        settings['time_budget'] = time_budget
+    if max_depth is not None:
+        settings['max_depth'] = max_depth
+    return settings
+
+
+def tablebase_line(position, max_length=40):
+    """Best play from the tablebases until the game ends or the position leaves them."""
+    position = position.copy()
+    line = []
+    while engine.tablebases is not None and len(line) < max_length:
+        move = engine.tablebases.best_move(position) if position.generate_moves() else None
+        if move is None:
+            break
+        line.append(move)
+        position.apply(move)
+    return line
+
+
+def analyse(args):
+    engine.tablebases = load_tablebases(args.tablebases)
+    position = Position.from_fen(args.fen)
+    color = BLACK if position.black_to_move else RED
+    settings = search_settings(args.difficulty, args.time, args.depth)
+    table = TranspositionTable()
+    trace = TraceExporter() if args.trace else None
+    profiler = SamplingProfiler() if args.profile else None
+    hooks = [hook for hook in (trace, profiler) if hook is not None]
+    engine.search_stats = SearchStats(hooks) if args.stats or hooks else None
+    engine.nodes_searched = 0
+    start = time.perf_counter()
+    score, move, depth = iterative_deepening(position, color, settings['time_budget'], settings['max_depth'], table)
+    elapsed = time.perf_counter() - start
+    stats, engine.search_stats = engine.search_stats, None
+    if trace is not None:
+        trace.save(args.trace)
+    if profiler is not None:
+        profiler.write_folded(args.profile)
+    print(f"position: {position.to_fen()}")
+    if move is None:
+        print(f"{'Black' if color == BLACK else 'Red'} has no move and loses")
+        return
+    line = principal_variation(position, table) or tablebase_line(position) or [move]
+    print(f"best move: {move_to_text(move)}")
+    print(f"score:     {score:+.2f} for {'Black' if color == BLACK else 'Red'}")
+    print(f"depth:     {depth}")
+    entry = engine.tablebases.probe(position) if engine.tablebases is not None else None
+    if entry is not None:
+        result, distance = entry
+        outcome = {WIN: f"win in {distance} plies", LOSS: f"loss in {distance} plies", DRAW: "draw"}[result]
+        print(f"tablebase: {outcome}")
+    print(f"nodes:     {engine.nodes_searched:,} in {elapsed:.2f}s "
+          f"({engine.nodes_searched / max(elapsed, 1e-9):,.0f} nodes/s)")
+    print(f"line:      {' '.join(move_to_text(m) for m in line)}")
+    if args.stats:
+        for index, text in enumerate(stats.summary_lines()):
+            print(f"{'search:' if index == 0 else '':<11}{text}")
+    if profiler is not None:
+        hottest = ", ".join(f"{name} {share:.0%}" for name, share in profiler.top_functions(3))
+        print(f"profile:   {hottest}; stacks written to {args.profile}")
+    if trace is not None:
+        print(f"trace:     written to {args.trace}")
+
+
+def selfplay(args):
+    results = {'black': 0, 'red': 0, 'draw': 0}
+    for game in range(1, args.games + 1):
+        start = time.perf_counter()
+        record = play_game(args.black, args.red, args.opening_plies, args.seed + game, args.max_moves,
+                           args.time, args.depth)
+        results[record['result']] += 1
+        outcome = "draw" if record['result'] == 'draw' else record['result'].capitalize() + " wins"
+        print(f"game {game}: {outcome} ({record['reason']}) after {record['plies']} plies "
+              f"({time.perf_counter() - start:.1f}s)")
+    print(f"Black ({args.black}) {results['black']}, Red ({args.red}) {results['red']}, draws {results['draw']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checkers engine without the game window.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyse_parser = commands.add_parser("analyse", help="search a position and print the best move")
+    analyse_parser.add_argument("--fen", default=Position.initial().to_fen(), help="position to analyse (PDN FEN)")
+    analyse_parser.add_argument("--difficulty", choices=DIFFICULTIES[1:], default="hard")
+    analyse_parser.add_argument("--time", type=float, help="seconds to search, overrides the difficulty")
+    analyse_parser.add_argument("--depth", type=int, help="maximum depth, overrides the difficulty")
+    analyse_parser.add_argument("--tablebases", default=DEFAULT_DIRECTORY, help="endgame tablebase directory")
+    analyse_parser.add_argument("--stats", action="store_true", help="print the search statistics")
+    analyse_parser.add_argument("--trace", help="write the search as Chrome trace events to this file")
+    analyse_parser.add_argument("--profile", help="write the sampled stacks of the search to this file")
+    analyse_parser.set_defaults(run=analyse)
+
+    selfplay_parser = commands.add_parser("selfplay", help="play bots against each other")
+    selfplay_parser.add_argument("--games", type=int, default=1)
+    selfplay_parser.add_argument("--black", choices=DIFFICULTIES, default="medium")
+    selfplay_parser.add_argument("--red", choices=DIFFICULTIES, default="medium")
+    selfplay_parser.add_argument("--max-moves", type=int, default=200, help="plies before a game is a draw")
+    selfplay_parser.add_argument("--time", type=float, help="seconds per move, overrides the difficulty")
+    selfplay_parser.add_argument("--depth", type=int, help="maximum depth, overrides the difficulty")
+    selfplay_parser.add_argument("--opening-plies", type=int, default=0, help="random plies at the start of each game")
+    selfplay_parser.add_argument("--seed", type=int, default=0, help="seed for the openings and the easy bot")
+    selfplay_parser.set_defaults(run=selfplay)
+
+    args = parser.parse_args(argv)
+    try:
+        args.run(args)
+    except ValueError as error:
+        parser.error(str(error))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
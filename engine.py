@@ -0,0 +1,603 @@
+"""Checkers rules and bot search, independent of the display.
+
+Every function here takes the board (or bitboard Position) it works on as an
+argument, so the UI, the bot search and the benchmarks all run the same rules
+on whatever position they are looking at. The rules are those of the board's
+variant (see variants.py): English checkers on an 8x8 board, international
+draughts on a 10x10 one.
+"""
+import os
+import random
+import time
+
+from bitboard import BLACK_PIECE, RED_PIECE, BLACK_KING, RED_KING, SCORE_SCALE
+from tablebase import WIN, LOSS
+from transposition import EXACT, LOWER, UPPER
+from variants import VARIANTS, board_variant, position_variant
+
+# Side colors, same values as the UI colors so either can be passed around
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+
+# Time budget (seconds per move), maximum depth and search processes for each
+# searching bot. Hard splits its root moves across all but one core, leaving
+# that one for the game window.
+BOT_SEARCH_SETTINGS = {
+    'medium': {'time_budget': 0.25, 'max_depth': 3, 'workers': 1, 'ponder': False},
+    'hard': {'time_budget': 1.0, 'max_depth': 30, 'workers': max(1, (os.cpu_count() or 1) - 1), 'ponder': True},
+}
+
+# Number of positions visited by minimax since the counter was last reset,
+# and how many of them were in the quiescence search
+nodes_searched = 0
+quiescence_nodes = 0
+
+# Quiescence search: at depth 0 minimax plays out pending captures before
+# evaluating, so the bot doesn't stop looking halfway through an exchange
+quiescence_search = True  # Off only to measure what it gains
+QUIESCENCE_NODE_BUDGET = 64  # Most quiescence nodes searched below one leaf
+quiescence_left = 0
+
+# perf_counter() time at which a running search gives up, None for no limit
+search_deadline = None
+# Optional threading/multiprocessing Event another thread or process can set to stop the search
+search_stop_event = None
+DEADLINE_CHECK_INTERVAL = 1024  # Nodes between clock checks, must be a power of two
+
+# Move ordering: minimax searches the moves most likely to cause a cutoff first.
+# Killer moves are the last two quiet moves that caused a cutoff at each ply,
+# and the history table scores every (from, to) pair by the cutoffs it caused.
+move_ordering = True  # Off only to measure what ordering saves
+MAX_PLY = 128
+killer_moves = [[None, None] for _ in range(MAX_PLY)]
+history = [0] * 4096  # Indexed by from_square * 64 + to_square, big enough for 10x10's 50 squares
+HISTORY_LIMIT = 1 << 20  # History scores are halved when one gets this big
+
+# Analysis (see analyse()): root moves scoring at least the count-th best
+# minus MULTI_PV_EPSILON get an exact score, and principal variations are
+# followed this many moves deep
+MULTI_PV_EPSILON = 1e-6
+MULTI_PV_LENGTH = 12
+
+# Search instrumentation: a search_stats.SearchStats that every search fills in,
+# None (the default) for none
+search_stats = None
+
+# Static evaluation of each variant's positions, from black's side
+evaluators = {variant.position_class: variant.evaluate for variant in VARIANTS.values()}
+
+# Endgame tablebases (a tablebase.Tablebases) probed by minimax once few enough pieces are left
+tablebases = None
+# Score of a tablebase win, above any material score; a win n plies away scores this minus n
+TABLEBASE_WIN_SCORE = 1000
+
+
+class SearchTimeout(Exception):
+    """Raised inside minimax when search_deadline has passed or search_stop_event is set."""
+
+
+def search_should_stop():
+    if search_deadline is not None and time.perf_counter() > search_deadline:
+        return True
+    return search_stop_event is not None and search_stop_event.is_set()
+
+
+def opponent(color):
+    return RED if color == BLACK else BLACK
+
+
+def piece_color(piece):
+    """Return the side a board piece belongs to, or None for an empty square."""
+    if piece in (BLACK_PIECE, BLACK_KING):
+        return BLACK
+    if piece in (RED_PIECE, RED_KING):
+        return RED
+    return None
+
+
+def board_position(board, color):
+    """The bitboard position of a list-of-lists board with color to move, in the board's variant."""
+    return board_variant(board).position_class.from_board(board, black_to_move=(color == BLACK))
+
+
+def get_valid_moves(board, color):
+    """Get all valid moves for a given color as ((start_row, start_col), (end_row, end_col)) pairs.
+
+    A capture is forced when there is one, and a multi-jump is a single move
+    from where the piece starts to where its last jump lands.
+    """
+    move_to_rowcol = board_variant(board).move_to_rowcol
+    return [move_to_rowcol(move) for move in board_position(board, color).generate_moves()]
+
+
+def is_valid_move(board, start, end):
+    """Validate a move for the piece on the start square, including simple moves and captures."""
+    color = piece_color(board[start[0]][start[1]])
+    if color is None:
+        return False
+    return (tuple(start), tuple(end)) in get_valid_moves(board, color)
+
+
+def game_over(board):
+    """The game is over once either side has no move left."""
+    return not get_valid_moves(board, BLACK) or not get_valid_moves(board, RED)
+
+
+def find_move(board, start, end):
+    """Return the bitboard move that takes the piece on start to end, None when there is none.
+
+    Two jump sequences can join the same squares while taking different
+    pieces; the one that takes the most is picked.
+    """
+    color = piece_color(board[start[0]][start[1]])
+    if color is None:
+        return None
+    move_to_rowcol = board_variant(board).move_to_rowcol
+    matches = [move for move in board_position(board, color).generate_moves()
+               if move_to_rowcol(move) == (tuple(start), tuple(end))]
+    if not matches:
+        return None
+    return max(matches, key=lambda move: move[2].bit_count())
+
+
+def make_move(board, start, end):
+    """Play a validated move on the board in place, removing every jumped piece and crowning a man on the far row."""
+    move = find_move(board, start, end)
+    position = board_position(board, piece_color(board[start[0]][start[1]]))
+    position.apply(move)
+    board[:] = position.to_board()
+
+
+def winner(board, color_to_move):
+    """Return the color that has won, or None while the game goes on.
+
+    A side loses when it has no pieces left, or when it is its turn and it
+    has no move.
+    """
+    pieces = [piece_color(piece) for row in board for piece in row]
+    if BLACK not in pieces:
+        return RED
+    if RED not in pieces:
+        return BLACK
+    if not get_valid_moves(board, color_to_move):
+        return opponent(color_to_move)
+    return None
+
+
+def evaluate_board(position, bot_color):
+    """Static score of a position for bot_color, in men; the terms and weights are in evaluation.py."""
+    if search_stats is not None:
+        return _timed_evaluate(position, bot_color)
+    score = evaluators[position.__class__](position) / SCORE_SCALE
+    return score if bot_color == BLACK else -score
+
+
+def _timed_evaluate(position, bot_color):
+    start = time.perf_counter()
+    score = evaluators[position.__class__](position) / SCORE_SCALE
+    search_stats.eval_time += time.perf_counter() - start
+    search_stats.leaf_evals += 1
+    return score if bot_color == BLACK else -score
+
+
+def _timed_generate_moves(position, stats):
+    start = time.perf_counter()
+    moves = position.generate_moves()
+    stats.movegen_time += time.perf_counter() - start
+    stats.movegen_calls += 1
+    return moves
+
+
+def tablebase_score(position, bot_color):
+    """Exact score of a position from the tablebases, None when they don't cover it."""
+    entry = tablebases.probe(position)
+    if entry is None:
+        return None
+    result, distance = entry
+    if result == WIN:
+        score = TABLEBASE_WIN_SCORE - distance
+    elif result == LOSS:
+        score = distance - TABLEBASE_WIN_SCORE
+    else:
+        score = 0
+    return score if position.black_to_move == (bot_color == BLACK) else -score
+
+
+def age_move_ordering():
+    """Get the killers and history ready for a new search.
+
+    Killers are position-specific, so they are forgotten. History scores are
+    halved, so what worked in the last search still counts but fades.
+    """
+    for killers in killer_moves:
+        killers[0] = killers[1] = None
+    for index, score in enumerate(history):
+        if score:
+            history[index] = score >> 1
+
+
+def order_moves(position, moves, hash_move, ply):
+    """Sort moves in place, most promising first.
+
+    The transposition table's best move comes first. Captures are forced, so
+    the moves are either all captures, taking the most pieces first, or all
+    quiet moves: promotions, then this ply's killer moves, then the rest by
+    history score.
+    """
+    if moves[0][2]:
+        moves.sort(key=lambda move: move[2].bit_count(), reverse=True)
+        front = []
+    else:
+        moves.sort(key=lambda move: history[move[0] * 64 + move[1]], reverse=True)
+        own_men = (position.black if position.black_to_move else position.red) & ~position.kings
+        king_row = position.king_rows[position.black_to_move]
+        front = [move for move in moves if own_men >> move[0] & 1 and king_row >> move[1] & 1]
+        if ply < MAX_PLY:
+            for killer in killer_moves[ply]:
+                if killer is not None and killer not in front and killer in moves:
+                    front.append(killer)
+    if hash_move is not None and hash_move in moves:
+        if hash_move in front:
+            front.remove(hash_move)
+        front.insert(0, hash_move)
+    if front:
+        moves[:] = front + [move for move in moves if move not in front]
+
+
+def record_cutoff(move, depth, ply):
+    """A quiet move caused a beta cutoff: make it a killer at this ply and raise its history score."""
+    if move[2]:
+        return  # Captures are searched first anyway
+    if ply < MAX_PLY:
+        killers = killer_moves[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+    index = move[0] * 64 + move[1]
+    history[index] += depth * depth
+    if history[index] >= HISTORY_LIMIT:
+        for i, score in enumerate(history):
+            history[i] = score >> 1
+
+
+def no_move_score(maximizing_player, ply):
+    """Score for the bot of a position whose side to move has no move, which loses; sooner is bigger.
+
+    The loss is scored like a tablebase loss, ply plies from the root, so
+    the bot plays for the fastest win and the slowest loss.
+    """
+    return ply - TABLEBASE_WIN_SCORE if maximizing_player else TABLEBASE_WIN_SCORE - ply
+
+
+def quiescence(position, alpha, beta, maximizing_player, bot_color, ply):
+    """Score a leaf of the main search once no capture is pending.
+
+    Captures are forced, so while the side to move has one it must be
+    searched, and only then can the position be evaluated. A side without a
+    capture stands pat on the evaluation, unless it has no move at all and
+    has lost. Each leaf gets QUIESCENCE_NODE_BUDGET nodes; past that the
+    position is evaluated as it is. The position itself was counted by
+    minimax, the captures played from it are counted here.
+    """
+    global nodes_searched, quiescence_nodes, quiescence_left
+    if quiescence_left <= 0:
+        return evaluate_board(position, bot_color)
+    if not position.has_capture():
+        if not position.has_quiet_move():
+            return no_move_score(maximizing_player, ply)
+        return evaluate_board(position, bot_color)
+    moves = position.generate_moves() if search_stats is None else _timed_generate_moves(position, search_stats)
+    quiescence_left -= len(moves)
+    nodes_searched += len(moves)
+    quiescence_nodes += len(moves)
+    if search_should_stop():
+        raise SearchTimeout()
+    if len(moves) > 1:
+        moves.sort(key=lambda move: move[2].bit_count(), reverse=True)
+
+    if maximizing_player:
+        best_eval = float('-inf')
+        for move in moves:
+            kings = position.apply(move)
+            eval_score = quiescence(position, alpha, beta, False, bot_color, ply + 1)
+            position.undo(move, kings)
+            best_eval = max(best_eval, eval_score)
+            alpha = max(alpha, eval_score)
+            if beta <= alpha:
+                break
+    else:
+        best_eval = float('inf')
+        for move in moves:
+            kings = position.apply(move)
+            eval_score = quiescence(position, alpha, beta, True, bot_color, ply + 1)
+            position.undo(move, kings)
+            best_eval = min(best_eval, eval_score)
+            beta = min(beta, eval_score)
+            if beta <= alpha:
+                break
+    return best_eval
+
+
+def minimax(position, depth, alpha, beta, maximizing_player, bot_color, table=None, ply=0):
+    """Alpha-beta search on a bitboard Position, playing and taking back moves in place.
+
+    Moves are always generated from the position being searched, so every ply
+    expands the child reached by the moves above it. With a TranspositionTable
+    the search takes cutoffs from earlier results and tries the stored best
+    move first. Moves are ordered by order_moves(); ply is the distance from
+    the root, for the killer moves. At depth 0 pending captures are played
+    out by quiescence() before the position is evaluated.
+    """
+    global nodes_searched, quiescence_left
+    nodes_searched += 1
+    stats = search_stats
+    if nodes_searched & (DEADLINE_CHECK_INTERVAL - 1) == 0:
+        if stats is not None and stats.hooks:
+            stats.progress(nodes_searched, quiescence_nodes)
+        if search_should_stop():
+            raise SearchTimeout()
+    if tablebases is not None and (position.black | position.red).bit_count() <= tablebases.max_pieces:
+        score = tablebase_score(position, bot_color)
+        if score is not None:
+            return score, None
+    if depth == 0:
+        if quiescence_search:
+            quiescence_left = QUIESCENCE_NODE_BUDGET
+            return quiescence(position, alpha, beta, maximizing_player, bot_color, ply), None
+        return evaluate_board(position, bot_color), None
+
+    hash_move = None
+    if table is not None:
+        entry = table.probe(position.hash)
+        if stats is not None:
+            stats.tt_probes += 1
+            stats.tt_hits += entry is not None
+        if entry is not None:
+            _, entry_depth, entry_score, bound, hash_move, _ = entry
+            if entry_depth >= depth:
+                # Stored scores are for the side to move, flip them for the minimizing side
+                if not maximizing_player:
+                    entry_score = -entry_score
+                    bound = LOWER if bound == UPPER else UPPER if bound == LOWER else EXACT
+                if bound == EXACT:
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return entry_score, hash_move
+                elif bound == LOWER:
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if beta <= alpha:
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return entry_score, hash_move
+    alpha_orig, beta_orig = alpha, beta
+
+    if stats is None:
+        moves = position.generate_moves()
+    else:
+        moves = _timed_generate_moves(position, stats)
+        if ply > stats.max_ply:
+            stats.max_ply = ply
+
+    if not moves:
+        return no_move_score(maximizing_player, ply), None
+
+    if move_ordering and depth > 1 and len(moves) > 1:
+        # Right above the leaves a cutoff saves less than ordering costs
+        order_moves(position, moves, hash_move, ply)
+    elif hash_move is not None and hash_move in moves:
+        moves.remove(hash_move)
+        moves.insert(0, hash_move)
+
+    best_move = None
+
+    if maximizing_player:
+        best_eval = float('-inf')
+        for move in moves:
+            kings = position.apply(move)
+            eval_score, _ = minimax(position, depth - 1, alpha, beta, False, bot_color, table, ply + 1)
+            position.undo(move, kings)
+            if eval_score > best_eval:
+                best_eval = eval_score
+                best_move = move
+            alpha = max(alpha, eval_score)
+            if beta <= alpha:
+                if move_ordering:
+                    record_cutoff(move, depth, ply)
+                if stats is not None:
+                    stats.record_cutoff(moves.index(move))
+                break
+    else:
+        best_eval = float('inf')
+        for move in moves:
+            kings = position.apply(move)
+            eval_score, _ = minimax(position, depth - 1, alpha, beta, True, bot_color, table, ply + 1)
+            position.undo(move, kings)
+            if eval_score < best_eval:
+                best_eval = eval_score
+                best_move = move
+            beta = min(beta, eval_score)
+            if beta <= alpha:
+                if move_ordering:
+                    record_cutoff(move, depth, ply)
+                if stats is not None:
+                    stats.record_cutoff(moves.index(move))
+                break
+
+    if table is not None:
+        if best_eval <= alpha_orig:
+            bound = UPPER
+        elif best_eval >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        if not maximizing_player:
+            bound = LOWER if bound == UPPER else UPPER if bound == LOWER else EXACT
+        table.store(position.hash, depth, best_eval if maximizing_player else -best_eval, bound, best_move)
+    return best_eval, best_move
+
+
+def principal_variation(position, table, max_length=20):
+    """Follow the table's best moves from a position to get the expected line of play."""
+    position = position.copy()
+    line = []
+    seen = set()
+    while len(line) < max_length and position.hash not in seen:
+        seen.add(position.hash)
+        entry = table.probe(position.hash)
+        if entry is None or entry[4] is None or entry[4] not in position.generate_moves():
+            break
+        line.append(entry[4])
+        position.apply(entry[4])
+    return line
+
+
+def iterative_deepening(position, bot_color, time_budget, max_depth, table=None):
+    """Search depth 1, 2, 3, ... until the time budget runs out or max_depth is done.
+
+    Returns (score, move, depth) from the last depth that finished. Each
+    iteration leaves its principal variation in the transposition table, so the
+    next one searches those moves first and the earlier iterations pay for
+    themselves in cutoffs.
+    """
+    stats = search_stats
+    if stats is None:
+        return _deepen(position, bot_color, time_budget, max_depth, table, None)
+    stats.begin(nodes_searched, quiescence_nodes)
+    try:
+        return _deepen(position, bot_color, time_budget, max_depth, table, stats)
+    finally:
+        stats.finish(nodes_searched, quiescence_nodes)
+
+
+def _deepen(position, bot_color, time_budget, max_depth, table, stats):
+    global search_deadline
+    if table is None:
+        table = position_variant(position).table_class()
+    table.new_search()
+    age_move_ordering()
+    start = time.perf_counter()
+
+    moves = position.generate_moves()
+    if len(moves) == 1:
+        return evaluate_board(position, bot_color), moves[0], 0
+    if moves and tablebases is not None and (position.black | position.red).bit_count() <= tablebases.max_pieces:
+        # minimax would return the root's own tablebase score without a move, so pick it here
+        move = tablebases.best_move(position)
+        if move is not None:
+            return tablebase_score(position, bot_color), move, 0
+
+    best_score, best_move, completed_depth = None, moves[0] if moves else None, 0
+    try:
+        for depth in range(1, max_depth + 1):
+            # Depth 1 always finishes so there is a searched move to fall back on
+            search_deadline = start + time_budget if depth > 1 else None
+            score, move = minimax(position.copy(), depth, float('-inf'), float('inf'), True, bot_color, table)
+            best_score, best_move, completed_depth = score, move, depth
+            if stats is not None:
+                stats.end_iteration(depth, score, move, nodes_searched, quiescence_nodes)
+            elapsed = time.perf_counter() - start
+            # The next iteration takes several times longer than this one, so
+            # don't start it unless it has a realistic chance of finishing
+            if elapsed > time_budget / 2:
+                break
+    except SearchTimeout:
+        pass
+    finally:
+        search_deadline = None
+    return best_score, best_move, completed_depth
+
+
+def search_root_moves(position, depth, count, table, moves):
+    """Fixed-depth search of the root moves, in the order given, with exact scores for the best `count`.
+
+    Returns (score, move) pairs for every move, best first, scored in men
+    for the side to move. Each move is searched with alpha just below the
+    count-th best score found so far, so a move that can't make the list
+    fails low quickly and its score is only an upper bound.
+    """
+    color = BLACK if position.black_to_move else RED
+    scored = []
+    best = []  # The best `count` scores so far, highest first
+    for move in moves:
+        alpha = best[-1] - MULTI_PV_EPSILON if len(best) == count else float('-inf')
+        kings = position.apply(move)
+        score, _ = minimax(position, depth - 1, alpha, float('inf'), False, color, table, 1)
+        position.undo(move, kings)
+        scored.append((score, move))
+        if len(best) < count or score > best[-1]:
+            best = sorted(best + [score], reverse=True)[:count]
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    table.store(position.hash, depth, scored[0][0], EXACT, scored[0][1])
+    return scored
+
+
+def analyse(position, count, table=None, time_budget=None, max_depth=MAX_PLY, on_depth=None):
+    """Multi-PV iterative deepening: the best `count` moves with their scores and principal variations.
+
+    Searches depth 1, 2, 3, ... until max_depth is done, time_budget
+    seconds have passed or search_stop_event is set, and calls
+    on_depth(depth, lines) after every depth. A line is (score, moves): the
+    score in men for the side to move and the principal variation, which
+    starts with the move. Each depth searches the root moves in the order
+    the one before ranked them. A table kept from the search of an earlier
+    position gives this one a warm start: its best moves are tried first
+    and the subtrees it already searched deep enough are cut off.
+
+    Returns (depth, lines) for the last depth that finished, (0, []) when
+    there is no move.
+    """
+    global search_deadline
+    if table is None:
+        table = position_variant(position).table_class()
+    table.new_search()
+    age_move_ordering()
+    position = position.copy()
+    moves = position.generate_moves()
+    entry = table.probe(position.hash)
+    if entry is not None and entry[4] in moves:
+        moves.remove(entry[4])
+        moves.insert(0, entry[4])
+
+    completed_depth, lines = 0, []
+    search_deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    try:
+        for depth in range(1, max_depth + 1 if moves else 1):
+            scored = search_root_moves(position, depth, count, table, moves)
+            moves = [move for _, move in scored]
+            lines = []
+            for score, move in scored[:count]:
+                kings = position.apply(move)
+                lines.append((score, [move] + principal_variation(position, table, MULTI_PV_LENGTH - 1)))
+                position.undo(move, kings)
+            completed_depth = depth
+            if on_depth is not None:
+                on_depth(depth, lines)
+    except SearchTimeout:
+        pass
+    finally:
+        search_deadline = None
+    return completed_depth, lines
+
+
+def choose_move(position, bot_color, difficulty, table=None, time_budget=None, max_depth=None, rng=random):
+    """Pick the bot's move for a difficulty level, or None when it has no move.
+
+    time_budget and max_depth override the difficulty's settings; rng is what
+    the easy bot draws its random moves from.
+    """
+    moves = position.generate_moves()
+    if not moves:
+        return None
+    if difficulty == 'easy':
+        # Random move
+        return rng.choice(moves)
+    # Medium and hard search deeper and deeper until their time budget runs out
+    settings = BOT_SEARCH_SETTINGS[difficulty]
+    if time_budget is None:
+        time_budget = settings['time_budget']
+    if max_depth is None:
+        max_depth = settings['max_depth']
+    _, move, _ = iterative_deepening(position, bot_color, time_budget, max_depth, table)
+    return move
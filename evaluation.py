@@ -0,0 +1,245 @@
+"""Static evaluation of a position, with weights read from evaluation_weights.json.
+
+The evaluation is a weighted sum of these terms, each counted as black's
+number minus red's:
+
+    man, king     material
+    back_rank     men still on their own back row, keeping the other side's men from crowning
+    centre        pieces on the eight centre squares
+    king_tempo    rows the men have advanced towards being crowned
+    mobility      simple moves the side could make
+    runaway       men past the middle with no opponent piece in front of them
+
+The first five only depend on one piece at a time, so they are folded into
+piece-square values that Position.apply() and undo() keep summed in
+Position.score. Mobility and runaway men depend on several pieces and are
+worked out with a few mask operations when a position is evaluated.
+
+Scores are whole thousandths of a man (bitboard.SCORE_SCALE) so the running
+sum stays exact. evaluate_batch() scores many positions at once with NumPy,
+for tuning.py; NumPy is only imported when it is used, so the game and the
+bot don't need it.
+"""
+import json
+import os
+
+import bitboard
+from bitboard import (BLACK_MAN_DIRECTIONS, DOWN_STEPS, FULL_MASK, KING_DIRECTIONS, NUM_SQUARES,
+                      RED_MAN_DIRECTIONS, SCORE_SCALE, SQUARE_TO_ROWCOL, STEP_SHIFTS, UP_STEPS)
+
+DEFAULT_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "evaluation_weights.json")
+
+# In men; the terms are listed in the order features() returns them
+FEATURES = ("man", "king", "back_rank", "centre", "king_tempo", "mobility", "runaway")
+DEFAULT_WEIGHTS = {
+    "man": 1.0,
+    "king": 1.5,
+    "back_rank": 0.05,
+    "centre": 0.04,
+    "king_tempo": 0.01,
+    "mobility": 0.02,
+    "runaway": 0.2,
+}
+
+BLACK_BACK_ROW = 0x0000000F
+RED_BACK_ROW = 0xF0000000
+CENTRE = sum(1 << sq for sq in (9, 10, 13, 14, 17, 18, 21, 22))
+ROWS = [0xF << (4 * row) for row in range(8)]
+# Men that can be runaways: black on rows 4-6, red on rows 1-3
+BLACK_RUNAWAY_ZONE = ROWS[4] | ROWS[5] | ROWS[6]
+RED_RUNAWAY_ZONE = ROWS[1] | ROWS[2] | ROWS[3]
+
+
+def _cone(sq, row_step):
+    """Squares a man on sq could still reach moving row_step rows at a time: where it can be stopped."""
+    row, col = SQUARE_TO_ROWCOL[sq]
+    mask = 0
+    for other, (other_row, other_col) in enumerate(SQUARE_TO_ROWCOL):
+        rows_ahead = (other_row - row) * row_step
+        if rows_ahead > 0 and abs(other_col - col) <= rows_ahead:
+            mask |= 1 << other
+    return mask
+
+
+BLACK_CONES = [_cone(sq, 1) for sq in range(NUM_SQUARES)]
+RED_CONES = [_cone(sq, -1) for sq in range(NUM_SQUARES)]
+
+# Term weights in thousandths of a man, set by set_weights()
+weights = dict(DEFAULT_WEIGHTS)
+mobility_value = 0
+runaway_value = 0
+
+
+def load_weights(path=DEFAULT_WEIGHTS_PATH):
+    """Read weights from a JSON file of {term: weight}; terms it leaves out keep their defaults.
+
+    A missing file gives the defaults. Raises ValueError for a file that
+    isn't a set of weights.
+    """
+    loaded = dict(DEFAULT_WEIGHTS)
+    if not os.path.exists(path):
+        return loaded
+    try:
+        with open(path) as weights_file:
+            values = json.load(weights_file)
+    except json.JSONDecodeError as error:
+        raise ValueError(f"{path} is not valid JSON: {error}")
+    if not isinstance(values, dict):
+        raise ValueError(f"{path} should hold an object of term weights")
+    for term, value in values.items():
+        if term not in DEFAULT_WEIGHTS:
+            raise ValueError(f"{path}: unknown term {term!r}, expected one of {', '.join(FEATURES)}")
+        if not isinstance(value, (int, float)):
+            raise ValueError(f"{path}: weight of {term!r} should be a number")
+        loaded[term] = float(value)
+    return loaded
+
+
+def save_weights(values, path=DEFAULT_WEIGHTS_PATH):
+    with open(path + ".tmp", "w") as weights_file:
+        json.dump({term: round(values[term], 4) for term in FEATURES}, weights_file, indent=2)
+        weights_file.write("\n")
+    os.replace(path + ".tmp", path)
+
+
+def scaled_weights(values=None):
+    """The weights as whole thousandths of a man, in FEATURES order."""
+    values = weights if values is None else values
+    return [round(values[term] * SCORE_SCALE) for term in FEATURES]
+
+
+def set_weights(values):
+    """Use these weights from now on. Positions made before keep the score sums of the old ones."""
+    global weights, mobility_value, runaway_value
+    weights = dict(values)
+    man, king, back_rank, centre, king_tempo, mobility_value, runaway_value = scaled_weights(values)
+    black_man, black_king = [], []
+    for sq in range(NUM_SQUARES):
+        row = SQUARE_TO_ROWCOL[sq][0]
+        in_centre = CENTRE >> sq & 1
+        black_man.append(man + back_rank * (BLACK_BACK_ROW >> sq & 1) + centre * in_centre + king_tempo * row)
+        black_king.append(king + centre * in_centre)
+    # Red's values are black's with the board turned round, and count against black
+    bitboard.set_square_values(black_man, black_king,
+                               [-black_man[NUM_SQUARES - 1 - sq] for sq in range(NUM_SQUARES)],
+                               [-black_king[NUM_SQUARES - 1 - sq] for sq in range(NUM_SQUARES)])
+
+
+def _mobility(own, own_kings, empty, forward_up):
+    """Simple moves for a side; forward_up is True for red, whose men move towards lower squares."""
+    moves = 0
+    up, down = (own, own_kings) if forward_up else (own_kings, own)
+    if down:
+        for shift, source_mask in DOWN_STEPS:
+            moves += ((down & source_mask) << shift & empty).bit_count()
+    if up:
+        for shift, source_mask in UP_STEPS:
+            moves += ((up & source_mask) >> shift & empty).bit_count()
+    return moves
+
+
+def _runaways(men, opp, cones):
+    count = 0
+    while men:
+        bit = men & -men
+        if not opp & cones[bit.bit_length() - 1]:
+            count += 1
+        men ^= bit
+    return count
+
+
+def evaluate(position):
+    """Score of a position from black's side, in thousandths of a man."""
+    black, red, kings = position.black, position.red, position.kings
+    score = position.score
+    if mobility_value:
+        empty = ~(black | red) & FULL_MASK
+        score += mobility_value * (_mobility(black, black & kings, empty, False)
+                                   - _mobility(red, red & kings, empty, True))
+    if runaway_value:
+        score += runaway_value * (_runaways(black & ~kings & BLACK_RUNAWAY_ZONE, red, BLACK_CONES)
+                                  - _runaways(red & ~kings & RED_RUNAWAY_ZONE, black, RED_CONES))
+    return score
+
+
+def features(position):
+    """The terms of the evaluation for one position, in FEATURES order."""
+    black, red, kings = position.black, position.red, position.kings
+    black_men, red_men = black & ~kings, red & ~kings
+    empty = ~(black | red) & FULL_MASK
+    return [
+        black_men.bit_count() - red_men.bit_count(),
+        (black & kings).bit_count() - (red & kings).bit_count(),
+        (black_men & BLACK_BACK_ROW).bit_count() - (red_men & RED_BACK_ROW).bit_count(),
+        (black & CENTRE).bit_count() - (red & CENTRE).bit_count(),
+        sum(row * (black_men & ROWS[row]).bit_count() - (7 - row) * (red_men & ROWS[row]).bit_count()
+            for row in range(8)),
+        _mobility(black, black & kings, empty, False)
+        - _mobility(red, red & kings, empty, True),
+        _runaways(black_men & BLACK_RUNAWAY_ZONE, red, BLACK_CONES)
+        - _runaways(red_men & RED_RUNAWAY_ZONE, black, RED_CONES),
+    ]
+
+
+def _bit_counts(values):
+    """np.bitwise_count of a uint32 array, for NumPy before 2.0 which doesn't have it."""
+    values = values - ((values >> 1) & 0x55555555)
+    values = (values & 0x33333333) + ((values >> 2) & 0x33333333)
+    values = (values + (values >> 4)) & 0x0F0F0F0F
+    return (values * 0x01010101) >> 24
+
+
+def features_batch(black, red, kings):
+    """features() for many positions at once, from arrays of masks; returns an (n, len(FEATURES)) int64 array."""
+    import numpy as np
+
+    black = np.asarray(black, dtype=np.uint32)
+    red = np.asarray(red, dtype=np.uint32)
+    kings = np.asarray(kings, dtype=np.uint32)
+    count = getattr(np, "bitwise_count", _bit_counts)
+    black_men, red_men = black & ~kings, red & ~kings
+    black_kings, red_kings = black & kings, red & kings
+    empty = ~(black | red)
+    result = np.empty((len(black), len(FEATURES)), dtype=np.int64)
+    result[:, 0] = count(black_men).astype(np.int64) - count(red_men)
+    result[:, 1] = count(black_kings).astype(np.int64) - count(red_kings)
+    result[:, 2] = count(black_men & np.uint32(BLACK_BACK_ROW)).astype(np.int64) - count(red_men & np.uint32(RED_BACK_ROW))
+    result[:, 3] = count(black & np.uint32(CENTRE)).astype(np.int64) - count(red & np.uint32(CENTRE))
+    tempo = np.zeros(len(black), dtype=np.int64)
+    for row in range(8):
+        mask = np.uint32(ROWS[row])
+        tempo += row * count(black_men & mask).astype(np.int64) - (7 - row) * count(red_men & mask).astype(np.int64)
+    result[:, 4] = tempo
+
+    def mobility(own, own_kings, man_directions):
+        moves = np.zeros(len(black), dtype=np.int64)
+        for direction in KING_DIRECTIONS:
+            movers = own if direction in man_directions else own_kings
+            for shift, source_mask in STEP_SHIFTS[direction]:
+                sources = movers & np.uint32(source_mask)
+                # uint32 shifts drop the bits that fall off the top, like _shift's mask
+                targets = sources << np.uint32(shift) if shift > 0 else sources >> np.uint32(-shift)
+                moves += count(targets & empty)
+        return moves
+
+    result[:, 5] = mobility(black, black_kings, BLACK_MAN_DIRECTIONS) - mobility(red, red_kings, RED_MAN_DIRECTIONS)
+
+    runaways = np.zeros(len(black), dtype=np.int64)
+    for sq in range(NUM_SQUARES):
+        bit = np.uint32(1 << sq)
+        if BLACK_RUNAWAY_ZONE >> sq & 1:
+            runaways += ((black_men & bit) != 0) & ((red & np.uint32(BLACK_CONES[sq])) == 0)
+        if RED_RUNAWAY_ZONE >> sq & 1:
+            runaways -= ((red_men & bit) != 0) & ((black & np.uint32(RED_CONES[sq])) == 0)
+    result[:, 6] = runaways
+    return result
+
+
+def evaluate_batch(black, red, kings, values=None):
+    """Scores in men from black's side for arrays of masks, the same numbers evaluate() gives one at a time."""
+    import numpy as np
+
+    return features_batch(black, red, kings) @ np.array(scaled_weights(values), dtype=np.int64) / SCORE_SCALE
+
+
+set_weights(load_weights())
@@ -0,0 +1,436 @@
+"""Game server: many games against the bot at once, over TCP with one JSON object per line.
+
+    python game_server.py [--host 127.0.0.1] [--port 8765] [--workers 4] [--max-time 2.0]
+
+A client opens as many sessions (games) as it likes on one connection:
+
+    {"op": "new", "difficulty": "hard", "color": "black", "time": 0.5}
+        -> {"ok": true, "session": 1, "fen": "B:W21-32:B1-12", "moves": ["9-13", ...]}
+    {"op": "move", "session": 1, "move": "9-13"}
+        -> {"ok": true, "session": 1, "fen": ...}
+    {"op": "stats"}
+        -> {"ok": true, "server": {...}, "sessions": {"1": {...}, ...}}
+    {"op": "close", "session": 1}
+        -> {"ok": true, "session": 1}
+
+and the server sends events when the bot has moved or a game has ended:
+
+    {"event": "bot_move", "session": 1, "move": "22-18", "fen": ..., "moves": [...], "latency": 0.51}
+    {"event": "game_over", "session": 1, "result": "black", "reason": "no moves"}
+
+"color" is the color the client plays, "time" the bot's seconds per move
+(more than 0, capped by --max-time), and a request's "id", if it has one,
+is copied into its reply. Moves are written with PDN square numbers; when
+two jump sequences join the same squares, the one taking the most pieces
+is played, like in the game. Bad requests get {"ok": false, "error": ...};
+a line longer than the stream's 64 KiB limit gets one too, and then the
+connection is closed. A game whose bot search failed ends with the result
+"aborted".
+
+Moves are checked with the engine's rules. The bot's searches run in a
+process pool shared by every session, at most one per worker at a time. The
+rest queue per connection and the connections take turns, so a client with
+hundreds of games can't starve one with a single game. Each session keeps
+the latency of every bot reply (from the client's move to the bot's),
+split into time queued and time searching, which "stats" reports.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+from bitboard import Position, move_to_text
+from engine import BLACK, RED, BOT_SEARCH_SETTINGS, choose_move
+from opening_book import load_book
+from tablebase import load_tablebases
+from tournament import REPETITION_LIMIT
+from transposition import TranspositionTable
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+DEFAULT_PORT = 8765
+MAX_PLIES = 200  # A game is drawn after this many plies
+
+_table = None
+_book = None
+
+
+def _init_worker():
+    global _table, _book
+    _table = TranspositionTable()
+    _book = load_book()
+    engine.tablebases = load_tablebases()
+
+
+def _bot_move(fields, difficulty, time_budget, seed):
+    """Choose the bot's move in a pool process; returns (move, seconds searched)."""
+    start = time.perf_counter()
+    position = Position(*fields)
+    color = BLACK if position.black_to_move else RED
+    move = _book.choose(position) if _book is not None and difficulty in BOT_SEARCH_SETTINGS else None
+    if move is None:
+        # The table is shared by every session this process searches for, it is keyed by position anyway
+        move = choose_move(position, color, difficulty, _table, time_budget, None, random.Random(seed))
+    return move, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_summary(latencies):
+    """Count, mean, median, 95th percentile and maximum of a list of seconds."""
+    if not latencies:
+        return {'count': 0}
+    return {'count': len(latencies), 'mean': sum(latencies) / len(latencies), 'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95), 'max': max(latencies)}
+
+
+class Session:
+    """One game between a client and the bot."""
+
+    def __init__(self, session_id, difficulty, client_color, time_budget):
+        self.id = session_id
+        self.difficulty = difficulty
+        self.client_color = client_color
+        self.bot_color = engine.opponent(client_color)
+        self.time_budget = time_budget
+        self.position = Position.initial()
+        self.seen = {self.position.hash: 1}
+        self.plies = 0
+        self.result = None  # 'black', 'red', 'draw' or 'aborted' (the bot's search failed) once the game is over
+        self.reason = None
+        self.bot_thinking = False
+        self.latencies = []
+        self.queue_waits = []
+        self.search_times = []
+
+    def color_to_move(self):
+        return BLACK if self.position.black_to_move else RED
+
+    def legal_moves(self):
+        return self.position.generate_moves()
+
+    def find_move(self, text):
+        """The legal move written as text, or None."""
+        matches = [move for move in self.legal_moves() if move_to_text(move) == text]
+        return max(matches, key=lambda move: move[2].bit_count()) if matches else None
+
+    def play(self, move):
+        """Play a move and decide whether the game is over."""
+        self.position.apply(move)
+        self.plies += 1
+        self.seen[self.position.hash] = self.seen.get(self.position.hash, 0) + 1
+        if not self.legal_moves():
+            self.result, self.reason = 'red' if self.position.black_to_move else 'black', 'no moves'
+        elif self.seen[self.position.hash] >= REPETITION_LIMIT:
+            self.result, self.reason = 'draw', 'repetition'
+        elif self.plies >= MAX_PLIES:
+            self.result, self.reason = 'draw', 'move limit'
+
+    def state(self):
+        """What a client needs to play on: the position, and its moves when it is its turn."""
+        state = {'session': self.id, 'fen': self.position.to_fen()}
+        if self.result is None and self.color_to_move() == self.client_color:
+            state['moves'] = sorted({move_to_text(move) for move in self.legal_moves()})
+        return state
+
+    def metrics(self):
+        return {'difficulty': self.difficulty, 'time_budget': self.time_budget, 'plies': self.plies,
+                'result': self.result, 'latency': latency_summary(self.latencies),
+                'queue_wait': latency_summary(self.queue_waits), 'search': latency_summary(self.search_times)}
+
+
+class BotScheduler:
+    """Hands bot searches to the process pool, taking the connections in turn.
+
+    Each connection has its own queue. Whenever a worker is free, the next
+    connection in the rotation with something queued gets it.
+    """
+
+    def __init__(self, executor, workers):
+        self.executor = executor
+        self.workers = workers
+        self.running = 0
+        self.queues = {}  # connection -> deque of (session, future, time queued)
+        self.turns = deque()  # connections with searches queued, next to be served first
+        self.seed = 0
+
+    def queued(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def submit(self, connection, session):
+        """Queue a search for the bot's move; returns a future of (move, seconds queued, seconds searched)."""
+        future = asyncio.get_running_loop().create_future()
+        if connection not in self.queues:
+            self.queues[connection] = deque()
+            self.turns.append(connection)
+        self.queues[connection].append((session, future, time.perf_counter()))
+        self._dispatch()
+        return future
+
+    def drop(self, connection):
+        """Forget a connection's queued searches; the ones already running finish unseen."""
+        for _, future, _ in self.queues.pop(connection, ()):
+            future.cancel()
+        if connection in self.turns:
+            self.turns.remove(connection)
+
+    def cancel(self, connection, session):
+        """Forget a session's queued search; one already running finishes unseen."""
+        queue = self.queues.get(connection)
+        if queue is None:
+            return
+        for entry in [entry for entry in queue if entry[0] is session]:
+            queue.remove(entry)
+            entry[1].cancel()
+        if not queue:
+            del self.queues[connection]
+            self.turns.remove(connection)
+
+    def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self.running < self.workers and self.turns:
+            connection = self.turns.popleft()
+            queue = self.queues[connection]
+            session, future, queued = queue.popleft()
+            if queue:
+                self.turns.append(connection)
+            else:
+                del self.queues[connection]
+            self.running += 1
+            self.seed += 1
+            position = session.position
+            task = loop.run_in_executor(self.executor, _bot_move,
+                                        (position.black, position.red, position.kings, position.black_to_move),
+                                        session.difficulty, session.time_budget, self.seed)
+            task.add_done_callback(lambda task, future=future, queued=queued: self._finished(task, future, queued))
+
+    def _finished(self, task, future, queued):
+        self.running -= 1
+        if not future.cancelled():
+            if task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                move, searched = task.result()
+                future.set_result((move, time.perf_counter() - queued - searched, searched))
+        self._dispatch()
+
+
+class GameServer:
+    def __init__(self, workers, max_time):
+        self.workers = workers
+        self.max_time = max_time
+        self.executor = None
+        self.scheduler = None
+        self.sessions = {}
+        self.connections = 0
+        self.next_id = 1
+        self.started = time.perf_counter()
+        self.finished_latencies = []
+
+    async def start(self, host, port):
+        # Forked workers would inherit the client sockets open at the time and keep them from closing
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker)
+        self.scheduler = BotScheduler(self.executor, self.workers)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        if self.executor is not None:
+            # Waits for the searches already running, at most --max-time
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        connection = object()
+        owned = set()
+        bot_tasks = set()
+        self.connections += 1
+
+        def send(message):
+            if not writer.is_closing():
+                writer.write(json.dumps(message).encode() + b"\n")
+
+        async def bot_turn(session, asked):
+            """Get the bot's move for a session and send it; asked is when the client's move came in."""
+            session.bot_thinking = True
+            try:
+                move, waited, searched = await self.scheduler.submit(connection, session)
+            except Exception as error:
+                # The search failed in the worker: end the game rather than leave it waiting for the bot forever
+                if session.id in self.sessions:
+                    session.result, session.reason = 'aborted', f"the bot's search failed: {error!r}"
+                    send({'event': 'game_over', 'session': session.id, 'result': session.result,
+                          'reason': session.reason})
+                return
+            finally:
+                session.bot_thinking = False
+            if session.id not in self.sessions:
+                return  # Closed while the bot was thinking
+            session.play(move)
+            latency = time.perf_counter() - asked
+            session.latencies.append(latency)
+            session.queue_waits.append(waited)
+            session.search_times.append(searched)
+            send({'event': 'bot_move', 'move': move_to_text(move), 'latency': latency, **session.state()})
+            if session.result is not None:
+                send({'event': 'game_over', 'session': session.id, 'result': session.result,
+                      'reason': session.reason})
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass  # The connection's own loop sees it close and cleans up
+
+        def start_bot_turn(session, asked):
+            task = asyncio.create_task(bot_turn(session, asked))
+            bot_tasks.add(task)
+            task.add_done_callback(bot_tasks.discard)
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than the stream's limit: the rest of the line can't be told from the next request
+                    send({'ok': False, 'error': "request line too long, closing the connection"})
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                asked = time.perf_counter()
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        request = {}
+                        raise ValueError("a request is a JSON object")
+                    reply, bot_session = self.handle_request(request, connection, owned)
+                except (ValueError, KeyError, TypeError) as error:
+                    reply, bot_session = {'ok': False, 'error': str(error)}, None
+                if 'id' in request:
+                    reply['id'] = request['id']
+                send(reply)
+                if bot_session is not None:
+                    if bot_session.result is not None:
+                        send({'event': 'game_over', 'session': bot_session.id, 'result': bot_session.result,
+                              'reason': bot_session.reason})
+                    else:
+                        start_bot_turn(bot_session, asked)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.scheduler.drop(connection)
+            for task in bot_tasks:
+                task.cancel()
+            for session_id in owned:
+                self.end_session(session_id)
+            writer.close()
+            self.connections -= 1
+
+    def handle_request(self, request, connection, owned):
+        """Answer one request; returns (reply, session whose turn it now is, if the bot's or over)."""
+        op = request.get('op')
+        if op == 'new':
+            difficulty = request.get('difficulty', 'hard')
+            if difficulty not in DIFFICULTIES:
+                raise ValueError(f"difficulty should be one of {', '.join(DIFFICULTIES)}")
+            color = {'black': BLACK, 'red': RED}.get(request.get('color', 'black'))
+            if color is None:
+                raise ValueError("color should be black or red")
+            default_time = BOT_SEARCH_SETTINGS.get(difficulty, {}).get('time_budget', 0)
+            time_budget = float(request.get('time', default_time))
+            # NaN would get past the checks below and let the search run with no deadline at all
+            if not math.isfinite(time_budget):
+                raise ValueError("time should be a finite number of seconds")
+            if time_budget <= 0 and difficulty != 'easy':
+                raise ValueError("time should be more than 0")
+            time_budget = min(max(time_budget, 0.0), self.max_time)  # The easy bot doesn't search
+            session = Session(self.next_id, difficulty, color, time_budget)
+            self.next_id += 1
+            self.sessions[session.id] = session
+            owned.add(session.id)
+            bot_first = session.color_to_move() == session.bot_color
+            return {'ok': True, **session.state()}, session if bot_first else None
+
+        if op == 'move':
+            session = self._owned_session(request, owned)
+            if session.result is not None:
+                raise ValueError("the game is over")
+            if session.bot_thinking or session.color_to_move() != session.client_color:
+                raise ValueError("it is the bot's turn")
+            move = session.find_move(str(request.get('move')))
+            if move is None:
+                raise ValueError(f"{request.get('move')!r} is not a legal move here")
+            session.play(move)
+            return {'ok': True, **session.state()}, session
+
+        if op == 'stats':
+            return {'ok': True, 'server': self.server_metrics(),
+                    'sessions': {str(i): self.sessions[i].metrics() for i in sorted(owned)}}, None
+
+        if op == 'close':
+            session = self._owned_session(request, owned)
+            owned.discard(session.id)
+            self.scheduler.cancel(connection, session)
+            self.end_session(session.id)
+            return {'ok': True, 'session': session.id}, None
+
+        raise ValueError(f"unknown op {op!r}, expected new, move, stats or close")
+
+    def _owned_session(self, request, owned):
+        session_id = request.get('session')
+        if session_id not in owned:
+            raise ValueError(f"no session {session_id!r} on this connection")
+        return self.sessions[session_id]
+
+    def end_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self.finished_latencies.extend(session.latencies)
+
+    def server_metrics(self):
+        latencies = list(self.finished_latencies)
+        for session in self.sessions.values():
+            latencies.extend(session.latencies)
+        return {'connections': self.connections, 'sessions': len(self.sessions), 'sessions_started': self.next_id - 1, 'workers': self.workers,
+                'searches_running': self.scheduler.running, 'searches_queued': self.scheduler.queued(),
+                'uptime': time.perf_counter() - self.started, 'latency': latency_summary(latencies)}
+
+
+async def serve(host, port, workers, max_time):
+    server = GameServer(workers, max_time)
+    listener = await server.start(host, port)
+    print(f"serving on {', '.join(str(sock.getsockname()) for sock in listener.sockets)} with {workers} workers")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve games against the bot over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="bot searches run at once")
+    parser.add_argument("--max-time", type=float, default=2.0, help="most seconds per move a session can give the bot")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_time))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
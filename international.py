@@ -0,0 +1,460 @@
+"""Bitboard position and move generator for international draughts on 10x10.
+
+The same scheme as bitboard.py on the bigger board: the 50 dark squares are
+numbered 0-49 in reading order, five per row, and a position is three 50-bit
+masks. Black starts on squares 0-19 and moves towards higher numbers, red
+(White in PDN) starts on squares 30-49, moves towards lower numbers and
+moves first.
+
+The rules differ from English checkers in three ways that matter to the
+move generator:
+
+- men capture backwards as well as forwards, though they still only step
+  forwards;
+- kings fly: they step any distance along an open diagonal, and capture a
+  piece any distance away, landing on any empty square beyond it;
+- capturing the most pieces is compulsory, among all the pieces that can
+  capture, and a man is only crowned if its move ends on the far row.
+
+Moves are the same (from_square, to_square, captured_mask) tuples as in
+bitboard.py, and InternationalPosition has the methods of Position, so the
+search runs on either.
+"""
+import random
+
+from bitboard import (BLACK_PIECE, RED_PIECE, BLACK_KING, RED_KING, BLACK_MAN_DIRECTIONS, RED_MAN_DIRECTIONS,
+                      KING_DIRECTIONS, SCORE_SCALE, build_shift_tables, dark_squares, format_fen, parse_fen)
+
+BOARD_SIZE = 10
+NUM_SQUARES = 50
+FULL_MASK = (1 << NUM_SQUARES) - 1
+
+# Rows where a man is promoted
+BLACK_KING_ROW = 0x1F << 45  # Row 9
+RED_KING_ROW = 0x1F           # Row 0
+
+SQUARE_TO_ROWCOL, ROWCOL_TO_SQUARE = dark_squares(BOARD_SIZE)
+STEP_SHIFTS, JUMP_SHIFTS, JUMP_OVER = build_shift_tables(SQUARE_TO_ROWCOL, ROWCOL_TO_SQUARE)
+
+
+def _build_rays():
+    """For every square, the squares along each diagonal from it, nearest first, as (bit, square) pairs.
+
+    Directions that leave the board at once are left out, so a ray is never empty.
+    """
+    rays = []
+    for row, col in SQUARE_TO_ROWCOL:
+        square_rays = []
+        for dr, dc in KING_DIRECTIONS:
+            ray = []
+            step = 1
+            while (row + step * dr, col + step * dc) in ROWCOL_TO_SQUARE:
+                sq = ROWCOL_TO_SQUARE[(row + step * dr, col + step * dc)]
+                ray.append((1 << sq, sq))
+                step += 1
+            if ray:
+                square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+    return rays
+
+
+RAYS = _build_rays()
+
+
+def _split_shifts():
+    """The shift tables split by direction of shift, so the move generator shifts without testing signs.
+
+    Towards higher squares (down the board) and towards lower ones, each as:
+    the men's steps, (source mask, shift); the first jumps, (source mask,
+    shift, square jumped over by each source square); and the adjacent
+    captures, (source mask, step shift, jump shift - step shift), for a
+    source square with an opponent one step away and an empty square behind.
+    """
+    split = {}
+    for down, directions in ((True, BLACK_MAN_DIRECTIONS), (False, RED_MAN_DIRECTIONS)):
+        steps, jumps, captures = [], [], []
+        for direction in directions:
+            jump_shift, jump_mask = JUMP_SHIFTS[direction]
+            jumps.append((jump_mask, abs(jump_shift), JUMP_OVER[direction]))
+            for shift, step_mask in STEP_SHIFTS[direction]:
+                steps.append((step_mask, abs(shift)))
+                captures.append((jump_mask & step_mask, abs(shift), abs(jump_shift - shift)))
+        split[down] = (tuple(steps), tuple(jumps), tuple(captures))
+    return split[True] + split[False]
+
+
+DOWN_STEPS, DOWN_JUMPS, DOWN_CAPTURES, UP_STEPS, UP_JUMPS, UP_CAPTURES = _split_shifts()
+
+# A man's single jumps from each square, in any direction: (jumped bit, landing bit, landing square)
+MAN_JUMPS = [tuple((ray[0][0], ray[1][0], ray[1][1]) for ray in square_rays if len(ray) > 1)
+             for square_rays in RAYS]
+
+# Zobrist keys, as in bitboard.py but for 50 squares
+_zobrist_rng = random.Random(0x10D12A)
+ZOBRIST_BLACK_MAN = [_zobrist_rng.getrandbits(64) for _ in range(NUM_SQUARES)]
+ZOBRIST_BLACK_KING = [_zobrist_rng.getrandbits(64) for _ in range(NUM_SQUARES)]
+ZOBRIST_RED_MAN = [_zobrist_rng.getrandbits(64) for _ in range(NUM_SQUARES)]
+ZOBRIST_RED_KING = [_zobrist_rng.getrandbits(64) for _ in range(NUM_SQUARES)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_rng.getrandbits(64)
+
+# Evaluation, in thousandths of a man from black's side. Every term is a
+# piece-square value, so it is all kept up to date in the position's score and
+# evaluate() costs nothing at the leaves. A flying king is worth about
+# three men.
+MAN_VALUE = SCORE_SCALE
+KING_VALUE = 3 * SCORE_SCALE
+ADVANCE_VALUE = 15  # Per row a man has come forward
+CENTRE_VALUE = 40   # For a piece on the four middle columns of the middle four rows
+CENTRE = sum(1 << sq for sq, (row, col) in enumerate(SQUARE_TO_ROWCOL) if 3 <= row <= 6 and 3 <= col <= 6)
+BACK_ROW_VALUE = 30  # For a man still guarding its own back row
+BLACK_BACK_ROW = RED_KING_ROW
+
+
+def _square_values():
+    black_man, black_king = [], []
+    for sq, (row, _) in enumerate(SQUARE_TO_ROWCOL):
+        centre = CENTRE_VALUE * (CENTRE >> sq & 1)
+        black_man.append(MAN_VALUE + ADVANCE_VALUE * row + centre + BACK_ROW_VALUE * (BLACK_BACK_ROW >> sq & 1))
+        black_king.append(KING_VALUE + centre)
+    # Red's values are black's with the board turned round, and count against black
+    return (black_man, black_king, [-black_man[NUM_SQUARES - 1 - sq] for sq in range(NUM_SQUARES)],
+            [-black_king[NUM_SQUARES - 1 - sq] for sq in range(NUM_SQUARES)])
+
+
+SQUARE_VALUES_BLACK_MAN, SQUARE_VALUES_BLACK_KING, SQUARE_VALUES_RED_MAN, SQUARE_VALUES_RED_KING = _square_values()
+
+
+class InternationalPosition:
+    """An international draughts position stored as bitmasks, with the side to move."""
+
+    __slots__ = ("black", "red", "kings", "black_to_move", "hash", "score")
+
+    # The row the side to move crowns its men on, indexed by black_to_move
+    king_rows = (RED_KING_ROW, BLACK_KING_ROW)
+
+    def __init__(self, black=0, red=0, kings=0, black_to_move=True):
+        self.black = black
+        self.red = red
+        self.kings = kings
+        self.black_to_move = black_to_move
+        self.hash = self.compute_hash()
+        self.score = self.compute_score()
+
+    @classmethod
+    def initial(cls):
+        """Starting position: black on rows 0-3, red on rows 6-9, red (White) to move."""
+        return cls((1 << 20) - 1, FULL_MASK ^ ((1 << 30) - 1), 0, False)
+
+    @classmethod
+    def from_board(cls, board, black_to_move=True):
+        """Build a position from a 10x10 list-of-lists board."""
+        black = red = kings = 0
+        for sq, (row, col) in enumerate(SQUARE_TO_ROWCOL):
+            piece = board[row][col]
+            if piece in (BLACK_PIECE, BLACK_KING):
+                black |= 1 << sq
+            elif piece in (RED_PIECE, RED_KING):
+                red |= 1 << sq
+            if piece in (BLACK_KING, RED_KING):
+                kings |= 1 << sq
+        return cls(black, red, kings, black_to_move)
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Parse a PDN FEN string, with the squares numbered 1-50."""
+        return cls(*parse_fen(fen, NUM_SQUARES))
+
+    def to_fen(self):
+        return format_fen(self, NUM_SQUARES)
+
+    def to_board(self):
+        """Return the position as a 10x10 list-of-lists board of "B"/"R"/"BK"/"RK"/None."""
+        board = [[None for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+        for sq, (row, col) in enumerate(SQUARE_TO_ROWCOL):
+            bit = 1 << sq
+            if self.black & bit:
+                board[row][col] = BLACK_KING if self.kings & bit else BLACK_PIECE
+            elif self.red & bit:
+                board[row][col] = RED_KING if self.kings & bit else RED_PIECE
+        return board
+
+    def copy(self):
+        return InternationalPosition(self.black, self.red, self.kings, self.black_to_move)
+
+    def compute_hash(self):
+        h = ZOBRIST_BLACK_TO_MOVE if self.black_to_move else 0
+        for sq in range(NUM_SQUARES):
+            bit = 1 << sq
+            if self.black & bit:
+                h ^= ZOBRIST_BLACK_KING[sq] if self.kings & bit else ZOBRIST_BLACK_MAN[sq]
+            elif self.red & bit:
+                h ^= ZOBRIST_RED_KING[sq] if self.kings & bit else ZOBRIST_RED_MAN[sq]
+        return h
+
+    def compute_score(self):
+        score = 0
+        for sq in range(NUM_SQUARES):
+            bit = 1 << sq
+            if self.black & bit:
+                score += SQUARE_VALUES_BLACK_KING[sq] if self.kings & bit else SQUARE_VALUES_BLACK_MAN[sq]
+            elif self.red & bit:
+                score += SQUARE_VALUES_RED_KING[sq] if self.kings & bit else SQUARE_VALUES_RED_MAN[sq]
+        return score
+
+    def __eq__(self, other):
+        return (isinstance(other, InternationalPosition) and self.black == other.black and self.red == other.red
+                and self.kings == other.kings and self.black_to_move == other.black_to_move)
+
+    def __repr__(self):
+        return (f"InternationalPosition(black={self.black:#015x}, red={self.red:#015x}, kings={self.kings:#015x}, "
+                f"black_to_move={self.black_to_move})")
+
+    def generate_moves(self):
+        """Get all moves for the side to move as (from_square, to_square, captured_mask) tuples.
+
+        Captures are found first, each sequence followed to its end; only
+        those taking the most pieces are legal. Taken pieces stay on the
+        board until the move is over, so a sequence can't jump one twice or
+        pass through its square. Without a capture, men step forwards and
+        kings slide along any open diagonal.
+        """
+        black_to_move = self.black_to_move
+        own, opp = (self.black, self.red) if black_to_move else (self.red, self.black)
+        empty = ~(self.black | self.red) & FULL_MASK
+        own_kings = own & self.kings
+        own_men = own ^ own_kings
+
+        moves = []
+        if own_men:
+            # The first jump of every man's capture, found for all men at once
+            for source_mask, shift, over_table in DOWN_JUMPS:
+                targets = (own_men & source_mask) << shift & empty
+                while targets:
+                    bit = targets & -targets
+                    to = bit.bit_length() - 1
+                    frm = to - shift
+                    over_bit = 1 << over_table[frm]
+                    if opp & over_bit:
+                        # The man's own square is empty while it jumps, a sequence may come back through it
+                        _man_capture(moves, frm, to, over_bit, opp, empty | (1 << frm))
+                    targets ^= bit
+            for source_mask, shift, over_table in UP_JUMPS:
+                targets = (own_men & source_mask) >> shift & empty
+                while targets:
+                    bit = targets & -targets
+                    to = bit.bit_length() - 1
+                    frm = to + shift
+                    over_bit = 1 << over_table[frm]
+                    if opp & over_bit:
+                        _man_capture(moves, frm, to, over_bit, opp, empty | (1 << frm))
+                    targets ^= bit
+        kings = own_kings
+        while kings:
+            bit = kings & -kings
+            frm = bit.bit_length() - 1
+            _king_capture(moves, frm, frm, 0, opp, empty | bit)
+            kings ^= bit
+        if moves:
+            if len(moves) > 1:
+                most = max(captured.bit_count() for _, _, captured in moves)
+                moves = list(dict.fromkeys(move for move in moves if move[2].bit_count() == most))
+            return moves
+
+        if own_men and black_to_move:
+            for source_mask, shift in DOWN_STEPS:
+                targets = (own_men & source_mask) << shift & empty
+                while targets:
+                    bit = targets & -targets
+                    to = bit.bit_length() - 1
+                    moves.append((to - shift, to, 0))
+                    targets ^= bit
+        elif own_men:
+            for source_mask, shift in UP_STEPS:
+                targets = (own_men & source_mask) >> shift & empty
+                while targets:
+                    bit = targets & -targets
+                    to = bit.bit_length() - 1
+                    moves.append((to + shift, to, 0))
+                    targets ^= bit
+        kings = own_kings
+        while kings:
+            bit = kings & -kings
+            frm = bit.bit_length() - 1
+            for ray in RAYS[frm]:
+                for square_bit, to in ray:
+                    if not empty & square_bit:
+                        break
+                    moves.append((frm, to, 0))
+            kings ^= bit
+        return moves
+
+    def has_capture(self):
+        """True when the side to move has a capture, which it then has to play."""
+        if self.black_to_move:
+            own, opp = self.black, self.red
+        else:
+            own, opp = self.red, self.black
+        empty = ~(self.black | self.red) & FULL_MASK
+        # An opponent one step away with an empty square behind it, in any direction and for any piece
+        for source_mask, step, rest in DOWN_CAPTURES:
+            if ((own & source_mask) << step & opp) << rest & empty:
+                return True
+        for source_mask, step, rest in UP_CAPTURES:
+            if ((own & source_mask) >> step & opp) >> rest & empty:
+                return True
+        # A king further along an open diagonal
+        kings = own & self.kings
+        while kings:
+            bit = kings & -kings
+            for ray in RAYS[bit.bit_length() - 1]:
+                for index, (square_bit, _) in enumerate(ray):
+                    if not empty & square_bit:
+                        if opp & square_bit and index + 1 < len(ray) and empty & ray[index + 1][0]:
+                            return True
+                        break
+            kings ^= bit
+        return False
+
+    def has_quiet_move(self):
+        """True when the side to move has a move that isn't a capture, as Position.has_quiet_move()."""
+        if self.black_to_move:
+            down, up = self.black, self.black & self.kings
+        else:
+            down, up = self.red & self.kings, self.red
+        empty = ~(self.black | self.red) & FULL_MASK
+        # A king that can slide anywhere can step to the first square of that diagonal
+        for source_mask, shift in DOWN_STEPS:
+            if (down & source_mask) << shift & empty:
+                return True
+        for source_mask, shift in UP_STEPS:
+            if (up & source_mask) >> shift & empty:
+                return True
+        return False
+
+    def apply(self, move):
+        """Play a move in place and return the kings mask needed to undo it, as Position.apply()."""
+        frm, to, captured = move
+        bits = (1 << frm) ^ (1 << to)
+        kings = self.kings
+        hash_delta, score_delta = _move_deltas(frm, to, captured, kings, self.black_to_move)
+        self.hash ^= hash_delta
+        self.score += score_delta
+        if self.black_to_move:
+            self.black ^= bits
+            self.red ^= captured
+            promoted = (1 << to) & BLACK_KING_ROW
+        else:
+            self.red ^= bits
+            self.black ^= captured
+            promoted = (1 << to) & RED_KING_ROW
+        if kings & (1 << frm):
+            self.kings = (kings ^ bits) & ~captured
+        else:
+            self.kings = (kings & ~captured) | promoted
+        self.black_to_move = not self.black_to_move
+        return kings
+
+    def undo(self, move, kings):
+        """Take back a move played with apply()."""
+        frm, to, captured = move
+        bits = (1 << frm) ^ (1 << to)
+        self.black_to_move = not self.black_to_move
+        if self.black_to_move:
+            self.black ^= bits
+            self.red ^= captured
+        else:
+            self.red ^= bits
+            self.black ^= captured
+        self.kings = kings
+        hash_delta, score_delta = _move_deltas(frm, to, captured, kings, self.black_to_move)
+        self.hash ^= hash_delta
+        self.score -= score_delta
+
+    def piece_counts(self):
+        """Return (black men, black kings, red men, red kings)."""
+        kings = self.kings
+        return ((self.black & ~kings).bit_count(), (self.black & kings).bit_count(),
+                (self.red & ~kings).bit_count(), (self.red & kings).bit_count())
+
+
+def _man_capture(moves, frm, square, captured, opp, empty):
+    """Follow a man's capture that has reached `square`, adding each way it can end to moves."""
+    extended = False
+    for over_bit, land_bit, land in MAN_JUMPS[square]:
+        if opp & over_bit and not captured & over_bit and empty & land_bit:
+            _man_capture(moves, frm, land, captured | over_bit, opp, empty)
+            extended = True
+    if not extended:
+        moves.append((frm, square, captured))
+
+
+def _king_capture(moves, frm, square, captured, opp, empty):
+    """Follow a king's capture from `square`: along each diagonal, over the first piece if it is an
+    opponent not yet taken, onto any empty square behind it. Adds each way it can end to moves."""
+    extended = False
+    for ray in RAYS[square]:
+        for index, (bit, _) in enumerate(ray):
+            if not empty & bit:
+                break
+        else:
+            continue
+        if not opp & bit or captured & bit:
+            continue
+        for land_bit, land in ray[index + 1:]:
+            if not empty & land_bit:
+                break
+            _king_capture(moves, frm, land, captured | bit, opp, empty)
+            extended = True
+    if not extended and captured:
+        moves.append((frm, square, captured))
+
+
+def _move_deltas(frm, to, captured, kings, black_to_move):
+    """Zobrist hash and score changes for a move, given the kings mask before it was played."""
+    if black_to_move:
+        man_keys, king_keys = ZOBRIST_BLACK_MAN, ZOBRIST_BLACK_KING
+        captured_man_keys, captured_king_keys = ZOBRIST_RED_MAN, ZOBRIST_RED_KING
+        man_values, king_values = SQUARE_VALUES_BLACK_MAN, SQUARE_VALUES_BLACK_KING
+        captured_man_values, captured_king_values = SQUARE_VALUES_RED_MAN, SQUARE_VALUES_RED_KING
+        king_row = BLACK_KING_ROW
+    else:
+        man_keys, king_keys = ZOBRIST_RED_MAN, ZOBRIST_RED_KING
+        captured_man_keys, captured_king_keys = ZOBRIST_BLACK_MAN, ZOBRIST_BLACK_KING
+        man_values, king_values = SQUARE_VALUES_RED_MAN, SQUARE_VALUES_RED_KING
+        captured_man_values, captured_king_values = SQUARE_VALUES_BLACK_MAN, SQUARE_VALUES_BLACK_KING
+        king_row = RED_KING_ROW
+    if kings & (1 << frm):
+        delta = king_keys[frm] ^ king_keys[to]
+        score = king_values[to] - king_values[frm]
+    elif king_row & (1 << to):
+        delta = man_keys[frm] ^ king_keys[to]
+        score = king_values[to] - man_values[frm]
+    else:
+        delta = man_keys[frm] ^ man_keys[to]
+        score = man_values[to] - man_values[frm]
+    while captured:
+        bit = captured & -captured
+        sq = bit.bit_length() - 1
+        if kings & bit:
+            delta ^= captured_king_keys[sq]
+            score -= captured_king_values[sq]
+        else:
+            delta ^= captured_man_keys[sq]
+            score -= captured_man_values[sq]
+        captured ^= bit
+    return delta ^ ZOBRIST_BLACK_TO_MOVE, score
+
+
+def evaluate(position):
+    """Score of a position from black's side, in thousandths of a man: its piece-square sum."""
+    return position.score
+
+
+def move_to_rowcol(move):
+    """Convert a move to the ((start_row, start_col), (end_row, end_col)) form the UI uses."""
+    return SQUARE_TO_ROWCOL[move[0]], SQUARE_TO_ROWCOL[move[1]]
+
+
+def move_to_text(move):
+    """Write a move in PDN style, "32-28" for a step and "28x19" for a capture, squares numbered 1-50."""
+    return f"{move[0] + 1}{'x' if move[2] else '-'}{move[1] + 1}"
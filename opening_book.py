@@ -0,0 +1,189 @@
+"""Opening book: moves for the first plies of a game, searched ahead of time.
+
+    python opening_book.py [--plies 8] [--depth 8] [--margin 0.5] [--output opening_book.bin]
+
+The builder searches every book position to a fixed depth and keeps the
+moves that score within `margin` of the best one, weighted by how close
+they came. It only follows book moves, so the book covers the lines the
+bots actually play.
+
+The file is a 16 byte header followed by fixed-size records of (position
+hash, from square, to square, captured squares, weight), sorted by hash.
+The captured squares tell apart two multi-jumps that start and land on the
+same squares. OpeningBook maps the file into memory and binary searches
+the records in place, so opening a book costs nothing however large it is.
+"""
+import argparse
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+
+from bitboard import Position, move_to_text
+from engine import BLACK, RED, age_move_ordering, minimax
+from transposition import TranspositionTable
+
+BOOK_MAGIC = b"CKBK"
+BOOK_VERSION = 3  # 2: forced captures and multi-jumps, 3: captured squares in the records
+HEADER = struct.Struct("<4sIQ")  # magic, version, record count
+RECORD = struct.Struct("<QBBIH")  # position hash, from square, to square, captured squares mask, weight
+KEY = struct.Struct("<Q")
+MAX_WEIGHT = 1000
+
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+_table = None
+
+
+class OpeningBook:
+    """A book file opened read-only through mmap."""
+
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path} is empty, not an opening book")
+        if len(self.data) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is too short to be an opening book")
+        magic, version, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION or len(self.data) != HEADER.size + self.count * RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a version {BOOK_VERSION} opening book")
+
+    def _key(self, index):
+        return KEY.unpack_from(self.data, HEADER.size + index * RECORD.size)[0]
+
+    def lookup(self, position):
+        """Return the book's (move, weight) pairs for a position, empty when it is out of book."""
+        low, high = 0, self.count
+        key = position.hash
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        moves = None
+        index = low
+        while index < self.count and self._key(index) == key:
+            _, frm, to, captured, weight = RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+            if moves is None:
+                moves = set(position.generate_moves())
+            # A hash collision or a book built for other rules could name a move that isn't legal here
+            if (frm, to, captured) in moves:
+                entries.append(((frm, to, captured), weight))
+            index += 1
+        return entries
+
+    def choose(self, position, rng=random):
+        """Pick one of the book's moves at random, in proportion to their weights; None when out of book."""
+        entries = self.lookup(position)
+        if not entries:
+            return None
+        moves, weights = zip(*entries)
+        return rng.choices(moves, weights)[0]
+
+    def close(self):
+        if getattr(self, "data", None) is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+
+def load_book(path=DEFAULT_BOOK_PATH):
+    """Open the opening book if there is one, None otherwise."""
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError):
+        return None
+
+
+def _init_builder():
+    global _table
+    _table = TranspositionTable()
+
+
+def _book_moves(task):
+    """Search every move of a position; returns (move, weight) for the ones worth keeping."""
+    fields, depth, margin, max_moves = task
+    position = Position(*fields)
+    color = BLACK if position.black_to_move else RED
+    _table.new_search()
+    age_move_ordering()
+    scored = []
+    for move in position.generate_moves():
+        kings = position.apply(move)
+        score, _ = minimax(position, depth - 1, float('-inf'), float('inf'), False, color, _table, 1)
+        position.undo(move, kings)
+        scored.append((score, move))
+    if not scored:
+        return []
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    best = scored[0][0]
+    kept = []
+    for score, move in scored[:max_moves]:
+        shortfall = best - score
+        if shortfall > margin:
+            break
+        closeness = 1 - shortfall / margin if margin > 0 else 1
+        kept.append((move, max(1, round(MAX_WEIGHT * closeness))))
+    return kept
+
+
+def build_book(path, plies, depth, margin, max_moves, workers=None):
+    """Search the book positions ply by ply and write the book file; returns the number of positions."""
+    entries = {}
+    frontier = {Position.initial().hash: Position.initial()}
+    with multiprocessing.Pool(workers, initializer=_init_builder) as pool:
+        for ply in range(plies):
+            start = time.perf_counter()
+            positions = list(frontier.values())
+            tasks = [((p.black, p.red, p.kings, p.black_to_move), depth, margin, max_moves) for p in positions]
+            next_frontier = {}
+            for position, kept in zip(positions, pool.imap(_book_moves, tasks)):
+                entries[position.hash] = kept
+                for move, _ in kept:
+                    child = position.copy()
+                    child.apply(move)
+                    if child.hash not in entries:
+                        next_frontier[child.hash] = child
+            print(f"ply {ply + 1}: {len(positions)} positions searched in {time.perf_counter() - start:.1f}s",
+                  file=sys.stderr)
+            frontier = next_frontier
+
+    records = sorted((key, *move, weight) for key, kept in entries.items() for move, weight in kept)
+    with open(path, "wb") as book_file:
+        book_file.write(HEADER.pack(BOOK_MAGIC, BOOK_VERSION, len(records)))
+        for record in records:
+            book_file.write(RECORD.pack(*record))
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the opening book.")
+    parser.add_argument("--plies", type=int, default=8, help="plies from the start the book covers")
+    parser.add_argument("--depth", type=int, default=8, help="search depth for each book position")
+    parser.add_argument("--margin", type=float, default=0.5, help="keep moves scoring this close to the best")
+    parser.add_argument("--max-moves", type=int, default=3, help="most moves kept per position")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default=DEFAULT_BOOK_PATH)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    count = build_book(args.output, args.plies, args.depth, args.margin, args.max_moves, args.workers)
+    book = OpeningBook(args.output)
+    first = ", ".join(f"{move_to_text(move)} ({weight})" for move, weight in book.lookup(Position.initial()))
+    print(f"{count} positions, {book.count} moves, {os.path.getsize(args.output):,} bytes "
+          f"in {time.perf_counter() - start:.1f}s; first moves: {first}")
+    book.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Root-splitting parallel search across worker processes.
+
+The first root move is searched here on its own, young-brothers-wait style,
+so there is an alpha bound before the rest are handed out. The remaining
+moves are dealt round-robin to the workers, which share the best score found
+so far through a multiprocessing Value and read it before each root move, so
+moves searched later still get pruned.
+
+Every root move that could be the best one is searched with a window just
+below the shared bound, so it gets an exact score however the workers were
+scheduled. Workers only use their transposition tables to order moves, never
+for score cutoffs. The chosen move therefore depends only on the position,
+the depth and the seed, which breaks ties between equally scored moves.
+"""
+import multiprocessing
+import os
+import random
+import time
+
+import engine
+from engine import BLACK, SearchTimeout, evaluate_board, minimax, no_move_score
+from search_stats import SearchStats
+from transposition import TranspositionTable, WideTranspositionTable
+from variants import VARIANTS, position_variant
+
+# Root moves scoring at least (shared best - SCORE_EPSILON) get an exact score
+SCORE_EPSILON = 1e-6
+
+_shared_alpha = None
+_table = None
+_root = None  # Variant and root position of the search the worker last took part in
+
+
+class _OrderingTable(TranspositionTable):
+    """Transposition table that only ever supplies best-move hints, never a score cutoff."""
+
+    def probe(self, key):
+        entry = super().probe(key)
+        if entry is None:
+            return None
+        return (entry[0], -1, entry[2], entry[3], entry[4], entry[5])
+
+
+class _WideOrderingTable(_OrderingTable, WideTranspositionTable):
+    pass
+
+
+# The ordering table for each variant's kind of transposition table
+_ORDERING_TABLES = {TranspositionTable: _OrderingTable, WideTranspositionTable: _WideOrderingTable}
+
+
+def _ordering_table(table, variant):
+    """table when it can hold the variant's moves, else a new ordering table that can."""
+    table_class = _ORDERING_TABLES[variant.table_class]
+    return table if type(table) is table_class else table_class()
+
+
+def _init_worker(shared_alpha, stop_event):
+    global _shared_alpha, _table
+    _shared_alpha = shared_alpha
+    _table = _OrderingTable()
+    engine.search_stop_event = stop_event
+
+
+def _search_root_moves(variant_name, fields, indexed_moves, depth, bot_color, time_left, instrumented=False):
+    """Search some root moves in order; returns (index/score pairs, nodes, finished, SearchStats or None)."""
+    global _root, _table
+    variant = VARIANTS[variant_name]
+    if (variant_name, fields) != _root:
+        # A new move to find, not the next iteration of the last one
+        _root = (variant_name, fields)
+        _table = _ordering_table(_table, variant)
+        engine.age_move_ordering()
+    engine.nodes_searched = 0
+    engine.quiescence_nodes = 0
+    engine.search_stats = SearchStats() if instrumented else None
+    engine.search_deadline = time.perf_counter() + time_left if time_left is not None else None
+    _table.new_search()
+    position = variant.position_class(*fields)
+    results = []
+    try:
+        for index, move in indexed_moves:
+            alpha = _shared_alpha.value - SCORE_EPSILON
+            kings = position.apply(move)
+            score, _ = minimax(position, depth - 1, alpha, float('inf'), False, bot_color, _table, 1)
+            position.undo(move, kings)
+            results.append((index, score))
+            with _shared_alpha.get_lock():
+                if score > _shared_alpha.value:
+                    _shared_alpha.value = score
+    except SearchTimeout:
+        return results, engine.nodes_searched, False, _helper_stats()
+    finally:
+        engine.search_deadline = None
+    return results, engine.nodes_searched, True, _helper_stats()
+
+
+def _helper_stats():
+    stats = engine.search_stats
+    if stats is not None:
+        stats.update(engine.nodes_searched, engine.quiescence_nodes)
+    return stats
+
+
+class ParallelSearcher:
+    """A pool of search processes for splitting the root moves of the bot's search.
+
+    Uses a multiprocessing.Pool rather than a ProcessPoolExecutor because its
+    daemon workers are cleaned up automatically when the bot's own worker
+    process exits.
+    """
+
+    def __init__(self, workers=None, mp_context=None, stop_event=None):
+        self.workers = workers or os.cpu_count() or 1
+        context = mp_context or multiprocessing.get_context()
+        self.shared_alpha = context.Value('d', float('-inf'))
+        self.pool = context.Pool(self.workers, initializer=_init_worker, initargs=(self.shared_alpha, stop_event))
+        self.table = _OrderingTable()
+
+    def search(self, position, bot_color, depth, seed=0, first_move=None):
+        """Fixed-depth search from the bot's side; returns (score, move).
+
+        Honours engine.search_deadline, raising SearchTimeout when it passes.
+        """
+        moves = position.generate_moves()
+        if not moves:
+            return no_move_score(position.black_to_move == (bot_color == BLACK), 0), None
+        variant = position_variant(position)
+        self.table = _ordering_table(self.table, variant)
+        if first_move in moves:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+
+        # Eldest brother first, on its own, to get a bound for the others
+        position = position.copy()
+        kings = position.apply(moves[0])
+        first_score, _ = minimax(position, depth - 1, float('-inf'), float('inf'), False, bot_color, self.table, 1)
+        position.undo(moves[0], kings)
+        scores = [first_score] + [None] * (len(moves) - 1)
+        if len(moves) == 1:
+            return first_score, moves[0]
+
+        self.shared_alpha.value = first_score
+        time_left = None
+        if engine.search_deadline is not None:
+            time_left = max(0.0, engine.search_deadline - time.perf_counter())
+        fields = (position.black, position.red, position.kings, position.black_to_move)
+        indexed = list(enumerate(moves))[1:]
+        instrumented = engine.search_stats is not None
+        tasks = [self.pool.apply_async(_search_root_moves, (variant.name, fields, indexed[w::self.workers], depth,
+                                                            bot_color, time_left, instrumented))
+                 for w in range(min(self.workers, len(indexed)))]
+        finished = True
+        for task in tasks:
+            results, nodes, complete, helper_stats = task.get()
+            engine.nodes_searched += nodes
+            if helper_stats is not None and engine.search_stats is not None:
+                engine.quiescence_nodes += helper_stats.quiescence_nodes
+                engine.search_stats.merge(helper_stats)
+            finished = finished and complete
+            for index, score in results:
+                scores[index] = score
+        if not finished:
+            raise SearchTimeout()
+
+        best_score = max(scores)
+        tied = sorted(move for move, score in zip(moves, scores) if score == best_score)
+        return best_score, random.Random(seed).choice(tied)
+
+    def iterative_deepening(self, position, bot_color, time_budget, max_depth, seed=0):
+        """Same as engine.iterative_deepening, with every iteration searched in parallel."""
+        stats = engine.search_stats
+        if stats is None:
+            return self._deepen(position, bot_color, time_budget, max_depth, seed, None)
+        stats.begin(engine.nodes_searched, engine.quiescence_nodes)
+        try:
+            return self._deepen(position, bot_color, time_budget, max_depth, seed, stats)
+        finally:
+            stats.finish(engine.nodes_searched, engine.quiescence_nodes)
+
+    def _deepen(self, position, bot_color, time_budget, max_depth, seed, stats):
+        start = time.perf_counter()
+        engine.age_move_ordering()
+        moves = position.generate_moves()
+        if len(moves) <= 1:
+            return evaluate_board(position, bot_color), moves[0] if moves else None, 0
+
+        best_score, best_move, completed_depth = None, moves[0], 0
+        try:
+            for depth in range(1, max_depth + 1):
+                engine.search_deadline = start + time_budget if depth > 1 else None
+                score, move = self.search(position, bot_color, depth, seed, first_move=best_move)
+                best_score, best_move, completed_depth = score, move, depth
+                if stats is not None:
+                    stats.end_iteration(depth, score, move, engine.nodes_searched, engine.quiescence_nodes)
+                if time.perf_counter() - start > time_budget / 2:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            engine.search_deadline = None
+        return best_score, best_move, completed_depth
+
+    def shutdown(self):
+        self.pool.terminate()
@@ -0,0 +1,423 @@
+"""Game records in PDN (Portable Draughts Notation): writing, streaming reading and batch analysis.
+
+    python pdn.py analyse games.pdn [--output games.scores.jsonl] [--depth 6] [--workers 4]
+
+The game appends every game played on the board to games.pdn through a
+GameRecorder. Each move carries a comment with the seconds since the start
+of the game and, for the bot's moves, where the move came from and what the
+search found:
+
+    1. 9-13 {time=4.2} 22-18 {time=5.0 source=search score=0.12 depth=11 nodes=90411 search=0.98}
+
+read_games() reads a PDN file one game at a time, so an archive of any size
+is gone through in the memory one game takes. Tags, moves written with or
+without their intermediate squares ("9x18x27" or "9x27"), comments, move
+numbers, NAGs and results are understood; variations are skipped.
+
+`analyse` searches every position of every game in an archive with minimax
+to --depth, in worker processes, and appends one line of JSON per position
+to the output as the results come in: the game and ply, the position as
+FEN, the score in men from Black's side and the best move. Only a bounded
+number of positions is read ahead of the results, so memory stays flat
+however big the archive is. Running the same command again carries on
+after the last position in the output.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+
+import engine
+from bitboard import Position, ROWCOL_TO_SQUARE, SQUARE_TO_ROWCOL, move_to_text
+from engine import BLACK, RED
+from transposition import TranspositionTable
+
+DEFAULT_ARCHIVE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "games.pdn")
+GAME_TYPE = "21"  # English draughts in the PDN GameType tag
+RESULTS = {BLACK: "1-0", RED: "0-1", None: "*"}  # Black is the first player
+LINE_LENGTH = 79  # Move text is wrapped at this width
+ANALYSIS_READ_AHEAD = 4096  # Most positions handed to the pool and not yet written out
+
+RESULT_TOKENS = {"1-0", "0-1", "2-0", "0-2", "1-1", "1/2-1/2", "*"}
+TAG = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# Results are matched before moves, which "1-0" and "0-1" would otherwise look like
+_RESULT = r'(?:1-0|0-1|2-0|0-2|1-1|1/2-1/2|\*)(?![\d-])'
+_MOVE = r'(\d+(?:[-x]\d+)+)'
+MOVE_AND_COMMENT = re.compile(_RESULT + r'|\{[^}]*\}|' + _MOVE + r'(?:\s*\{([^}]*)\})?')
+TOKEN = re.compile(_RESULT + r'|;[^\n]*|\{([^}]*)\}|(\()|(\))|' + _MOVE)
+SPLIT_COMMENT = re.compile(r'\}\s*\{')
+RESULT_AT_END = re.compile(r'(?:^|\s)(1-0|0-1|2-0|0-2|1-1|1/2-1/2|\*)\s*$')
+
+
+def _escape(value):
+    return str(value).replace('"', '\\"')
+
+
+class Game:
+    """One game: its tags, its moves as written and the comment after each move (or None)."""
+
+    def __init__(self, headers=None, moves=None, comments=None):
+        self.headers = headers if headers is not None else {}
+        self.moves = moves if moves is not None else []
+        self.comments = comments if comments is not None else [None] * len(self.moves)
+
+    @property
+    def result(self):
+        return self.headers.get("Result", "*")
+
+    def start_position(self):
+        fen = self.headers.get("FEN")
+        return Position.from_fen(fen) if fen else Position.initial()
+
+    def positions(self):
+        """Yield (ply, position) before each move and after the last; raises ValueError on an illegal move.
+
+        The position is played on in place, copy it to keep it.
+        """
+        position = self.start_position()
+        for ply, text in enumerate(self.moves):
+            yield ply, position
+            move = parse_move(position, text)
+            if move is None:
+                raise ValueError(f"illegal move {text!r} at ply {ply + 1}")
+            position.apply(move)
+        yield len(self.moves), position
+
+    def to_pdn(self):
+        """The game as PDN text, ending with a blank line."""
+        lines = [f'[{tag} "{_escape(value)}"]' for tag, value in self.headers.items()]
+        lines.append("")
+        black_to_move = self.start_position().black_to_move
+        tokens = []
+        for ply, (text, comment) in enumerate(zip(self.moves, self.comments)):
+            if ply == 0 and not black_to_move:
+                tokens.append("1...")
+            elif (ply if black_to_move else ply + 1) % 2 == 0:
+                tokens.append(f"{(ply if black_to_move else ply + 1) // 2 + 1}.")
+            tokens.append(text)
+            if comment:
+                tokens.append("{" + comment + "}")
+        tokens.append(self.result)
+        line = ""
+        for token in tokens:
+            if line and len(line) + 1 + len(token) > LINE_LENGTH:
+                lines.append(line)
+                line = token
+            else:
+                line = f"{line} {token}" if line else token
+        lines.append(line)
+        return "\n".join(lines) + "\n\n"
+
+
+def format_comment(**fields):
+    """A move comment of key=value pairs; None values are left out and floats get 2 decimals."""
+    return " ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                    for key, value in fields.items() if value is not None)
+
+
+def parse_comment(comment):
+    """The key=value pairs of a move comment as a dict, numbers converted; other words are ignored."""
+    fields = {}
+    for word in (comment or "").split():
+        key, sep, value = word.partition("=")
+        if not sep:
+            continue
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                pass
+        fields[key] = value
+    return fields
+
+
+def parse_move(position, text):
+    """The legal move of the position written as text ("9-13", "9x18", "9x18x27"), or None.
+
+    When only the first and last squares of a multi-jump are given and two
+    jump sequences join them, the one taking the most pieces is played,
+    like in the game.
+    """
+    try:
+        squares = [int(square) - 1 for square in re.split("[-x]", text)]
+    except ValueError:
+        return None
+    matches = [move for move in position.generate_moves() if move[0] == squares[0] and move[1] == squares[-1]]
+    if len(squares) > 2:
+        # The landing squares fix the pieces taken: each one sits halfway between two landings
+        jumped = 0
+        for frm, to in zip(squares, squares[1:]):
+            if not (0 <= frm < 32 and 0 <= to < 32):
+                return None
+            (from_row, from_col), (to_row, to_col) = SQUARE_TO_ROWCOL[frm], SQUARE_TO_ROWCOL[to]
+            middle = ROWCOL_TO_SQUARE.get(((from_row + to_row) // 2, (from_col + to_col) // 2))
+            if middle is None:
+                return None
+            jumped |= 1 << middle
+        matches = [move for move in matches if move[2] == jumped]
+    if not matches:
+        return None
+    return max(matches, key=lambda move: move[2].bit_count())
+
+
+def move_text(position, move):
+    """Write a move of the position in PDN, with every landing square when from-to alone is ambiguous."""
+    frm, to, captured = move
+    if not any(other[0] == frm and other[1] == to and other != move for other in position.generate_moves()):
+        return move_to_text(move)
+    path = _jump_path(frm, to, captured)
+    return "x".join(str(square + 1) for square in path)
+
+
+def _jump_path(square, to, captured):
+    """The landing squares of a jump sequence from square that takes exactly the captured pieces."""
+    if not captured:
+        return [square] if square == to else None
+    row, col = SQUARE_TO_ROWCOL[square]
+    for row_step in (-1, 1):
+        for col_step in (-1, 1):
+            jumped = ROWCOL_TO_SQUARE.get((row + row_step, col + col_step))
+            landing = ROWCOL_TO_SQUARE.get((row + 2 * row_step, col + 2 * col_step))
+            if jumped is not None and landing is not None and captured & (1 << jumped):
+                rest = _jump_path(landing, to, captured & ~(1 << jumped))
+                if rest is not None:
+                    return [square] + rest
+    return None
+
+
+def parse_game(tag_lines, movetext):
+    """Build a Game from its tag lines and its move text."""
+    headers = {}
+    for line in tag_lines:
+        for tag, value in TAG.findall(line):
+            headers[tag] = value.replace('\\"', '"')
+    if "(" in movetext or ";" in movetext or SPLIT_COMMENT.search(movetext):
+        moves, comments = _parse_tokens(movetext)
+    else:
+        # Most games have at most one comment after each move: one findall does them
+        moves, comments = [], []
+        for move, comment in MOVE_AND_COMMENT.findall(movetext):
+            if move:
+                moves.append(move)
+                comments.append(" ".join(comment.split()) or None)
+    if "Result" not in headers:
+        result = RESULT_AT_END.search(movetext)
+        if result:
+            headers["Result"] = result.group(1)
+    return Game(headers, moves, comments)
+
+
+def _parse_tokens(movetext):
+    """Moves and comments of move text with variations, ; comments or several comments to a move."""
+    moves, comments = [], []
+    variation_depth = 0
+    for match in TOKEN.finditer(movetext):
+        comment, open_paren, close_paren, move = match.groups()
+        if open_paren:
+            variation_depth += 1
+        elif close_paren:
+            variation_depth = max(variation_depth - 1, 0)
+        elif variation_depth:
+            continue
+        elif move:
+            moves.append(move)
+            comments.append(None)
+        elif comment and not comment.isspace() and comments:
+            comment = " ".join(comment.split())
+            comments[-1] = f"{comments[-1]} {comment}" if comments[-1] else comment
+    return moves, comments
+
+
+def parse_games(lines):
+    """Yield the games in an iterable of PDN lines, one at a time.
+
+    A game ends at its result or where the tags of the next one start. Only
+    the lines of the game being read are kept.
+    """
+    tag_lines, movetext = [], []
+    in_comment = False
+    for line in lines:
+        stripped = line.strip()
+        if not in_comment and stripped.startswith("["):
+            if movetext:
+                yield parse_game(tag_lines, "\n".join(movetext))
+                tag_lines, movetext = [], []
+            tag_lines.append(stripped)
+            continue
+        if not stripped:
+            continue
+        movetext.append(stripped)
+        if in_comment or "{" in stripped or "}" in stripped:
+            # Comments don't nest: the last brace on the line says whether one is still open
+            in_comment = stripped.rfind("{") > stripped.rfind("}")
+        if not in_comment and stripped[stripped.rfind(" ") + 1:] in RESULT_TOKENS:
+            yield parse_game(tag_lines, "\n".join(movetext))
+            tag_lines, movetext = [], []
+    if tag_lines or movetext:
+        yield parse_game(tag_lines, "\n".join(movetext))
+
+
+def read_games(path):
+    """Yield the games of a PDN file without reading it all in."""
+    with open(path, encoding="utf-8", errors="replace") as pdn_file:
+        yield from parse_games(pdn_file)
+
+
+def append_game(game, path=DEFAULT_ARCHIVE):
+    with open(path, "a", encoding="utf-8") as pdn_file:
+        pdn_file.write(game.to_pdn())
+
+
+class GameRecorder:
+    """Records a game as it is played, with the time of every move, and appends it to a PDN file.
+
+    The recorder follows the game on its own Position, to write each move
+    with as many squares as it takes to tell it from the other moves.
+    """
+
+    def __init__(self, black_name, red_name, event="Casual game", position=None):
+        now = time.localtime()
+        self.game = Game({"Event": event, "Date": time.strftime("%Y.%m.%d", now),
+                          "Time": time.strftime("%H:%M:%S", now), "Black": black_name or "Black",
+                          "White": red_name or "Red", "Result": "*", "GameType": GAME_TYPE})
+        if position is not None and position.to_fen() != Position.initial().to_fen():
+            self.game.headers["FEN"] = position.to_fen()
+        self.position = position.copy() if position is not None else Position.initial()
+        self.start = time.perf_counter()
+
+    def add(self, move, stats=None):
+        """Record a bitboard move; stats are the bot's search figures from BotWorker.stats."""
+        fields = {"time": time.perf_counter() - self.start}
+        if stats:
+            fields.update(stats)
+        self.game.moves.append(move_text(self.position, move))
+        self.game.comments.append(format_comment(**fields))
+        self.position.apply(move)
+
+    def save(self, winner_color=None, path=DEFAULT_ARCHIVE):
+        """Set the result from the winner (None for a game left unfinished) and append the game to path."""
+        self.game.headers["Result"] = RESULTS[winner_color]
+        append_game(self.game, path)
+
+
+_table = None
+
+
+def _init_worker():
+    global _table
+    _table = TranspositionTable()
+
+
+def _analyse_position(task):
+    """Search one position to depth; returns its record for the output."""
+    game, ply, fields, depth = task
+    position = Position(*fields)
+    color = BLACK if position.black_to_move else RED
+    fen = position.to_fen()
+    start = time.perf_counter()
+    engine.nodes_searched = 0
+    engine.age_move_ordering()
+    _table.new_search()
+    # Each depth puts its best moves in the table for the next one, like the bot's search
+    score, move = 0.0, None
+    for search_depth in range(1, depth + 1):
+        score, move = engine.minimax(position, search_depth, float('-inf'), float('inf'), True, color, _table)
+    return {"game": game, "ply": ply, "fen": fen, "score": round(score if color == BLACK else -score, 3),
+            "best": move_to_text(move) if move is not None else None, "depth": depth,
+            "nodes": engine.nodes_searched, "time": round(time.perf_counter() - start, 4)}
+
+
+def _analysis_tasks(path, depth, skip, slots, stopped):
+    """(game, ply, position fields, depth) for every position in the archive after the first skip.
+
+    Each task waits for a slot, which is given back when its result has been
+    written, so the pool never holds more than the slots' worth of positions.
+    Once stopped is set no more tasks are made.
+    """
+    count = 0
+    for game_number, game in enumerate(read_games(path)):
+        try:
+            for ply, position in game.positions():
+                count += 1
+                if count <= skip:
+                    continue
+                slots.acquire()
+                if stopped.is_set():
+                    return
+                yield game_number, ply, (position.black, position.red, position.kings, position.black_to_move), depth
+        except ValueError as error:
+            print(f"\ngame {game_number}: {error}, the rest of the game is skipped", file=sys.stderr)
+
+
+def _resume_point(path):
+    """Number of complete lines in the output file; a half-written last line is cut off."""
+    if not os.path.exists(path):
+        return 0
+    lines = end = offset = 0
+    with open(path, "rb+") as output_file:
+        for block in iter(lambda: output_file.read(1 << 20), b""):
+            newlines = block.count(b"\n")
+            if newlines:
+                lines += newlines
+                end = offset + block.rindex(b"\n") + 1
+            offset += len(block)
+        output_file.truncate(end)
+    return lines
+
+
+def analyse(path, output_path, depth, workers):
+    """Search every position of the archive, appending each result to the output; returns positions written."""
+    os.stat(path)  # A missing archive fails here rather than in the pool's thread
+    skip = _resume_point(output_path)
+    if skip:
+        print(f"{skip} positions already in {output_path}", file=sys.stderr)
+    slots, stopped = threading.Semaphore(ANALYSIS_READ_AHEAD), threading.Event()
+    tasks = _analysis_tasks(path, depth, skip, slots, stopped)
+    written = 0
+    start = time.perf_counter()
+    with open(output_path, "a") as output_file, multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        try:
+            for record in pool.imap(_analyse_position, tasks, chunksize=16):
+                output_file.write(json.dumps(record) + "\n")
+                slots.release()
+                written += 1
+                if written % 256 == 0:
+                    output_file.flush()
+                    print(f"\r{written} positions, {written / (time.perf_counter() - start):.1f}/s",
+                          end='', file=sys.stderr)
+        finally:
+            # An interrupted run must not leave the pool's task thread waiting for a slot
+            stopped.set()
+            slots.release(ANALYSIS_READ_AHEAD)
+    print(file=sys.stderr)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Work with PDN game archives.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    analyse_parser = commands.add_parser("analyse", help="search every position of an archive")
+    analyse_parser.add_argument("archive", help="PDN file")
+    analyse_parser.add_argument("--output", help="JSON lines file the scores are appended to "
+                                                 "(default: the archive's name with .scores.jsonl)")
+    analyse_parser.add_argument("--depth", type=int, default=6, help="search depth per position")
+    analyse_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="positions searched at once")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.archive)[0] + ".scores.jsonl"
+    start = time.perf_counter()
+    try:
+        written = analyse(args.archive, output, args.depth, args.workers)
+    except OSError as error:
+        sys.exit(f"pdn.py: {error}")
+    print(f"{written} positions analysed to depth {args.depth} in {time.perf_counter() - start:.1f}s, "
+          f"written to {output}")
+
+
+if __name__ == "__main__":
+    main()
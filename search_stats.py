@@ -0,0 +1,265 @@
+"""Search statistics, and hooks that trace or profile the bot's search.
+
+Instrumentation is off unless engine.search_stats holds a SearchStats. While
+it does, every call of iterative_deepening fills it in: nodes, leaf
+evaluations, beta cutoffs by the index of the move that caused them,
+transposition table probes and hits, the depth reached and the time spent
+generating moves and evaluating. While it is None the search pays for one
+`is not None` test at a few places per node.
+
+A SearchStats also runs hooks, callables taking (event, stats), on the
+events 'start', 'iteration' (each completed depth), 'progress' (every
+engine.DEADLINE_CHECK_INTERVAL nodes) and 'finish'. TraceExporter and
+SamplingProfiler are hooks; SharedStatsHook copies the figures into a
+shared array, which is how the game shows the figures of a search running
+in the bot's worker process.
+"""
+import collections
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+CUTOFF_SLOTS = 8  # Cutoffs are counted by move index; the last slot takes that index and every later one
+COUNTERS = ('nodes', 'quiescence_nodes', 'leaf_evals', 'movegen_calls', 'tt_probes', 'tt_hits', 'tt_cutoffs')
+TIMERS = ('movegen_time', 'eval_time')
+RESULTS = ('depth', 'max_ply', 'score', 'elapsed')
+# Layout of SearchStats.to_values()
+VALUE_FIELDS = COUNTERS + TIMERS + RESULTS
+VALUE_COUNT = len(VALUE_FIELDS) + CUTOFF_SLOTS
+
+
+class SearchStats:
+    """The figures of one search, filled in by the engine while this is engine.search_stats.
+
+    begin() clears them, so each search starts from zero. nodes and
+    quiescence_nodes are taken from the engine's counters as differences,
+    the other counters are added to by the search itself. In a parallel
+    search the helpers' times are added in too, so they can come to more
+    than the time the search took.
+    """
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.reset()
+
+    def reset(self):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.movegen_time = self.eval_time = 0.0
+        self.cutoffs = [0] * CUTOFF_SLOTS
+        self.depth = self.max_ply = 0
+        self.score = None
+        self.move = None
+        self.elapsed = 0.0
+        self.iterations = []  # (depth, score, nodes, seconds) of every completed depth
+        self._start = time.perf_counter()
+        self._base_nodes = self._base_quiescence = 0
+
+    def record_cutoff(self, index):
+        self.cutoffs[min(index, CUTOFF_SLOTS - 1)] += 1
+
+    def merge(self, other):
+        """Add the counters of a search done elsewhere, like a parallel search's helper process."""
+        for name in COUNTERS[2:] + TIMERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.cutoffs = [mine + theirs for mine, theirs in zip(self.cutoffs, other.cutoffs)]
+        self.max_ply = max(self.max_ply, other.max_ply)
+
+    # Called by the engine with its nodes_searched and quiescence_nodes counters
+
+    def begin(self, nodes, quiescence_nodes):
+        self.reset()
+        self._base_nodes, self._base_quiescence = nodes, quiescence_nodes
+        self._run_hooks('start')
+
+    def update(self, nodes, quiescence_nodes):
+        self.nodes = nodes - self._base_nodes
+        self.quiescence_nodes = quiescence_nodes - self._base_quiescence
+        self.elapsed = time.perf_counter() - self._start
+
+    def progress(self, nodes, quiescence_nodes):
+        self.update(nodes, quiescence_nodes)
+        self._run_hooks('progress')
+
+    def end_iteration(self, depth, score, move, nodes, quiescence_nodes):
+        self.update(nodes, quiescence_nodes)
+        self.depth, self.score, self.move = depth, score, move
+        self.iterations.append((depth, score, self.nodes, self.elapsed))
+        self._run_hooks('iteration')
+
+    def finish(self, nodes, quiescence_nodes):
+        self.update(nodes, quiescence_nodes)
+        self._run_hooks('finish')
+
+    def _run_hooks(self, event):
+        for hook in self.hooks:
+            hook(event, self)
+
+    # Derived figures
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        """Share of the cutoffs caused by the first move searched, how good the move ordering is."""
+        total = sum(self.cutoffs)
+        return self.cutoffs[0] / total if total else 0.0
+
+    def as_dict(self):
+        figures = {name: getattr(self, name) for name in COUNTERS + TIMERS + RESULTS}
+        figures.update(cutoffs=list(self.cutoffs), nodes_per_second=self.nodes_per_second,
+                       tt_hit_rate=self.tt_hit_rate, first_move_cutoff_rate=self.first_move_cutoff_rate,
+                       iterations=list(self.iterations))
+        return figures
+
+    def to_values(self):
+        """The figures as a flat list of floats, VALUE_FIELDS then the cutoffs; a missing score is NaN."""
+        values = [float(getattr(self, name)) for name in COUNTERS + TIMERS + RESULTS[:2]]
+        values += [math.nan if self.score is None else float(self.score), self.elapsed]
+        return values + [float(count) for count in self.cutoffs]
+
+    @classmethod
+    def from_values(cls, values):
+        stats = cls()
+        for name, value in zip(VALUE_FIELDS, values):
+            setattr(stats, name, value if name in TIMERS or name in ('score', 'elapsed') else int(value))
+        if stats.score is not None and math.isnan(stats.score):
+            stats.score = None
+        stats.cutoffs = [int(count) for count in values[len(VALUE_FIELDS):]]
+        return stats
+
+    def summary_lines(self):
+        """The figures as a few lines of text, for the game's overlay and the command line."""
+        score = "-" if self.score is None else f"{self.score:+.2f}"
+        lines = [f"depth {self.depth} (max ply {self.max_ply})  score {score}",
+                 f"{self.nodes:,} nodes in {self.elapsed:.2f}s, {self.nodes_per_second:,.0f}/s",
+                 f"quiescence {self.quiescence_nodes / max(self.nodes, 1):.0%}  leaf evals {self.leaf_evals:,}",
+                 f"TT hits {self.tt_hit_rate:.0%} of {self.tt_probes:,}  cutoffs {self.tt_cutoffs:,}"]
+        total = sum(self.cutoffs)
+        if total:
+            groups = self.cutoffs[:4] + [sum(self.cutoffs[4:])]
+            shares = "  ".join(f"{label} {count / total:.0%}"
+                               for label, count in zip(("1st", "2nd", "3rd", "4th", "later"), groups))
+            lines.append(f"cutoffs by move: {shares}")
+        if self.elapsed > 0:
+            movegen, evaluation = self.movegen_time / self.elapsed, self.eval_time / self.elapsed
+            lines.append(f"time: movegen {movegen:.0%}  eval {evaluation:.0%}  "
+                         f"other {max(0.0, 1 - movegen - evaluation):.0%}")
+        return lines
+
+
+class SharedStatsHook:
+    """Copies the figures into a shared array of VALUE_COUNT doubles on every event."""
+
+    def __init__(self, array):
+        self.array = array
+
+    def __call__(self, event, stats):
+        self.array[:] = stats.to_values()
+
+
+class TraceExporter:
+    """Records searches as Chrome trace events, for chrome://tracing or ui.perfetto.dev.
+
+    Each search is a span with a nested span per completed depth, and the
+    nodes searched are a counter track updated on every progress event.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.search_start = self.iteration_start = None
+
+    def _event(self, **fields):
+        fields.update(pid=os.getpid(), tid=threading.get_ident())
+        self.events.append(fields)
+
+    def __call__(self, event, stats):
+        now = time.perf_counter() * 1e6
+        if event == 'start':
+            self.search_start = self.iteration_start = now
+        elif event == 'iteration':
+            self._event(name=f"depth {stats.depth}", ph="X", ts=self.iteration_start,
+                        dur=now - self.iteration_start, args={"nodes": stats.nodes, "score": stats.score})
+            self.iteration_start = now
+        elif event == 'progress':
+            self._event(name="nodes", ph="C", ts=now, args={"nodes": stats.nodes,
+                                                            "quiescence": stats.quiescence_nodes})
+        elif event == 'finish':
+            self._event(name="search", ph="X", ts=self.search_start, dur=now - self.search_start,
+                        args={"depth": stats.depth, "nodes": stats.nodes, "leaf_evals": stats.leaf_evals,
+                              "tt_hits": stats.tt_hits, "cutoffs": stats.cutoffs})
+
+    def save(self, path):
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, trace_file)
+
+
+class SamplingProfiler:
+    """Samples the stack of the searching thread while a search runs.
+
+    A background thread looks at the stack every `interval` seconds. It
+    needs the GIL to do so, so in practice a sample is taken about every
+    sys.getswitchinterval() (5 ms by default) while the search holds it.
+    Recursive calls of the same function are folded into one frame, so the
+    stacks stay comparable across depths. write_folded() writes them in the
+    format flame graph tools (flamegraph.pl, speedscope) read.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.samples = collections.Counter()
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def __call__(self, event, stats):
+        if event == 'start':
+            self.start(threading.get_ident())
+        elif event == 'finish':
+            self.stop()
+
+    def start(self, thread_id):
+        self.stop()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._sample, args=(thread_id,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join()
+            self.thread = None
+
+    def _sample(self, thread_id):
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+                if not stack or stack[-1] != name:
+                    stack.append(name)
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def top_functions(self, count=10):
+        """(function, share of samples) for the functions most often at the top of the stack."""
+        leaves = collections.Counter()
+        for stack, samples in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += samples
+        total = sum(leaves.values()) or 1
+        return [(name, samples / total) for name, samples in leaves.most_common(count)]
+
+    def write_folded(self, path):
+        with open(path, "w") as folded_file:
+            for stack, samples in self.samples.most_common():
+                folded_file.write(f"{stack} {samples}\n")
@@ -0,0 +1,66 @@
+"""Surfaces the game screens draw over and over, rendered once and kept.
+
+Surfaces are converted to the display's pixel format when there is a
+display, so blitting them doesn't convert them again every frame.
+"""
+from collections import OrderedDict
+
+import pygame
+
+TEXT_CACHE_SIZE = 256  # Rendered strings kept, the menus and a game use a few dozen
+
+
+def to_display_format(surface, alpha=True):
+    """Convert a surface to the display's pixel format, if a display has been opened."""
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha() if alpha else surface.convert()
+
+
+class TextCache:
+    """Rendered text keyed by (string, color), dropping the least recently used past `size` entries."""
+
+    def __init__(self, font, size=TEXT_CACHE_SIZE):
+        self.font = font
+        self.size = size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, color):
+        """Same as font.render(text, True, color), without rendering the same text twice."""
+        key = (text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = to_display_format(self.font.render(text, True, color))
+        if self.size > 0:
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.size:
+                self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+def render_board_layer(board_size, square_size, light_color, dark_color):
+    """The empty checkerboard on one surface."""
+    layer = pygame.Surface((board_size * square_size, board_size * square_size))
+    for row in range(board_size):
+        for col in range(board_size):
+            color = light_color if (row + col) % 2 == 0 else dark_color
+            pygame.draw.rect(layer, color, (col * square_size, row * square_size, square_size, square_size))
+    return to_display_format(layer, alpha=False)
+
+
+def render_piece(square_size, color, king_marker_color=None):
+    """A man one square in size, with the king marker in the middle when a king marker color is given."""
+    piece = pygame.Surface((square_size, square_size), pygame.SRCALPHA)
+    pygame.draw.circle(piece, color, (square_size // 2, square_size // 2), square_size // 2 - 10)
+    if king_marker_color is not None:
+        pygame.draw.circle(piece, king_marker_color, (square_size // 2, square_size // 2), 10)
+    return to_display_format(piece)
@@ -0,0 +1,390 @@
+"""Endgame tablebases: exact results for positions with few pieces.
+
+    python tablebase.py [--pieces 4] [--workers 4] [--directory tablebases]
+
+Generation works backwards from the positions where the side to move has
+no move (retrograde analysis), one material balance at a time, fewest
+pieces first. Each material is written to its own file as soon as it is
+done and files that already exist are skipped, so an interrupted run picks
+up where it stopped. Materials that don't depend on each other are
+generated in parallel.
+
+Every table holds one byte per position with black to move; positions with
+red to move are looked up through the board turned around with the colors
+swapped. A position's byte is found by direct indexing: the squares of each
+group of pieces (black men, black kings, red men, red kings) are ranked
+with the combinatorial number system and the ranks combined. The byte is 0
+for a draw, otherwise the number of plies to the end of the game plus one:
+even for a win of the side to move, odd for a loss.
+"""
+import argparse
+import itertools
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from array import array
+
+from bitboard import Position, NUM_SQUARES, BLACK_KING_ROW
+
+TABLEBASE_MAGIC = b"CKTB"
+TABLEBASE_VERSION = 2  # 2: forced captures and multi-jumps
+HEADER = struct.Struct("<4sI4BQ")  # magic, version, black men, black kings, red men, red kings, positions
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+DEFAULT_PIECES = 4
+
+WIN, LOSS, DRAW = 1, -1, 0
+MAN_SQUARES = 28  # A man is never on its own king row, so there are 28 squares it can be on
+MAX_DISTANCE = 254
+
+BINOMIAL = [[0] * (NUM_SQUARES + 2) for _ in range(NUM_SQUARES + 1)]
+for _n in range(NUM_SQUARES + 1):
+    BINOMIAL[_n][0] = 1
+    for _k in range(1, _n + 1):
+        BINOMIAL[_n][_k] = BINOMIAL[_n - 1][_k - 1] + BINOMIAL[_n - 1][_k]
+
+
+def mirror(bits):
+    """Turn a square mask around: square s becomes 31 - s, which is the board rotated 180 degrees."""
+    bits = ((bits >> 1) & 0x55555555) | ((bits & 0x55555555) << 1)
+    bits = ((bits >> 2) & 0x33333333) | ((bits & 0x33333333) << 2)
+    bits = ((bits >> 4) & 0x0F0F0F0F) | ((bits & 0x0F0F0F0F) << 4)
+    bits = ((bits >> 8) & 0x00FF00FF) | ((bits & 0x00FF00FF) << 8)
+    return ((bits >> 16) | (bits << 16)) & 0xFFFFFFFF
+
+
+def _rank(bits, offset=0):
+    """Rank of a set of squares among all sets of the same size (combinatorial number system)."""
+    rank = 0
+    count = 0
+    while bits:
+        low = bits & -bits
+        count += 1
+        rank += BINOMIAL[low.bit_length() - 1 - offset][count]
+        bits ^= low
+    return rank
+
+
+def _unrank(rank, count, offset=0):
+    """The set of `count` squares with the given rank, as a mask."""
+    bits = 0
+    square = NUM_SQUARES
+    for k in range(count, 0, -1):
+        square -= 1
+        while BINOMIAL[square][k] > rank:
+            square -= 1
+        rank -= BINOMIAL[square][k]
+        bits |= 1 << (square + offset)
+    return bits
+
+
+def table_size(material):
+    black_men, black_kings, red_men, red_kings = material
+    return (BINOMIAL[MAN_SQUARES][black_men] * BINOMIAL[NUM_SQUARES][black_kings]
+            * BINOMIAL[MAN_SQUARES][red_men] * BINOMIAL[NUM_SQUARES][red_kings])
+
+
+def material_of(black, red, kings):
+    return ((black & ~kings).bit_count(), (black & kings).bit_count(),
+            (red & ~kings).bit_count(), (red & kings).bit_count())
+
+
+def position_index(black, red, kings, material):
+    """Index of a position with black to move in its material's table."""
+    _, black_kings, red_men, red_kings = material
+    index = _rank(black & ~kings)
+    index = index * BINOMIAL[NUM_SQUARES][black_kings] + _rank(black & kings)
+    index = index * BINOMIAL[MAN_SQUARES][red_men] + _rank(red & ~kings, 4)
+    return index * BINOMIAL[NUM_SQUARES][red_kings] + _rank(red & kings)
+
+
+def index_position(index, material):
+    """The (black, red, kings) masks at an index, None when the groups overlap."""
+    black_men, black_kings, red_men, red_kings = material
+    index, red_king_rank = divmod(index, BINOMIAL[NUM_SQUARES][red_kings])
+    index, red_man_rank = divmod(index, BINOMIAL[MAN_SQUARES][red_men])
+    black_man_rank, black_king_rank = divmod(index, BINOMIAL[NUM_SQUARES][black_kings])
+    groups = (_unrank(black_man_rank, black_men), _unrank(black_king_rank, black_kings),
+              _unrank(red_man_rank, red_men, 4), _unrank(red_king_rank, red_kings))
+    if (groups[0] | groups[1] | groups[2] | groups[3]).bit_count() != sum(material):
+        return None  # Two pieces on one square
+    return groups[0] | groups[1], groups[2] | groups[3], groups[1] | groups[3]
+
+
+def encode(result, distance):
+    if result == DRAW:
+        return 0
+    if distance > MAX_DISTANCE - 1:
+        raise ValueError(f"distance {distance} doesn't fit in a tablebase byte")
+    return distance + 1
+
+
+def decode(value):
+    """(result, plies to the end of the game) for the side to move."""
+    if value == 0:
+        return DRAW, 0
+    distance = value - 1
+    return (WIN if distance % 2 else LOSS), distance
+
+
+def table_path(directory, material):
+    return os.path.join(directory, "%d%d%d%d.tb" % material)
+
+
+def table_is_current(path, material):
+    """True when path holds a complete table for material, generated with this version's rules.
+
+    Tables from an older version are ignored when probing and rebuilt by generate().
+    """
+    try:
+        with open(path, "rb") as table_file:
+            header = table_file.read(HEADER.size)
+            length = os.fstat(table_file.fileno()).st_size
+    except OSError:
+        return False
+    if len(header) < HEADER.size:
+        return False
+    magic, version, *stored, size = HEADER.unpack(header)
+    return (magic == TABLEBASE_MAGIC and version == TABLEBASE_VERSION and tuple(stored) == material
+            and length == HEADER.size + size)
+
+
+class Tablebases:
+    """The tables in a directory, each opened through mmap the first time it is needed."""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        self.tables = {}
+        self.max_pieces = 0
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if name.endswith(".tb") and len(name) == 7 and name[:4].isdigit():
+                    self.max_pieces = max(self.max_pieces, sum(int(digit) for digit in name[:4]))
+
+    def _table(self, material):
+        if material not in self.tables:
+            self.tables[material] = None
+            path = table_path(self.directory, material)
+            if table_is_current(path, material):
+                with open(path, "rb") as table_file:
+                    self.tables[material] = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.tables[material]
+
+    def probe_masks(self, black, red, kings, black_to_move):
+        """(result, distance) for the side to move, or None when there is no table for the position."""
+        if not black_to_move:
+            black, red, kings = mirror(red), mirror(black), mirror(kings)
+        if not black:
+            return LOSS, 0
+        if not red:
+            return None
+        material = material_of(black, red, kings)
+        table = self._table(material)
+        if table is None:
+            return None
+        return decode(table[HEADER.size + position_index(black, red, kings, material)])
+
+    def probe(self, position):
+        if position.__class__ is not Position:
+            return None  # The tables are for English checkers only
+        return self.probe_masks(position.black, position.red, position.kings, position.black_to_move)
+
+    def best_move(self, position):
+        """The move with the best tablebase result: quickest win, else a draw, else the slowest loss."""
+        best_key, best_move = None, None
+        for move in position.generate_moves():
+            kings = position.apply(move)
+            entry = self.probe(position)
+            position.undo(move, kings)
+            if entry is None:
+                return None
+            result, distance = entry
+            # The child's result is the opponent's, so its loss is our win
+            key = (-result, -distance if result == LOSS else distance)
+            if best_key is None or key > best_key:
+                best_key, best_move = key, move
+        return best_move
+
+    def close(self):
+        for table in self.tables.values():
+            if table is not None:
+                table.close()
+        self.tables.clear()
+
+
+def load_tablebases(directory=DEFAULT_DIRECTORY):
+    """The tablebases in a directory, or None when it has none."""
+    tablebases = Tablebases(directory)
+    return tablebases if tablebases.max_pieces else None
+
+
+def materials(max_pieces):
+    """Every material balance with both sides on the board and at most max_pieces pieces."""
+    found = []
+    for counts in itertools.product(range(max_pieces + 1), repeat=4):
+        black_men, black_kings, red_men, red_kings = counts
+        if black_men + black_kings and red_men + red_kings and sum(counts) <= max_pieces:
+            found.append(counts)
+    return found
+
+
+def _generate(job):
+    """Solve a material and its color-swapped twin together, since moves lead from one to the other."""
+    directory, group = job
+    start = time.perf_counter()
+    lower = Tablebases(directory)
+    bases = {}
+    total = 0
+    for material in group:
+        bases[material] = total
+        total += table_size(material)
+
+    remaining = array("H", bytes(2 * total))
+    longest_win = bytearray(total)
+    child_counts = array("I", bytes(4 * total))
+    children = array("I")
+    buckets = [[]]
+    valid = bytearray(total)
+
+    def push(distance, node, result):
+        while len(buckets) <= distance:
+            buckets.append([])
+        buckets[distance].append(node * 2 + (result == WIN))
+
+    for material in group:
+        base = bases[material]
+        twin = (material[2], material[3], material[0], material[1])
+        for index in range(table_size(material)):
+            masks = index_position(index, material)
+            if masks is None:
+                continue
+            node = base + index
+            valid[node] = 1
+            position = Position(*masks, True)
+            moves = position.generate_moves()
+            if not moves:
+                push(0, node, LOSS)
+                continue
+            quickest_win = None
+            draw_exit = False
+            longest = 0
+            internal = 0
+            for move in moves:
+                frm, to, captured = move
+                kings = position.apply(move)
+                promoted = not kings & (1 << frm) and BLACK_KING_ROW & (1 << to)
+                if captured or promoted:
+                    result, distance = lower.probe(position)
+                    if result == LOSS:
+                        quickest_win = distance + 1 if quickest_win is None else min(quickest_win, distance + 1)
+                    elif result == WIN:
+                        longest = max(longest, distance)
+                    else:
+                        draw_exit = True
+                else:
+                    # Red to move now: turn the board around to get its black-to-move twin
+                    black, red, child_kings = mirror(position.red), mirror(position.black), mirror(position.kings)
+                    children.append(bases[twin] + position_index(black, red, child_kings, twin))
+                    internal += 1
+                position.undo(move, kings)
+            child_counts[node] = internal
+            # An exit to a draw or to a lost position for the opponent means this one can't be lost
+            remaining[node] = internal + (draw_exit or quickest_win is not None)
+            longest_win[node] = longest
+            if quickest_win is not None:
+                push(quickest_win, node, WIN)
+            elif remaining[node] == 0:
+                push(longest + 1, node, LOSS)
+
+    # Predecessor lists, inverted from the child lists
+    pred_starts = array("I", bytes(4 * (total + 1)))
+    for child in children:
+        pred_starts[child + 1] += 1
+    for node in range(total):
+        pred_starts[node + 1] += pred_starts[node]
+    fill = array("I", pred_starts)
+    preds = array("I", bytes(4 * len(children)))
+    position_in_children = 0
+    for node in range(total):
+        for _ in range(child_counts[node]):
+            child = children[position_in_children]
+            preds[fill[child]] = node
+            fill[child] += 1
+            position_in_children += 1
+    del children, fill
+
+    # Settle positions in order of distance, so each gets its shortest win or longest loss
+    values = bytearray(total)
+    solved = bytearray(total)
+    distance = 0
+    while distance < len(buckets):
+        for entry in buckets[distance]:
+            node, is_win = divmod(entry, 2)
+            if solved[node]:
+                continue
+            solved[node] = 1
+            values[node] = encode(WIN if is_win else LOSS, distance)
+            for pred in preds[pred_starts[node]:pred_starts[node + 1]]:
+                if solved[pred]:
+                    continue
+                if not is_win:
+                    push(distance + 1, pred, WIN)
+                else:
+                    remaining[pred] -= 1
+                    if distance > longest_win[pred]:
+                        longest_win[pred] = distance
+                    if remaining[pred] == 0:
+                        push(longest_win[pred] + 1, pred, LOSS)
+        buckets[distance] = None
+        distance += 1
+    lower.close()
+
+    for material in group:
+        base = bases[material]
+        size = table_size(material)
+        path = table_path(directory, material)
+        with open(path + ".tmp", "wb") as table_file:
+            table_file.write(HEADER.pack(TABLEBASE_MAGIC, TABLEBASE_VERSION, *material, size))
+            table_file.write(values[base:base + size])
+        os.replace(path + ".tmp", path)
+    wins = sum(1 for node in range(total) if valid[node] and values[node] and values[node] % 2 == 0)
+    losses = sum(1 for node in range(total) if valid[node] and values[node] % 2)
+    return group, sum(valid), wins, losses, time.perf_counter() - start
+
+
+def generate(directory, max_pieces, workers=None):
+    """Generate every missing table up to max_pieces pieces, fewest pieces and men first."""
+    os.makedirs(directory, exist_ok=True)
+    # Captures lead to fewer pieces and promotions to fewer men, so tables only
+    # depend on tables of an earlier level
+    levels = {}
+    for material in materials(max_pieces):
+        twin = (material[2], material[3], material[0], material[1])
+        group = tuple(sorted({material, twin}))
+        if all(table_is_current(table_path(directory, m), m) for m in group):
+            continue
+        levels.setdefault((sum(material), material[0] + material[2]), set()).add(group)
+    with multiprocessing.Pool(workers) as pool:
+        for level in sorted(levels):
+            jobs = [(directory, group) for group in sorted(levels[level])]
+            for group, positions, wins, losses, elapsed in pool.imap_unordered(_generate, jobs):
+                names = " + ".join("%d%d%d%d" % material for material in group)
+                print(f"{names}: {positions:,} positions, {wins:,} wins, {losses:,} losses, "
+                      f"{positions - wins - losses:,} draws in {elapsed:.1f}s", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate endgame tablebases.")
+    parser.add_argument("--pieces", type=int, default=DEFAULT_PIECES, help="most pieces on the board")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    generate(args.directory, args.pieces, args.workers)
+    print(f"done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Bot-vs-bot tournaments, played in parallel across worker processes.
+
+    python tournament.py --matchups easy:medium medium:hard --games 200 --results results.jsonl
+
+Each matchup plays its games in pairs from the same random opening, with
+the bots swapping colors, so neither side is favoured by the opening or by
+moving first. A game is drawn after --max-plies plies or when a position
+comes up for the third time.
+
+Every finished game is appended to the results file as one line of JSON as
+soon as it is in. Running the same command again skips the games that are
+already in the file, so a long run can be stopped and picked up later. The
+report covers every game in the file played with the same settings.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import engine
+from bitboard import Position
+from engine import BLACK, RED, BOT_SEARCH_SETTINGS, choose_move
+from opening_book import load_book
+from tablebase import load_tablebases
+from transposition import TranspositionTable
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+REPETITION_LIMIT = 3  # A position seen this many times is a draw
+
+
+def play_game(black, red, opening_plies, seed, max_plies, time_budget=None, max_depth=None, book=None):
+    """Play one game between two difficulties; returns a dict describing it.
+
+    The first opening_plies plies are random moves drawn from `seed`, so both
+    games of a pair start from the same position. With an OpeningBook the
+    searching bots play book moves while there are any, like in the game.
+    """
+    opening_rng = random.Random(seed)
+    bot_rng = random.Random(seed + 1)
+    position = Position.initial()
+    difficulties = {BLACK: black, RED: red}
+    tables = {BLACK: TranspositionTable(), RED: TranspositionTable()}
+    stats = {BLACK: {'moves': 0, 'nodes': 0, 'time': 0.0}, RED: {'moves': 0, 'nodes': 0, 'time': 0.0}}
+    seen = {position.hash: 1}
+    result, reason = None, 'move limit'
+
+    plies = 0
+    while plies < max_plies:
+        color = BLACK if position.black_to_move else RED
+        moves = position.generate_moves()
+        if not moves:
+            result, reason = engine.opponent(color), 'no moves'
+            break
+        move = None
+        if plies < opening_plies:
+            move = opening_rng.choice(moves)
+        elif book is not None and difficulties[color] in BOT_SEARCH_SETTINGS:
+            move = book.choose(position, bot_rng)
+        if move is None:
+            engine.nodes_searched = 0
+            start = time.perf_counter()
+            move = choose_move(position, color, difficulties[color], tables[color], time_budget, max_depth, bot_rng)
+            stats[color]['time'] += time.perf_counter() - start
+            stats[color]['nodes'] += engine.nodes_searched
+            stats[color]['moves'] += 1
+        position.apply(move)
+        plies += 1
+        seen[position.hash] = seen.get(position.hash, 0) + 1
+        if seen[position.hash] >= REPETITION_LIMIT:
+            reason = 'repetition'
+            break
+
+    return {
+        'black': black,
+        'red': red,
+        'result': 'draw' if result is None else 'black' if result == BLACK else 'red',
+        'reason': reason,
+        'plies': plies,
+        'stats': {'black': stats[BLACK], 'red': stats[RED]},
+    }
+
+
+def _play(task):
+    matchup, game, settings = task
+    first, second = matchup.split(':')
+    # Odd games replay the opening of the even game before them with colors swapped
+    black, red = (first, second) if game % 2 == 0 else (second, first)
+    book = load_book(settings['book']) if settings['book'] else None
+    if settings['tablebases'] and engine.tablebases is None:
+        engine.tablebases = load_tablebases(settings['tablebases'])
+    record = play_game(black, red, settings['opening_plies'], settings['seed'] * 1000003 + game // 2,
+                       settings['max_plies'], settings['time'], settings['depth'], book)
+    if book is not None:
+        book.close()
+    record['matchup'] = matchup
+    record['game'] = game
+    record['settings'] = settings
+    return record
+
+
+def load_results(path):
+    """Read the games already in a results file; a half-written last line is ignored."""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path) as results_file:
+        for line in results_file:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
+
+
+def elo_difference(wins, draws, losses):
+    """Elo difference implied by a score, with its 95% interval; None when the score is 0% or 100%."""
+    games = wins + draws + losses
+    if games == 0:
+        return None
+    score = (wins + draws / 2) / games
+
+    def to_elo(s):
+        if s <= 0 or s >= 1:
+            return None
+        return 400 * math.log10(s / (1 - s))
+
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    return to_elo(score), to_elo(score - margin), to_elo(score + margin)
+
+
+def _format_elo(value):
+    return "    n/a" if value is None else f"{value:+7.0f}"
+
+
+def report(records, matchups):
+    """Print W/D/L and Elo per matchup, then nodes and time per move for each difficulty."""
+    print(f"{'matchup':<16}{'games':>6}{'W':>6}{'D':>6}{'L':>6}{'Elo':>9}   95% interval")
+    per_bot = {}
+    for matchup in matchups:
+        games = [r for r in records if r['matchup'] == matchup]
+        # The first bot of the matchup plays black in the even games
+        wins = sum(1 for r in games if r['result'] != 'draw' and (r['result'] == 'black') == (r['game'] % 2 == 0))
+        draws = sum(1 for r in games if r['result'] == 'draw')
+        losses = len(games) - wins - draws
+        elo = elo_difference(wins, draws, losses)
+        if elo is None or elo[0] is None:
+            interval = ""
+        else:
+            interval = f"{_format_elo(elo[1]).strip()} to {_format_elo(elo[2]).strip()}"
+        print(f"{matchup:<16}{len(games):>6}{wins:>6}{draws:>6}{losses:>6}"
+              f"{_format_elo(elo[0] if elo else None):>9}   {interval}")
+        for record in games:
+            for side in ('black', 'red'):
+                totals = per_bot.setdefault(record[side], {'moves': 0, 'nodes': 0, 'time': 0.0})
+                for key in totals:
+                    totals[key] += record['stats'][side][key]
+
+    print(f"\n{'bot':<10}{'moves':>9}{'nodes/move':>13}{'ms/move':>10}")
+    for bot, totals in sorted(per_bot.items(), key=lambda item: DIFFICULTIES.index(item[0])):
+        moves = max(totals['moves'], 1)
+        print(f"{bot:<10}{totals['moves']:>9}{totals['nodes'] / moves:>13,.0f}{totals['time'] * 1000 / moves:>10.1f}")
+
+
+def run(matchups, games, results_path, workers, settings):
+    """Play every game of every matchup that isn't in the results file yet, appending each as it finishes.
+
+    Games in the file that were played with other settings are left out of
+    both the resume and the report.
+    """
+    done = {(r['matchup'], r['game']) for r in load_results(results_path) if r['settings'] == settings}
+    tasks = [(matchup, game, settings) for matchup in matchups for game in range(games)
+             if (matchup, game) not in done]
+    print(f"{len(tasks)} games to play, {len(done)} already in {results_path}", file=sys.stderr)
+    if tasks:
+        with open(results_path, 'a') as results_file, multiprocessing.Pool(workers) as pool:
+            for count, record in enumerate(pool.imap_unordered(_play, tasks), 1):
+                results_file.write(json.dumps(record) + '\n')
+                results_file.flush()
+                print(f"\r{count}/{len(tasks)} games", end='', file=sys.stderr)
+        print(file=sys.stderr)
+    report([r for r in load_results(results_path) if r['settings'] == settings], matchups)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play the bots against each other.")
+    parser.add_argument("--matchups", nargs="+", default=["easy:medium", "medium:hard"],
+                        help="pairs of difficulties such as easy:hard")
+    parser.add_argument("--games", type=int, default=100, help="games per matchup, best kept even")
+    parser.add_argument("--results", default="tournament_results.jsonl", help="file the games are appended to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="games played at once")
+    parser.add_argument("--opening-plies", type=int, default=4, help="random plies at the start of each game pair")
+    parser.add_argument("--max-plies", type=int, default=200, help="plies before a game is a draw")
+    parser.add_argument("--time", type=float, help="seconds per move, overrides the difficulties")
+    parser.add_argument("--depth", type=int, help="maximum depth, overrides the difficulties")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the openings and the easy bot")
+    parser.add_argument("--book", help="opening book file for the searching bots")
+    parser.add_argument("--tablebases", help="endgame tablebase directory for the searching bots")
+    args = parser.parse_args(argv)
+
+    for matchup in args.matchups:
+        bots = matchup.split(':')
+        if len(bots) != 2 or any(bot not in DIFFICULTIES for bot in bots):
+            parser.error(f"bad matchup {matchup!r}, expected two of {', '.join(DIFFICULTIES)} like easy:hard")
+    settings = {'opening_plies': args.opening_plies, 'max_plies': args.max_plies,
+                'time': args.time, 'depth': args.depth, 'seed': args.seed, 'book': args.book,
+                'tablebases': args.tablebases}
+    run(args.matchups, args.games, args.results, args.workers, settings)
+
+
+if __name__ == "__main__":
+    main()
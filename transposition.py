@@ -0,0 +1,145 @@
+"""Fixed-size transposition table for the minimax search.
+
+Entries are indexed by the low bits of a position's Zobrist hash and store the
+full hash so collisions on the index can be told apart. Scores are stored from
+the point of view of the side to move in that position, so one table can be
+shared by searches for either color.
+
+The table is three flat arrays (hashes, scores, and everything else packed
+into one 64-bit word) rather than a list of tuples. Storing an entry then
+allocates nothing, the table costs 24 bytes a slot however full it is, and
+the garbage collector has no objects in it to walk on a full collection.
+A move on a bigger board doesn't fit in that word, so WideTranspositionTable
+keeps the moves in a fourth array.
+"""
+from array import array
+
+# Bound types
+EXACT = 0
+LOWER = 1  # The real score is at least the stored score (search failed high)
+UPPER = 2  # The real score is at most the stored score (search failed low)
+
+DEFAULT_SIZE = 1 << 18
+
+# Layout of an entry's packed word, from the low bits up: in use (1 bit),
+# bound (2), depth (8), generation (10), has a move (1), move from square (5),
+# move to square (5), captured mask (32)
+_BOUND_SHIFT = 1
+_DEPTH_SHIFT = 3
+_GENERATION_SHIFT = 11
+_MOVE_SHIFT = 21
+_GENERATION_MASK = 0x3FF
+_GENERATION_BITS = _GENERATION_MASK << _GENERATION_SHIFT
+_MAX_DEPTH = 0xFF
+
+
+class TranspositionTable:
+    """Hash table of (hash, depth, score, bound, best move, generation) entries.
+
+    Replacement is depth-preferred: an entry from the current search is only
+    overwritten by a search of the same position or of at least the same
+    depth, while entries left over from earlier searches are always replaced.
+    Generations count modulo 1024.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE):
+        # Round down to a power of two so the index is a simple mask
+        size = 1 << (max(size, 1).bit_length() - 1)
+        self.size = size
+        self.mask = size - 1
+        self.clear()
+
+    def new_search(self):
+        """Age the table so entries from previous searches become replaceable."""
+        self.generation = (self.generation + 1) & _GENERATION_MASK
+
+    def clear(self):
+        self.keys = array('Q', bytes(8 * self.size))
+        self.scores = array('d', bytes(8 * self.size))
+        self.data = array('Q', bytes(8 * self.size))
+        self.generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key):
+        """Return the (hash, depth, score, bound, move, generation) entry for a hash, or None."""
+        self.probes += 1
+        index = key & self.mask
+        data = self.data[index]
+        if not data or self.keys[index] != key:
+            return None
+        self.hits += 1
+        move = None
+        packed_move = data >> _MOVE_SHIFT
+        if packed_move & 1:
+            move = (packed_move >> 1 & 31, packed_move >> 6 & 31, packed_move >> 11)
+        return (key, data >> _DEPTH_SHIFT & _MAX_DEPTH, self.scores[index], data >> _BOUND_SHIFT & 3, move,
+                data >> _GENERATION_SHIFT & _GENERATION_MASK)
+
+    def store(self, key, depth, score, bound, move):
+        index = key & self.mask
+        old = self.data[index]
+        if (not old or self.keys[index] == key or old & _GENERATION_BITS != self.generation << _GENERATION_SHIFT
+                or depth >= old >> _DEPTH_SHIFT & _MAX_DEPTH):
+            data = 1 | bound << _BOUND_SHIFT | min(depth, _MAX_DEPTH) << _DEPTH_SHIFT | self.generation << _GENERATION_SHIFT
+            if move is not None:
+                frm, to, captured = move
+                data |= (1 | frm << 1 | to << 6 | captured << 11) << _MOVE_SHIFT
+            self.keys[index] = key
+            self.scores[index] = score
+            self.data[index] = data
+            self.stores += 1
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+
+# Layout of a WideTranspositionTable move word, from the low bits up: has a
+# move (1 bit), from square (6), to square (6), captured mask (up to 51)
+_WIDE_TO_SHIFT = 7
+_WIDE_CAPTURED_SHIFT = 13
+
+
+class WideTranspositionTable(TranspositionTable):
+    """A TranspositionTable for boards of up to 64 squares, like international draughts' 50.
+
+    Moves go in an array of their own, so a slot costs 32 bytes instead of 24.
+    """
+
+    def clear(self):
+        self.moves = array('Q', bytes(8 * self.size))
+        super().clear()
+
+    def probe(self, key):
+        self.probes += 1
+        index = key & self.mask
+        data = self.data[index]
+        if not data or self.keys[index] != key:
+            return None
+        self.hits += 1
+        move = None
+        packed_move = self.moves[index]
+        if packed_move:
+            move = (packed_move >> 1 & 63, packed_move >> _WIDE_TO_SHIFT & 63, packed_move >> _WIDE_CAPTURED_SHIFT)
+        return (key, data >> _DEPTH_SHIFT & _MAX_DEPTH, self.scores[index], data >> _BOUND_SHIFT & 3, move,
+                data >> _GENERATION_SHIFT & _GENERATION_MASK)
+
+    def store(self, key, depth, score, bound, move):
+        index = key & self.mask
+        old = self.data[index]
+        if (not old or self.keys[index] == key or old & _GENERATION_BITS != self.generation << _GENERATION_SHIFT
+                or depth >= old >> _DEPTH_SHIFT & _MAX_DEPTH):
+            packed_move = 0
+            if move is not None:
+                frm, to, captured = move
+                packed_move = 1 | frm << 1 | to << _WIDE_TO_SHIFT | captured << _WIDE_CAPTURED_SHIFT
+            self.keys[index] = key
+            self.scores[index] = score
+            self.data[index] = (1 | bound << _BOUND_SHIFT | min(depth, _MAX_DEPTH) << _DEPTH_SHIFT
+                                | self.generation << _GENERATION_SHIFT)
+            self.moves[index] = packed_move
+            self.stores += 1
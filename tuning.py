@@ -0,0 +1,260 @@
+"""Fit the evaluation weights to the results of self-play games (Texel tuning).
+
+    python tuning.py collect --games 1000 --data tuning_positions.bin
+    python tuning.py fit --data tuning_positions.bin [--output evaluation_weights.json]
+
+`collect` plays the hard bot against itself from random openings and keeps
+the quiet positions of every game (the side to move has no capture) with
+the game's result. Games run in parallel across worker processes and each
+one is appended to the data file as soon as it is in, so collecting can be
+stopped and started again with another --seed to add more games.
+
+`fit` models the expected result of a position as sigmoid(K * evaluation)
+and picks the weights that minimise the squared error against the real
+results. K is fitted first with the current weights and then held, and the
+man weight stays 1.0, so the evaluation keeps counting in men. Each step
+of the fit is one pass over the data, read through a memory map a chunk at
+a time: the features of a chunk are computed with
+evaluation.features_batch() and the whole chunk is scored with a single
+matrix product, so memory use is set by --chunk, not by the data size.
+Every tenth position is kept back to check the fit on positions it wasn't
+made on. The weights are written to the file the bot reads at startup.
+
+The data file is an 8 byte header followed by fixed-size records of
+(black, red, kings masks, result), the result being 0 for a red win, 1 for
+a draw and 2 for a black win.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+
+from bitboard import Position
+from engine import BLACK, RED, choose_move
+from evaluation import DEFAULT_WEIGHTS_PATH, FEATURES, features_batch, load_weights, save_weights
+from tournament import REPETITION_LIMIT
+from transposition import TranspositionTable
+
+DATA_MAGIC = b"CKTD"
+DATA_VERSION = 1
+HEADER = struct.Struct("<4sI")  # magic, version
+RECORD = struct.Struct("<IIIB")  # black, red, kings, result
+VALIDATION_EVERY = 10  # Every this many'th position is held out of the fit
+FIXED_TERMS = ("man",)  # Kept as they are, so scores stay in men
+
+
+def play_game(opening_plies, seed, max_plies, time_budget, max_depth):
+    """Play the hard bot against itself; returns the records of its quiet positions."""
+    rng = random.Random(seed)
+    position = Position.initial()
+    tables = {BLACK: TranspositionTable(), RED: TranspositionTable()}
+    seen = {position.hash: 1}
+    quiet = []
+    result = 1
+    for ply in range(max_plies):
+        color = BLACK if position.black_to_move else RED
+        moves = position.generate_moves()
+        if not moves:
+            result = 0 if color == BLACK else 2
+            break
+        if ply < opening_plies:
+            move = rng.choice(moves)
+        else:
+            if not position.has_capture():
+                quiet.append((position.black, position.red, position.kings))
+            move = choose_move(position, color, 'hard', tables[color], time_budget, max_depth, rng)
+        position.apply(move)
+        seen[position.hash] = seen.get(position.hash, 0) + 1
+        if seen[position.hash] >= REPETITION_LIMIT:
+            break
+    return b"".join(RECORD.pack(black, red, kings, result) for black, red, kings in quiet)
+
+
+def _play(task):
+    return play_game(*task)
+
+
+def collect(path, games, workers, opening_plies, max_plies, time_budget, max_depth, seed):
+    """Play games and append their positions to the data file; returns the number of positions added."""
+    if not os.path.exists(path):
+        with open(path, "wb") as data_file:
+            data_file.write(HEADER.pack(DATA_MAGIC, DATA_VERSION))
+    else:
+        _check_header(path)
+    tasks = [(opening_plies, seed * 1000003 + game, max_plies, time_budget, max_depth) for game in range(games)]
+    added = 0
+    with open(path, "ab") as data_file, multiprocessing.Pool(workers) as pool:
+        for count, records in enumerate(pool.imap_unordered(_play, tasks), 1):
+            data_file.write(records)
+            data_file.flush()
+            added += len(records) // RECORD.size
+            print(f"\r{count}/{games} games, {added} positions", end='', file=sys.stderr)
+    print(file=sys.stderr)
+    return added
+
+
+def _check_header(path):
+    with open(path, "rb") as data_file:
+        header = data_file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} is too short to be tuning data")
+    magic, version = HEADER.unpack(header)
+    if magic != DATA_MAGIC:
+        raise ValueError(f"{path} is not tuning data")
+    if version != DATA_VERSION:
+        raise ValueError(f"{path} is tuning data version {version}, expected {DATA_VERSION}")
+
+
+def iter_chunks(path, chunk_size):
+    """Yield (black, red, kings, result) arrays of up to chunk_size positions, results as 0, 0.5 or 1.
+
+    The file is memory mapped, so only the chunk being worked on is read in.
+    A record cut short at the end of the file is left out.
+    """
+    import numpy as np
+
+    _check_header(path)
+    count = (os.path.getsize(path) - HEADER.size) // RECORD.size
+    if count == 0:
+        return
+    dtype = np.dtype([("black", "<u4"), ("red", "<u4"), ("kings", "<u4"), ("result", "u1")])
+    records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+    for start in range(0, count, chunk_size):
+        chunk = records[start:start + chunk_size]
+        yield (np.array(chunk["black"]), np.array(chunk["red"]), np.array(chunk["kings"]),
+               chunk["result"] / 2.0)
+
+
+def _split(size, offset):
+    """Mask of the held-out positions in a chunk starting at position offset."""
+    import numpy as np
+
+    return (np.arange(offset, offset + size) % VALIDATION_EVERY) == 0
+
+
+def data_pass(path, chunk_size, weights, scales, gradient=False):
+    """One pass over the data with these weights (in men, FEATURES order), for each K in scales.
+
+    Returns the training and held-out mean squared errors per K and, with
+    gradient, the gradient of the training error with respect to the
+    weights for the first K.
+    """
+    import numpy as np
+
+    weights = np.asarray(weights, dtype=np.float64)
+    scales = np.asarray(scales, dtype=np.float64)
+    errors = np.zeros((2, len(scales)))
+    counts = np.zeros(2)
+    total_gradient = np.zeros(len(weights))
+    offset = 0
+    for black, red, kings, results in iter_chunks(path, chunk_size):
+        features = features_batch(black, red, kings).astype(np.float64)
+        held_out = _split(len(results), offset)
+        offset += len(results)
+        scores = features @ weights
+        # sigmoid(K * score) for every K at once: one row per position
+        expected = 1 / (1 + np.exp(-np.outer(scores, scales)))
+        squared = (expected - results[:, None]) ** 2
+        for part, mask in enumerate((~held_out, held_out)):
+            errors[part] += squared[mask].sum(axis=0)
+            counts[part] += mask.sum()
+        if gradient:
+            p = expected[~held_out, 0]
+            slope = 2 * (p - results[~held_out]) * p * (1 - p) * scales[0]
+            total_gradient += slope @ features[~held_out]
+    counts = np.maximum(counts, 1)
+    return errors[0] / counts[0], errors[1] / counts[1], total_gradient / counts[0]
+
+
+def fit_scale(path, chunk_size, weights):
+    """The K that makes the current weights predict the results best, searched on a log scale."""
+    import numpy as np
+
+    low, high = -2.0, 2.0
+    for _ in range(3):
+        scales = np.logspace(low, high, 17)
+        training, _, _ = data_pass(path, chunk_size, weights, scales)
+        best = int(np.argmin(training))
+        step = (high - low) / 16
+        low, high = low + (best - 1) * step, low + (best + 1) * step
+    return float(scales[best])
+
+
+def fit(path, chunk_size, start_weights, iterations, learning_rate):
+    """Fit the weights by Adam on the squared error; returns (weights, K, errors before, errors after)."""
+    import numpy as np
+
+    weights = np.array([start_weights[term] for term in FEATURES], dtype=np.float64)
+    free = np.array([term not in FIXED_TERMS for term in FEATURES])
+    scale = fit_scale(path, chunk_size, weights)
+    before = data_pass(path, chunk_size, weights, [scale])
+    print(f"K = {scale:.3f}, error {before[0][0]:.5f}, held out {before[1][0]:.5f}", file=sys.stderr)
+
+    # Adam, which copes with terms whose features are on very different scales
+    moment = np.zeros(len(weights))
+    second_moment = np.zeros(len(weights))
+    beta1, beta2 = 0.9, 0.999
+    for step in range(1, iterations + 1):
+        training, held_out, gradient = data_pass(path, chunk_size, weights, [scale], gradient=True)
+        gradient[~free] = 0
+        moment = beta1 * moment + (1 - beta1) * gradient
+        second_moment = beta2 * second_moment + (1 - beta2) * gradient ** 2
+        update = moment / (1 - beta1 ** step) / (np.sqrt(second_moment / (1 - beta2 ** step)) + 1e-12)
+        weights -= learning_rate * update
+        print(f"\rstep {step}/{iterations}: error {training[0]:.5f}, held out {held_out[0]:.5f}",
+              end='', file=sys.stderr)
+    print(file=sys.stderr)
+    after = data_pass(path, chunk_size, weights, [scale])
+    return (dict(zip(FEATURES, weights.tolist())), scale,
+            (before[0][0], before[1][0]), (after[0][0], after[1][0]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune the evaluation weights from self-play games.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    collect_parser = commands.add_parser("collect", help="play self-play games and append their positions")
+    collect_parser.add_argument("--data", default="tuning_positions.bin", help="file the positions are appended to")
+    collect_parser.add_argument("--games", type=int, default=200)
+    collect_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="games played at once")
+    collect_parser.add_argument("--opening-plies", type=int, default=8, help="random plies at the start of each game")
+    collect_parser.add_argument("--max-plies", type=int, default=200, help="plies before a game is a draw")
+    collect_parser.add_argument("--time", type=float, default=0.05, help="seconds per move")
+    collect_parser.add_argument("--depth", type=int, default=30, help="maximum depth per move")
+    collect_parser.add_argument("--seed", type=int, default=0, help="seed for the openings; use a new one to add games")
+
+    fit_parser = commands.add_parser("fit", help="fit the weights to the collected positions")
+    fit_parser.add_argument("--data", default="tuning_positions.bin")
+    fit_parser.add_argument("--output", default=DEFAULT_WEIGHTS_PATH, help="weights file to write")
+    fit_parser.add_argument("--start", default=DEFAULT_WEIGHTS_PATH, help="weights to start from")
+    fit_parser.add_argument("--chunk", type=int, default=100000, help="positions read and scored at a time")
+    fit_parser.add_argument("--iterations", type=int, default=300, help="passes over the data")
+    fit_parser.add_argument("--learning-rate", type=float, default=0.01, help="Adam step size, in men")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "collect":
+        added = collect(args.data, args.games, args.workers, args.opening_plies, args.max_plies,
+                        args.time, args.depth, args.seed)
+        print(f"{added} positions added to {args.data} in {time.perf_counter() - start:.1f}s")
+        return
+
+    try:
+        start_weights = load_weights(args.start)
+        weights, scale, before, after = fit(args.data, args.chunk, start_weights, args.iterations,
+                                            args.learning_rate)
+    except (OSError, ValueError) as error:
+        sys.exit(f"tuning.py: {error}")
+    save_weights(weights, args.output)
+    for term in FEATURES:
+        print(f"{term:<12}{start_weights[term]:>8.3f} -> {weights[term]:>8.3f}")
+    print(f"K = {scale:.3f}; error {before[0]:.5f} -> {after[0]:.5f}, "
+          f"held out {before[1]:.5f} -> {after[1]:.5f}; {time.perf_counter() - start:.1f}s")
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Rules variants: English checkers on 8x8 and international draughts on 10x10.
+
+A variant is everything that depends on the rules: the board size, the
+position class that generates and plays the moves, the evaluation and the
+transposition table that can hold its moves. Nothing else has to pass it
+around: the engine's functions on a list-of-lists board find the variant
+from the board's size, and the search from the position's class.
+"""
+import bitboard
+import evaluation
+import international
+from transposition import TranspositionTable, WideTranspositionTable
+
+
+class Variant:
+    """One set of draughts rules and what the engine and the game need to play them."""
+
+    def __init__(self, name, title, board_size, position_class, evaluate, move_to_rowcol, move_to_text, table_class,
+                 black_moves_first):
+        self.name = name
+        self.title = title
+        self.board_size = board_size
+        self.position_class = position_class
+        self.evaluate = evaluate  # position -> score from black's side, in thousandths of a man
+        self.move_to_rowcol = move_to_rowcol
+        self.move_to_text = move_to_text
+        self.table_class = table_class
+        self.black_moves_first = black_moves_first
+
+    def initial_board(self):
+        return self.position_class.initial().to_board()
+
+    def __repr__(self):
+        return f"Variant({self.name!r})"
+
+
+ENGLISH = Variant("english", "English 8x8", bitboard.BOARD_SIZE, bitboard.Position, evaluation.evaluate,
+                  bitboard.move_to_rowcol, bitboard.move_to_text, TranspositionTable, True)
+INTERNATIONAL = Variant("international", "International 10x10", international.BOARD_SIZE,
+                        international.InternationalPosition, international.evaluate, international.move_to_rowcol,
+                        international.move_to_text, WideTranspositionTable, False)
+VARIANTS = {variant.name: variant for variant in (ENGLISH, INTERNATIONAL)}
+
+_by_board_size = {variant.board_size: variant for variant in VARIANTS.values()}
+_by_position_class = {variant.position_class: variant for variant in VARIANTS.values()}
+
+
+def board_variant(board):
+    """The variant played on a list-of-lists board, told by its size."""
+    return _by_board_size[len(board)]
+
+
+def position_variant(position):
+    return _by_position_class[position.__class__]